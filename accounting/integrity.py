@@ -0,0 +1,172 @@
+# accounting/integrity.py
+"""
+장부 무결성 스캐너
+- 전표별 그룹 집계 1회 + HAVING으로 문제 전표만 조회
+    빈 전표(라인 없음) / 한 줄짜리 전표 / 차변≠대변 / 없는 계정 / 양쪽 금액·음수 라인 / 없는 프로젝트
+- 전표 없는 분개 라인(고아 라인)은 별도 쿼리 1회
+- 증분: 마지막으로 검사한 전표 id 이후만 (reconcile_watermarks의 'integrity' 행)
+- DB 쪽 방어선은 db.init_db의 CHECK(라인 단위) + 트리거(전표 단위 균형)
+    python -m accounting.integrity [--full] [--fix-empty]
+"""
+
+import argparse
+import sys
+from dataclasses import dataclass, field
+
+import pandas as pd
+import streamlit as st
+
+from accounting.reconcile import load_watermark, save_watermark
+from db import run_query
+
+WATERMARK_NAME = "integrity"
+
+PROBLEM_LABELS = {
+    "empty": "라인 없는 전표",
+    "single_line": "한 줄짜리 전표",
+    "unbalanced": "차변/대변 불일치",
+    "unknown_account": "없는 계정 참조",
+    "bad_line": "양쪽 금액/음수 라인",
+    "orphan_project": "없는 프로젝트",
+    "orphan_line": "전표 없는 분개 라인",
+}
+PROBLEM_COLUMNS = ["journal_entry_id", "line_id", "project_id", "source_kind", "debit", "credit", "problems"]
+
+
+@dataclass
+class IntegrityReport:
+    after_id: int
+    upto_id: int
+    problems: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=PROBLEM_COLUMNS))
+
+    @property
+    def scanned(self) -> int:
+        return self.upto_id - self.after_id
+
+
+def _problem_entries(after_id: int, upto_id: int) -> pd.DataFrame:
+    df = run_query(
+        """
+        SELECT je.id AS journal_entry_id, je.project_id, je.source_kind,
+               COUNT(jl.id) AS lines,
+               ISNULL(SUM(jl.debit), 0) AS debit,
+               ISNULL(SUM(jl.credit), 0) AS credit,
+               SUM(CASE WHEN jl.id IS NOT NULL AND a.id IS NULL THEN 1 ELSE 0 END) AS unknown_accounts,
+               SUM(CASE WHEN jl.debit < 0 OR jl.credit < 0 OR (jl.debit > 0 AND jl.credit > 0) THEN 1 ELSE 0 END) AS bad_lines,
+               MAX(CASE WHEN p.id IS NULL THEN 1 ELSE 0 END) AS orphan_project
+        FROM journal_entries je
+        LEFT JOIN journal_lines jl ON jl.journal_entry_id = je.id
+        LEFT JOIN accounts a ON a.id = jl.account_id
+        LEFT JOIN projects p ON p.id = je.project_id
+        WHERE je.id > :after_id AND je.id <= :upto_id
+        GROUP BY je.id, je.project_id, je.source_kind
+        HAVING COUNT(jl.id) < 2
+            OR ISNULL(SUM(jl.debit), 0) <> ISNULL(SUM(jl.credit), 0)
+            OR SUM(CASE WHEN jl.id IS NOT NULL AND a.id IS NULL THEN 1 ELSE 0 END) > 0
+            OR SUM(CASE WHEN jl.debit < 0 OR jl.credit < 0 OR (jl.debit > 0 AND jl.credit > 0) THEN 1 ELSE 0 END) > 0
+            OR MAX(CASE WHEN p.id IS NULL THEN 1 ELSE 0 END) = 1
+        ORDER BY je.id
+        """,
+        {"after_id": after_id, "upto_id": upto_id}, fetch=True,
+    )
+    if df is None or df.empty:
+        return pd.DataFrame(columns=PROBLEM_COLUMNS)
+
+    def problems(r):
+        found = []
+        if r["lines"] == 0:
+            found.append("empty")
+        elif r["lines"] == 1:
+            found.append("single_line")
+        if r["lines"] and r["debit"] != r["credit"]:
+            found.append("unbalanced")
+        if r["unknown_accounts"]:
+            found.append("unknown_account")
+        if r["bad_lines"]:
+            found.append("bad_line")
+        if r["orphan_project"]:
+            found.append("orphan_project")
+        return ",".join(found)
+
+    df["problems"] = df.apply(problems, axis=1)
+    df["line_id"] = None
+    return df[PROBLEM_COLUMNS]
+
+
+def _orphan_lines(after_id: int) -> pd.DataFrame:
+    """
+    전표가 없는 라인. FK(ON DELETE CASCADE) 때문에 보통은 없고, 수동 작업으로 journal_entry_id가
+    비었거나 새 전표 범위에서 헤더가 사라진 경우만 잡힘.
+    """
+    df = run_query(
+        """
+        SELECT jl.journal_entry_id, jl.id AS line_id, jl.debit, jl.credit
+        FROM journal_lines jl
+        LEFT JOIN journal_entries je ON je.id = jl.journal_entry_id
+        WHERE jl.journal_entry_id IS NULL OR (jl.journal_entry_id > :after_id AND je.id IS NULL)
+        """,
+        {"after_id": after_id}, fetch=True,
+    )
+    if df is None or df.empty:
+        return pd.DataFrame(columns=PROBLEM_COLUMNS)
+    return df.assign(project_id=None, source_kind=None, problems="orphan_line")[PROBLEM_COLUMNS]
+
+
+def scan(full: bool = False) -> IntegrityReport:
+    after_id = 0 if full else int(load_watermark(WATERMARK_NAME)["last_journal_id"] or 0)
+    df = run_query("SELECT ISNULL(MAX(id), 0) AS max_id FROM journal_entries", fetch=True)
+    upto_id = int(df.iloc[0]["max_id"]) if df is not None and not df.empty else after_id
+
+    frames = [f for f in (_problem_entries(after_id, upto_id), _orphan_lines(after_id)) if not f.empty]
+    report = IntegrityReport(after_id=after_id, upto_id=upto_id)
+    if frames:
+        report.problems = pd.concat(frames, ignore_index=True)
+    save_watermark(None, upto_id, report.scanned, len(report.problems), name=WATERMARK_NAME)
+    return report
+
+
+def remove_empty_entries(entry_ids) -> int:
+    """
+    라인 없는 전표 삭제 (잔액 영향 없음). 운영 행이 가리키던 전표였다면
+    다음 대사에서 '연결 전표 유실'로 잡혀 재분개됨.
+    """
+    removed = 0
+    for je_id in entry_ids:
+        df = run_query(
+            """
+            DELETE FROM journal_entries
+            OUTPUT DELETED.id
+            WHERE id = :je AND NOT EXISTS (SELECT 1 FROM journal_lines WHERE journal_entry_id = :je)
+            """,
+            {"je": int(je_id)}, fetch=True,
+        )
+        removed += 0 if df is None else len(df)
+    if removed:
+        st.cache_data.clear()  # fetch=True 쓰기는 run_query가 캐시를 비우지 않음
+    return removed
+
+
+def empty_entry_ids(report: IntegrityReport) -> list:
+    df = report.problems
+    return [int(i) for i in df.loc[df["problems"].str.contains("empty"), "journal_entry_id"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="장부 무결성 검사")
+    parser.add_argument("--full", action="store_true", help="처음 전표부터 다시 검사")
+    parser.add_argument("--fix-empty", action="store_true", help="라인 없는 전표 삭제")
+    args = parser.parse_args()
+
+    report = scan(full=args.full)
+    print(f"검사: 전표 #{report.after_id + 1} ~ #{report.upto_id} ({report.scanned}건)")
+    for code, label in PROBLEM_LABELS.items():
+        count = int(report.problems["problems"].str.contains(code).sum())
+        if count:
+            print(f"  {label}: {count}건")
+    if args.fix_empty:
+        print(f"빈 전표 삭제: {remove_empty_entries(empty_entry_ids(report))}건")
+    return 1 if not report.problems.empty else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
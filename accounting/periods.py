@@ -0,0 +1,174 @@
+# accounting/periods.py
+"""
+기간 마감 + 마감 잔액 스냅샷
+- 마감(월/학기 등): 종료일까지의 프로젝트 × 계정 누적 차변/대변을 closing_balances에 저장
+    직전 마감 스냅샷 + 그 사이 전표만 더해서 계산 → 마감 비용은 O(기간)
+- 마감된 날짜(종료일 이하)의 전표 추가/역분개는 SQL에서 막고(accounting.service),
+  운영 행 추가/수정/삭제는 화면에서 막음 (마지막 마감만 다시 열 수 있음)
+- 기준일 잔액: 기준일 이전 가장 가까운 스냅샷 + (스냅샷 종료일, 기준일] 전표 (ix_journal_entries_tx_date)
+"""
+
+from typing import Optional
+
+import pandas as pd
+import streamlit as st
+
+from accounting.reports import BALANCE_COLUMNS, _normal_balance, chart_of_accounts, journal_version
+from db import run_query, run_transaction
+
+PERIOD_COLUMNS = ["id", "label", "end_date", "closed_by", "closed_at"]
+LIST_TTL_SEC = 30   # 다른 인스턴스에서 마감/재개한 경우 최대 이만큼 늦게 반영
+
+
+class PeriodClosedError(ValueError):
+    """마감된 기간의 날짜로 쓰기를 시도함."""
+
+
+@st.cache_data(show_spinner=False, ttl=LIST_TTL_SEC)
+def list_periods() -> pd.DataFrame:
+    df = run_query(
+        "SELECT id, label, end_date, closed_by, closed_at FROM period_closes ORDER BY end_date DESC",
+        fetch=True,
+    )
+    return df if df is not None else pd.DataFrame(columns=PERIOD_COLUMNS)
+
+
+def locked_through() -> str:
+    """마지막 마감 종료일 ('YYYY-MM-DD'). 마감이 없으면 ''."""
+    df = list_periods()
+    return str(df.iloc[0]["end_date"]) if not df.empty else ""
+
+
+def is_locked(tx_date) -> bool:
+    last = locked_through()
+    return bool(last) and str(tx_date)[:10] <= last
+
+
+def locked_message(*tx_dates) -> Optional[str]:
+    """하나라도 마감된 날짜면 화면 안내 문구, 아니면 None."""
+    if any(is_locked(d) for d in tx_dates if d):
+        return f"🔒 {locked_through()}까지는 마감된 기간이라 추가/수정/삭제할 수 없어요."
+    return None
+
+
+def _latest_close(tx) -> tuple:
+    """
+    (id, end_date) 또는 (None, '').
+    캐시된 list_periods 대신 트랜잭션 안에서 읽음 (다른 인스턴스에서 방금 마감/재개한 것 반영).
+    """
+    df = tx.query("SELECT TOP (1) id, end_date FROM period_closes ORDER BY end_date DESC", fetch=True)
+    if df.empty:
+        return None, ""
+    return int(df.iloc[0]["id"]), str(df.iloc[0]["end_date"])
+
+
+def close_period(label: str, end_date: str, closed_by: str) -> int:
+    """
+    end_date까지 마감. 직전 마감보다 뒤여야 함.
+    스냅샷 = 직전 스냅샷 + (직전 종료일, end_date] 전표 (한 번의 INSERT ... SELECT).
+    마감 행과 스냅샷은 한 트랜잭션 (스냅샷이 실패하면 마감도 남지 않음). DB 오류면 None.
+    """
+    def work(tx):
+        prev_id, prev_end = _latest_close(tx)
+        if prev_end and end_date <= prev_end:
+            raise ValueError(f"end_date must be after the last close ({prev_end})")
+
+        df = tx.query(
+            """
+            INSERT INTO period_closes (label, end_date, closed_by)
+            OUTPUT INSERTED.id
+            VALUES (:label, :end_date, :user)
+            """,
+            {"label": label, "end_date": end_date, "user": closed_by},
+            fetch=True,
+        )
+        close_id = int(df.iloc[0]["id"])
+        tx.query(
+            """
+            INSERT INTO closing_balances (close_id, project_id, account_id, debit, credit)
+            SELECT :close_id, t.project_id, t.account_id, SUM(t.debit), SUM(t.credit)
+            FROM (
+                SELECT project_id, account_id, debit, credit
+                FROM closing_balances
+                WHERE close_id = :prev_id
+                UNION ALL
+                SELECT je.project_id, jl.account_id, jl.debit, jl.credit
+                FROM journal_entries je
+                JOIN journal_lines jl ON jl.journal_entry_id = je.id
+                WHERE je.tx_date > :prev_end AND je.tx_date <= :end_date
+            ) t
+            GROUP BY t.project_id, t.account_id
+            """,
+            {"close_id": close_id, "prev_id": prev_id or -1, "prev_end": prev_end, "end_date": end_date},
+        )
+        return close_id
+
+    return run_transaction(work)
+
+
+def reopen_latest_period() -> Optional[str]:
+    """마지막 마감을 취소 (스냅샷 삭제 + 잠금 해제, 한 트랜잭션). 취소된 종료일 반환."""
+    def work(tx):
+        close_id, end_date = _latest_close(tx)
+        if close_id is None:
+            return None
+        tx.query("DELETE FROM closing_balances WHERE close_id = :id", {"id": close_id})
+        tx.query("DELETE FROM period_closes WHERE id = :id", {"id": close_id})
+        return end_date
+
+    return run_transaction(work)
+
+
+def closed_write_message(*tx_dates) -> str:
+    """
+    쓰기 도중 PeriodClosedError가 났을 때 안내 문구.
+    다른 인스턴스에서 방금 마감해 list_periods 캐시에 아직 없을 수 있으므로 새로 읽음.
+    """
+    list_periods.clear()
+    return locked_message(*tx_dates) or "🔒 마감된 기간이라 추가/수정/삭제할 수 없어요."
+
+
+def _snapshot_for(as_of: str) -> tuple:
+    """기준일 이전(포함) 가장 가까운 마감 (id, end_date)."""
+    df = list_periods()
+    eligible = df[df["end_date"].astype(str) <= as_of]
+    if eligible.empty:
+        return -1, ""
+    return int(eligible.iloc[0]["id"]), str(eligible.iloc[0]["end_date"])
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _balances_as_of(as_of: str, project_id: Optional[int], snapshot: tuple, version: tuple) -> pd.DataFrame:
+    close_id, snap_end = snapshot
+    project_filter = "AND project_id = :pid" if project_id is not None else ""
+    delta_filter = "AND je.project_id = :pid" if project_id is not None else ""
+    df = run_query(
+        f"""
+        SELECT t.project_id, t.account_id, SUM(t.debit) AS debit, SUM(t.credit) AS credit
+        FROM (
+            SELECT project_id, account_id, debit, credit
+            FROM closing_balances
+            WHERE close_id = :close_id {project_filter}
+            UNION ALL
+            SELECT je.project_id, jl.account_id, jl.debit, jl.credit
+            FROM journal_entries je
+            JOIN journal_lines jl ON jl.journal_entry_id = je.id
+            WHERE je.tx_date > :snap_end AND je.tx_date <= :as_of {delta_filter}
+        ) t
+        GROUP BY t.project_id, t.account_id
+        """,
+        {"close_id": close_id, "snap_end": snap_end, "as_of": as_of, "pid": project_id},
+        fetch=True,
+    )
+    if df is None or df.empty:
+        return pd.DataFrame(columns=BALANCE_COLUMNS)
+    merged = df.merge(chart_of_accounts(), left_on="account_id", right_on="id", how="left")
+    merged[["debit", "credit"]] = merged[["debit", "credit"]].fillna(0).astype("int64")
+    merged["balance"] = _normal_balance(merged)
+    return merged[BALANCE_COLUMNS]
+
+
+def balances_as_of(as_of: str, project_id: int = None) -> pd.DataFrame:
+    """기준일 종료 시점의 프로젝트 × 계정 잔액 (스냅샷 + 이후 전표)."""
+    as_of = str(as_of)[:10]
+    return _balances_as_of(as_of, project_id, _snapshot_for(as_of), journal_version(project_id))
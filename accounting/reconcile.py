@@ -0,0 +1,387 @@
+# accounting/reconcile.py
+"""
+운영 테이블(budget_entries/members/expenses) ↔ 장부 대사 (증분)
+- 워터마크: 지난 실행 이후 updated_at이 바뀐 행 + 새로 생긴 전표(id > last_journal_id)만 검사
+    + 지난 실행에서 해결 안 된 항목(reconcile_issues)은 매번 다시 검사 → 복구 전까지 목록에 남음
+- 행 검사(테이블당 쿼리 1회): 연결 전표 없음 / 전표 유실 / 역분개됨 / 차대 불일치 / 금액·계정·날짜 불일치
+- 전표 검사: 원본 행이 사라졌거나 다른 전표로 대체됐는데 살아 있는 전표 (고아 전표)
+- repair=True면 행은 repost_row(예전 무연결 전표가 있으면 연결만), 고아 전표는 reverse_entry로 복구
+- 앱 밖에서 지운 행은 변경 흔적이 없으므로 증분 검사로는 못 찾음 → full=True로 전체 검사
+- journal_trusted: 전체 검사를 마쳤고 미해결 불일치가 없는 프로젝트만 장부 합계를 KPI로 사용
+    python -m accounting.reconcile [--full] [--repair]
+"""
+
+import argparse
+import sys
+from dataclasses import dataclass, field
+from typing import Optional
+
+import pandas as pd
+import streamlit as st
+
+from accounting.periods import PeriodClosedError
+from accounting.service import SOURCE_ROW_SQL, _link_row, _load_row, expected_posting, repost_row, reverse_entry
+from db import run_query, run_transaction
+
+WATERMARK_NAME = "journal"
+FULL_WATERMARK_NAME = "journal_full"    # 전체 검사를 한 번이라도 끝까지 마쳤는지
+TRUST_TTL_SEC = 30
+SYSTEM_ACTOR = "system:reconcile"
+
+ISSUE_LABELS = {
+    "unposted": "전표 없음",
+    "missing_entry": "연결 전표 유실",
+    "reversed": "연결 전표가 역분개됨",
+    "unbalanced": "차변/대변 불일치",
+    "mismatch": "금액/계정/날짜 불일치",
+    "orphan": "원본 행 없는 전표",
+    "superseded": "대체됐지만 살아 있는 전표",
+}
+ISSUE_COLUMNS = ["kind", "table", "row_id", "journal_entry_id", "project_id", "detail"]
+
+
+@dataclass
+class ReconcileResult:
+    changed_since: object
+    last_journal_id: int
+    checked_rows: int = 0
+    checked_entries: int = 0
+    issues: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=ISSUE_COLUMNS))
+    repaired: int = 0
+
+
+def load_watermark(name: str = WATERMARK_NAME) -> dict:
+    df = run_query(
+        "SELECT changed_since, last_journal_id, checked_rows, issues, ran_at FROM reconcile_watermarks WHERE name = :name",
+        {"name": name}, fetch=True,
+    )
+    if df is None or df.empty:
+        return {"changed_since": None, "last_journal_id": 0, "checked_rows": 0, "issues": 0, "ran_at": None}
+    return df.iloc[0].to_dict()
+
+
+def save_watermark(changed_since, last_journal_id: int, checked_rows: int, issues: int, name: str = WATERMARK_NAME):
+    params = {"name": name, "since": changed_since, "last_id": last_journal_id,
+              "rows": checked_rows, "issues": issues}
+    run_query(
+        """
+        UPDATE reconcile_watermarks
+        SET changed_since = :since, last_journal_id = :last_id,
+            checked_rows = :rows, issues = :issues, ran_at = GETDATE()
+        WHERE name = :name
+        """,
+        params,
+    )
+    run_query(
+        """
+        INSERT INTO reconcile_watermarks (name, changed_since, last_journal_id, checked_rows, issues)
+        SELECT :name, :since, :last_id, :rows, :issues
+        WHERE NOT EXISTS (SELECT 1 FROM reconcile_watermarks WHERE name = :name)
+        """,
+        params,
+    )
+
+
+def _db_now():
+    """DB 시계 기준 현재 시각 (updated_at과 같은 시계로 비교해야 누락이 없음)."""
+    df = run_query("SELECT GETDATE() AS now, ISNULL(MAX(id), 0) AS max_id FROM journal_entries", fetch=True)
+    now = df.iloc[0]["now"]
+    return (now.to_pydatetime() if hasattr(now, "to_pydatetime") else now), int(df.iloc[0]["max_id"])
+
+
+def _scope_filter(since, ids, full: bool, id_column: str = "id", since_column: str = "updated_at") -> tuple:
+    """
+    검사 범위 조건 (SQL 조각, 파라미터).
+    full이면 전체, 아니면 (since 이후 변경) OR (id in ids). 둘 다 없으면 빈 범위.
+    """
+    if full:
+        return "", {}
+    parts, params = [], {}
+    if since is not None:
+        parts.append(f"{since_column} >= :since")
+        params["since"] = since
+    if ids:
+        parts.append(f"{id_column} IN ({','.join(str(int(i)) for i in sorted(ids))})")
+    return f"AND ({' OR '.join(parts) or '1 = 0'})", params
+
+
+def _changed_rows(table: str, since, ids=(), full: bool = False) -> pd.DataFrame:
+    """변경된 행 + 미해결 행 + 연결 전표의 라인 집계 (테이블당 쿼리 1회)."""
+    inner, params = _scope_filter(since, ids, full)
+    outer, _ = _scope_filter(since, ids, full, id_column="r.id", since_column="r.updated_at")
+    df = run_query(
+        f"""
+        SELECT r.*, je.id AS je_id, je.tx_date AS je_date, je.reversed_by_entry_id,
+               agg.je_debit, agg.je_credit, agg.debit_code, agg.credit_code
+        FROM ({SOURCE_ROW_SQL[table]}) r
+        LEFT JOIN journal_entries je ON je.id = r.journal_entry_id
+        LEFT JOIN (
+            SELECT jl.journal_entry_id,
+                   SUM(jl.debit) AS je_debit, SUM(jl.credit) AS je_credit,
+                   MAX(CASE WHEN jl.debit > 0 THEN a.code END) AS debit_code,
+                   MAX(CASE WHEN jl.credit > 0 THEN a.code END) AS credit_code
+            FROM journal_lines jl
+            JOIN accounts a ON a.id = jl.account_id
+            WHERE jl.journal_entry_id IN (
+                SELECT journal_entry_id FROM {table} WHERE journal_entry_id IS NOT NULL {inner}
+            )
+            GROUP BY jl.journal_entry_id
+        ) agg ON agg.journal_entry_id = r.journal_entry_id
+        WHERE 1 = 1 {outer}
+        """,
+        params or None, fetch=True,
+    )
+    return df if df is not None else pd.DataFrame()
+
+
+def claim_legacy_entry(table: str, row_id: int) -> Optional[int]:
+    """
+    연결 기능 이전에 만들어진 전표(source_table 없음) 중 같은 프로젝트/날짜/계정/금액인 것을 행에 연결.
+    이미 분개된 예전 행을 다시 분개해 이중 계상되는 것을 막음.
+    """
+    row = _load_row(table, row_id)
+    expected = expected_posting(table, row) if row is not None else None
+    if expected is None:
+        return None
+    debit, credit, amount = expected
+    df = run_query(
+        """
+        SELECT TOP (1) je.id
+        FROM journal_entries je
+        JOIN journal_lines d ON d.journal_entry_id = je.id AND d.debit = :amount
+        JOIN accounts da ON da.id = d.account_id AND da.code = :debit
+        JOIN journal_lines c ON c.journal_entry_id = je.id AND c.credit = :amount
+        JOIN accounts ca ON ca.id = c.account_id AND ca.code = :credit
+        WHERE je.project_id = :pid AND je.tx_date = :date AND je.source_table IS NULL
+          AND je.reversed_by_entry_id IS NULL AND je.reverses_entry_id IS NULL
+        ORDER BY je.id
+        """,
+        {"amount": amount, "debit": debit, "credit": credit, "pid": int(row["project_id"]), "date": row["tx_date"]},
+        fetch=True,
+    )
+    if df is None or df.empty:
+        return None
+    je_id = int(df.iloc[0]["id"])
+    claimed = run_query(
+        """
+        UPDATE journal_entries SET source_table = :table, source_id = :row_id
+        OUTPUT INSERTED.id
+        WHERE id = :je AND source_table IS NULL
+        """,
+        {"table": table, "row_id": row_id, "je": je_id}, fetch=True,
+    )
+    if claimed is None or claimed.empty:
+        return None
+    _link_row(table, row_id, je_id)
+    return je_id
+
+
+def _row_issue(table: str, row) -> tuple:
+    """(kind, detail) 또는 None."""
+    expected = expected_posting(table, row)
+    linked = pd.notna(row["journal_entry_id"])
+    if not linked:
+        return ("unposted", "") if expected else None
+    if pd.isna(row["je_id"]):
+        return "missing_entry", f"전표 #{int(row['journal_entry_id'])}"
+    if pd.notna(row["reversed_by_entry_id"]):
+        return "reversed", f"역분개 #{int(row['reversed_by_entry_id'])}"
+    if int(row["je_debit"] or 0) != int(row["je_credit"] or 0):
+        return "unbalanced", f"차변 {int(row['je_debit'] or 0):,} / 대변 {int(row['je_credit'] or 0):,}"
+    if expected is None:
+        return "mismatch", "분개 대상이 아닌데 전표가 살아 있음"
+    debit, credit, amount = expected
+    actual = (row["debit_code"], row["credit_code"], int(row["je_debit"] or 0))
+    if actual != (debit, credit, amount) or str(row["je_date"]) != str(row["tx_date"]):
+        return "mismatch", f"장부 {actual[0]}/{actual[1]} {actual[2]:,}원 {row['je_date']} → 원본 {debit}/{credit} {amount:,}원 {row['tx_date']}"
+    return None
+
+
+def _orphan_entries(last_journal_id: Optional[int], entry_ids=()) -> pd.DataFrame:
+    """
+    새 전표(id > last_journal_id) + 미해결 전표(entry_ids) 중
+    원본 행이 없거나 원본이 다른 전표를 가리키는데 역분개되지 않은 것. last_journal_id=None이면 entry_ids만.
+    """
+    scope = [] if last_journal_id is None else ["je.id > :last_id"]
+    if entry_ids:
+        scope.append(f"je.id IN ({','.join(str(int(i)) for i in sorted(entry_ids))})")
+    if not scope:
+        return pd.DataFrame()
+    frames = []
+    for table in SOURCE_ROW_SQL:
+        df = run_query(
+            f"""
+            SELECT je.id AS journal_entry_id, je.project_id, je.source_id AS row_id,
+                   r.id AS current_row, r.journal_entry_id AS current_link
+            FROM journal_entries je
+            LEFT JOIN {table} r ON r.id = je.source_id
+            WHERE je.source_table = :table AND ({' OR '.join(scope)})
+              AND je.reversed_by_entry_id IS NULL AND je.reverses_entry_id IS NULL
+              AND (r.id IS NULL OR r.journal_entry_id IS NULL OR r.journal_entry_id <> je.id)
+            """,
+            {"table": table, "last_id": last_journal_id}, fetch=True,
+        )
+        if df is not None and not df.empty:
+            df["table"] = table
+            frames.append(df)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def _find_issues(since, last_id: Optional[int], full: bool, open_issues: pd.DataFrame) -> tuple:
+    """(불일치 프레임, 검사한 행 수). 범위 = 워터마크 이후 변경분 + 지난번 미해결 항목."""
+    entry_kinds = open_issues["kind"].isin(["orphan", "superseded"])
+    issues, checked_rows = [], 0
+    for table in SOURCE_ROW_SQL:
+        open_rows = open_issues.loc[~entry_kinds & (open_issues["table"] == table), "row_id"].dropna()
+        rows = _changed_rows(table, since, set(open_rows.astype(int)), full)
+        checked_rows += len(rows)
+        for _, row in rows.iterrows():
+            issue = _row_issue(table, row)
+            if issue:
+                je = int(row["journal_entry_id"]) if pd.notna(row["journal_entry_id"]) else None
+                issues.append((issue[0], table, int(row["id"]), je, int(row["project_id"]), issue[1]))
+
+    orphans = _orphan_entries(last_id, set(open_issues.loc[entry_kinds, "journal_entry_id"].dropna().astype(int)))
+    for _, o in orphans.iterrows():
+        # 원본 행이 새 전표를 아직 못 받은 경우(unposted)는 위 행 검사에서 처리
+        kind = "orphan" if pd.isna(o["current_row"]) else "superseded"
+        issues.append((kind, o["table"], int(o["row_id"]) if pd.notna(o["row_id"]) else None,
+                       int(o["journal_entry_id"]), int(o["project_id"]), ""))
+    return pd.DataFrame(issues, columns=ISSUE_COLUMNS), checked_rows
+
+
+def load_open_issues() -> pd.DataFrame:
+    """지난 실행에서 남은 미해결 불일치 (다음 실행마다 다시 검사)."""
+    df = run_query(
+        "SELECT kind, table_name, row_id, journal_entry_id, project_id, detail FROM reconcile_issues ORDER BY id",
+        fetch=True,
+    )
+    if df is None or df.empty:
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+    return df.rename(columns={"table_name": "table"})[ISSUE_COLUMNS]
+
+
+def _save_open_issues(issues: pd.DataFrame):
+    """미해결 목록 교체 (한 트랜잭션)."""
+    def work(tx):
+        tx.query("DELETE FROM reconcile_issues")
+        for kind, table, row_id, je_id, project_id, detail in issues[ISSUE_COLUMNS].itertuples(index=False):
+            tx.query(
+                """
+                INSERT INTO reconcile_issues (kind, table_name, row_id, journal_entry_id, project_id, detail)
+                VALUES (:kind, :table, :row_id, :je, :pid, :detail)
+                """,
+                {"kind": kind, "table": table, "row_id": None if pd.isna(row_id) else int(row_id),
+                 "je": None if pd.isna(je_id) else int(je_id),
+                 "pid": None if pd.isna(project_id) else int(project_id), "detail": detail},
+            )
+        return True
+    return run_transaction(work)
+
+
+def _recheck(issues: pd.DataFrame) -> pd.DataFrame:
+    """복구 후 해당 항목만 다시 검사 → 아직 남은 불일치."""
+    if issues.empty:
+        return issues
+    return _find_issues(None, None, False, issues)[0]
+
+
+def run_reconciliation(full: bool = False, repair: bool = False, actor: str = SYSTEM_ACTOR) -> ReconcileResult:
+    """
+    워터마크 이후 변경분 + 지난번 미해결 항목을 검사.
+    해결 안 된 불일치는 reconcile_issues에 남겨 다음 실행에서 다시 보므로 워터마크는 항상 전진.
+    """
+    mark = load_watermark()
+    since = None if full else mark["changed_since"]
+    last_id = 0 if full else int(mark["last_journal_id"] or 0)
+    # 검사 시작 전 시각/전표 id를 다음 워터마크로 (검사 중 바뀐 행은 다음 실행에서 다시 봄)
+    next_since, next_last_id = _db_now()
+
+    result = ReconcileResult(changed_since=since, last_journal_id=last_id)
+    result.issues, result.checked_rows = _find_issues(since, last_id, full, load_open_issues())
+    result.checked_entries = next_last_id - last_id
+
+    remaining = result.issues
+    if repair and not result.issues.empty:
+        result.repaired = repair_issues(result.issues, actor)
+        remaining = _recheck(result.issues)
+    if _save_open_issues(remaining):
+        save_watermark(next_since, next_last_id, result.checked_rows, len(remaining))
+        if full:
+            save_watermark(next_since, next_last_id, result.checked_rows, len(remaining), name=FULL_WATERMARK_NAME)
+    return result
+
+
+@st.cache_data(show_spinner=False, ttl=TRUST_TTL_SEC)
+def _trust_state() -> tuple:
+    """(전체 검사 완료 여부, 미해결 불일치가 있는 프로젝트 id들)."""
+    mark = load_watermark(FULL_WATERMARK_NAME)
+    df = run_query("SELECT DISTINCT project_id FROM reconcile_issues WHERE project_id IS NOT NULL", fetch=True)
+    if df is None:
+        return False, frozenset()
+    return mark["ran_at"] is not None, frozenset(int(p) for p in df["project_id"])
+
+
+def journal_trusted(project_id: int) -> bool:
+    """
+    장부 합계를 화면/결산 KPI로 써도 되는지.
+    회계 모듈 도입 전 행, 예전에 장부를 안 고치던 수정/삭제가 있어 전체 대사(+복구)를 한 번 통과해야 함.
+    그 뒤에도 미해결 불일치가 남은 프로젝트는 운영 테이블 기준으로 계산.
+    """
+    full_done, flagged = _trust_state()
+    return full_done and int(project_id) not in flagged
+
+
+def repair_open_issues(actor: str = SYSTEM_ACTOR) -> tuple:
+    """저장된 미해결 불일치를 다시 검사해 복구. (복구 건수, 남은 불일치)."""
+    issues = _recheck(load_open_issues())
+    repaired = repair_issues(issues, actor) if not issues.empty else 0
+    remaining = _recheck(issues)
+    _save_open_issues(remaining)
+    return repaired, remaining
+
+
+def repair_issues(issues: pd.DataFrame, actor: str = SYSTEM_ACTOR) -> int:
+    """
+    고아/대체 전표는 먼저 역분개, 그 다음 행 문제는 현재 값으로 재분개.
+    (superseded 전표를 먼저 정리해야 repost_row가 또 다른 고아를 만들지 않음)
+    마감된 기간에 걸린 항목은 건너뜀.
+    """
+    repaired = 0
+    entry_issues = issues[issues["kind"].isin(["orphan", "superseded"])]
+    for je_id in entry_issues["journal_entry_id"]:
+        try:
+            if reverse_entry(int(je_id), actor):
+                repaired += 1
+        except PeriodClosedError:
+            continue  # 마감된 기간은 재개 후 복구
+    row_issues = issues.loc[~issues.index.isin(entry_issues.index), ["kind", "table", "row_id"]]
+    for kind, table, row_id in row_issues.itertuples(index=False):
+        if kind == "unposted" and claim_legacy_entry(table, int(row_id)):
+            repaired += 1
+            continue
+        try:
+            repost_row(table, int(row_id), actor)
+        except PeriodClosedError:
+            continue
+        repaired += 1
+    return repaired
+
+
+def main():
+    parser = argparse.ArgumentParser(description="운영 테이블 ↔ 장부 대사")
+    parser.add_argument("--full", action="store_true", help="워터마크 무시하고 전체 검사")
+    parser.add_argument("--repair", action="store_true", help="발견한 불일치를 역분개/재분개로 복구")
+    args = parser.parse_args()
+
+    result = run_reconciliation(full=args.full, repair=args.repair)
+    print(f"검사: 행 {result.checked_rows}건 / 새 전표 {result.checked_entries}건 (since {result.changed_since})")
+    for kind, group in result.issues.groupby("kind"):
+        print(f"  {ISSUE_LABELS[kind]}: {len(group)}건")
+    if args.repair:
+        print(f"복구: {result.repaired}건")
+    return 1 if len(result.issues) and not args.repair else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
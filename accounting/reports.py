@@ -0,0 +1,165 @@
+# accounting/reports.py
+"""
+복식부기 장부(journal_entries/journal_lines) 기반 보고서
+- 집계 쿼리 1회: 프로젝트 × 계정별 차변/대변 합계 (프로젝트 1개 또는 전체)
+- 계정과목표(accounts)는 별도 캐시 후 pandas에서 조인
+- 캐시 키는 프로젝트별 장부 버전(전표 수, 최대 id) → 새 전표가 생기면 해당 프로젝트만 다시 집계
+- 시산표 / 손익계산서 / 현금 현황 / 계정 유형별 합계 / KPI
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import pandas as pd
+import streamlit as st
+
+from db import run_query
+
+# 차변이 증가 방향인 계정 유형 (나머지는 대변)
+DEBIT_NORMAL = {"ASSET", "EXPENSE"}
+CASH_PREFIX = "11"                 # 1100 운영 현금, 1110 예비비 현금
+RECEIVABLE_CODE = "1200"           # 과잠 선지출 → 회수 대상
+INCOME_CODES = {"school_budget": "4100", "reserve_fund": "4110", "student_dues": "4120"}
+
+VERSION_TTL_SEC = 5
+
+BALANCE_COLUMNS = ["project_id", "code", "name", "type", "debit", "credit", "balance"]
+
+
+@st.cache_data(show_spinner=False)
+def chart_of_accounts() -> pd.DataFrame:
+    df = run_query("SELECT id, code, name, type FROM accounts ORDER BY code", fetch=True)
+    if df is None:
+        return pd.DataFrame(columns=["id", "code", "name", "type"])
+    return df
+
+
+@st.cache_data(show_spinner=False, ttl=VERSION_TTL_SEC)
+def journal_version(project_id: int = None) -> tuple:
+    """
+    (전표 수, 최대 전표 id). 전표는 추가만 되므로 이 값이 같으면 집계도 같음.
+    ix_journal_entries_project 인덱스만 읽는 가벼운 쿼리. 같은 인스턴스의 쓰기는 캐시를 비우고,
+    다른 인스턴스의 쓰기는 최대 VERSION_TTL_SEC 뒤에 반영.
+    """
+    where, params = ("WHERE project_id = :pid", {"pid": project_id}) if project_id is not None else ("", None)
+    df = run_query(f"SELECT COUNT(*) AS n, ISNULL(MAX(id), 0) AS max_id FROM journal_entries {where}", params, fetch=True)
+    if df is None or df.empty:
+        return (0, 0)
+    return (int(df.iloc[0]["n"]), int(df.iloc[0]["max_id"]))
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _account_totals(project_id: int, version: tuple) -> pd.DataFrame:
+    """
+    프로젝트 × 계정 합계 (project_id가 None이면 전체). version은 캐시 키로만 사용.
+    역분개된 전표와 역분개 전표는 서로 상쇄되므로 둘 다 제외 → 잔액은 같고 유입/지출 총액이 부풀지 않음.
+    """
+    where, params = ("AND je.project_id = :pid", {"pid": project_id}) if project_id is not None else ("", None)
+    df = run_query(
+        f"""
+        SELECT je.project_id, jl.account_id,
+               SUM(jl.debit) AS debit, SUM(jl.credit) AS credit
+        FROM journal_lines jl
+        JOIN journal_entries je ON je.id = jl.journal_entry_id
+        WHERE je.reversed_by_entry_id IS NULL AND je.reverses_entry_id IS NULL
+        {where}
+        GROUP BY je.project_id, jl.account_id
+        """,
+        params, fetch=True,
+    )
+    if df is None or df.empty:
+        return pd.DataFrame(columns=BALANCE_COLUMNS)
+
+    coa = chart_of_accounts()
+    merged = df.merge(coa, left_on="account_id", right_on="id", how="left")
+    merged[["debit", "credit"]] = merged[["debit", "credit"]].fillna(0).astype("int64")
+    merged["balance"] = _normal_balance(merged)
+    return merged[BALANCE_COLUMNS]
+
+
+def _normal_balance(df: pd.DataFrame) -> pd.Series:
+    return (df["debit"] - df["credit"]).where(df["type"].isin(DEBIT_NORMAL), df["credit"] - df["debit"])
+
+
+def account_balances(project_id: int = None) -> pd.DataFrame:
+    """프로젝트별 계정 잔액. project_id가 없으면 전체 프로젝트."""
+    return _account_totals(project_id, journal_version(project_id))
+
+
+def trial_balance(project_id: int = None) -> pd.DataFrame:
+    """계정과목표 전체(거래 없는 계정은 0) × 차변/대변/잔액."""
+    return _trial_balance(project_id, journal_version(project_id))
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _trial_balance(project_id: int, version: tuple) -> pd.DataFrame:
+    df = _account_totals(project_id, version)
+    coa = chart_of_accounts()[["code", "name", "type"]]
+    tb = df.astype({"debit": "int64", "credit": "int64"}).groupby("code", as_index=False)[["debit", "credit"]].sum()
+    tb = coa.merge(tb, on="code", how="left").fillna({"debit": 0, "credit": 0})
+    tb[["debit", "credit"]] = tb[["debit", "credit"]].astype("int64")
+    tb["balance"] = _normal_balance(tb)
+    return tb
+
+
+def type_summary(project_id: int = None) -> pd.DataFrame:
+    """계정 유형별(ASSET/INCOME/EXPENSE …) 합계."""
+    return trial_balance(project_id).groupby("type", as_index=False)[["debit", "credit", "balance"]].sum()
+
+
+def income_statement(project_id: int = None) -> dict:
+    tb = trial_balance(project_id)
+    income = tb[tb["type"] == "INCOME"][["code", "name", "balance"]]
+    expense = tb[tb["type"] == "EXPENSE"][["code", "name", "balance"]]
+    total_income, total_expense = int(income["balance"].sum()), int(expense["balance"].sum())
+    return {
+        "income": income.reset_index(drop=True),
+        "expense": expense.reset_index(drop=True),
+        "total_income": total_income,
+        "total_expense": total_expense,
+        "net_income": total_income - total_expense,
+    }
+
+
+def cash_position(project_id: int = None) -> pd.DataFrame:
+    tb = trial_balance(project_id)
+    return tb[tb["code"].astype(str).str.startswith(CASH_PREFIX)].reset_index(drop=True)
+
+
+@dataclass(frozen=True)
+class ProjectKpis:
+    """화면 KPI. 현금 계정 기준: 유입 = 11xx 차변, 지출 = 11xx 대변."""
+    cash_in: int
+    cash_out: int
+    cash_balance: int
+    school_budget: int
+    reserve: int
+    student_dues: int
+    receivable: int
+    net_income: int
+
+
+def project_kpis(project_id: int) -> Optional[ProjectKpis]:
+    """전표가 하나도 없는 프로젝트(회계 모듈 도입 이전 데이터)는 None."""
+    tb = trial_balance(project_id)
+    if not (tb["debit"].any() or tb["credit"].any()):
+        return None
+    by_code = tb.set_index("code")
+    cash = tb[tb["code"].astype(str).str.startswith(CASH_PREFIX)]
+
+    def credit(code):
+        return int(by_code["credit"].get(code, 0))
+
+    income = tb[tb["type"] == "INCOME"]["balance"].sum()
+    expense = tb[tb["type"] == "EXPENSE"]["balance"].sum()
+    return ProjectKpis(
+        cash_in=int(cash["debit"].sum()),
+        cash_out=int(cash["credit"].sum()),
+        cash_balance=int(cash["balance"].sum()),
+        school_budget=credit(INCOME_CODES["school_budget"]),
+        # 예비비 유입(4110) + 회수 입금(1200 대변)
+        reserve=credit(INCOME_CODES["reserve_fund"]) + credit(RECEIVABLE_CODE),
+        student_dues=credit(INCOME_CODES["student_dues"]),
+        receivable=int(by_code["balance"].get(RECEIVABLE_CODE, 0)),
+        net_income=int(income - expense),
+    )
@@ -1,6 +1,7 @@
 import pandas as pd
 from typing import Optional
-from db import run_query
+from accounting.periods import PeriodClosedError
+from db import Transaction, run_query, run_transaction
 
 ACCOUNT_SEED = [
     ("1100", "Cash:Operating", "ASSET"),
@@ -25,12 +26,6 @@ def init_accounting_accounts():
             {"code": code, "name": name, "type": acc_type}
         )
 
-def _account_id(code: str) -> int:
-    df = run_query("SELECT id FROM accounts WHERE code = :code", {"code": code}, fetch=True)
-    if df is None or df.empty:
-        raise ValueError(f"Unknown account code: {code}")
-    return int(df.iloc[0]["id"])
-
 def _compose_desc(base: str, extra_label: str) -> str:
     extra = (extra_label or "").strip()
     if not extra:
@@ -38,53 +33,242 @@ def _compose_desc(base: str, extra_label: str) -> str:
     return f"{base} - {extra}"
 
 def _post_journal(project_id: int, tx_date: str, description: str, source_kind: str,
-                  created_by: str, debit_code: str, credit_code: str, amount: int, memo: str = ""):
-    # Azure SQL의 OUTPUT INSERTED.id 사용
-    df_je = run_query(
+                  created_by: str, debit_code: str, credit_code: str, amount: int, memo: str = "",
+                  source_table: str = None, source_id: int = None, tx: Transaction = None):
+    """
+    전표 헤더 + 차변/대변 라인 + 운영 행 연결을 한 트랜잭션으로 (계정 id는 SQL 안에서 조회).
+    tx를 넘기면 그 트랜잭션 안에서 실행 (운영 행 수정/재분개와 같이 커밋).
+    마감된 날짜면 PeriodClosedError, 모르는 계정 코드면 ValueError (둘 다 아무것도 안 남음).
+    """
+    if tx is None:
+        return run_transaction(lambda t: _post_journal(
+            project_id, tx_date, description, source_kind, created_by, debit_code, credit_code, amount, memo,
+            source_table, source_id, tx=t,
+        ))
+    # Azure SQL의 OUTPUT INSERTED.id 사용 (마감된 날짜면 아무 행도 안 들어감)
+    df_je = tx.query(
         """
-        INSERT INTO journal_entries (project_id, tx_date, description, source_kind, created_by)
+        INSERT INTO journal_entries (project_id, tx_date, description, source_kind, created_by, source_table, source_id)
         OUTPUT INSERTED.id
-        VALUES (:pid, :date, :desc, :kind, :user)
+        SELECT :pid, :date, :desc, :kind, :user, :src_table, :src_id
+        WHERE NOT EXISTS (SELECT 1 FROM period_closes WHERE end_date >= :date)
         """,
-        {"pid": project_id, "date": tx_date, "desc": description, "kind": source_kind, "user": created_by},
+        {"pid": project_id, "date": tx_date, "desc": description, "kind": source_kind, "user": created_by,
+         "src_table": source_table, "src_id": source_id},
         fetch=True,
     )
-    if df_je is None or df_je.empty:
-        return None
+    if df_je.empty:
+        raise PeriodClosedError(f"Period closed: {tx_date}")
 
     je_id = int(df_je.iloc[0]["id"])
-    run_query(
+    df_lines = tx.query(
         """
         INSERT INTO journal_lines (journal_entry_id, account_id, debit, credit, memo)
-        VALUES (:je_id, :acc_id, :amount, 0, :memo)
-        """,
-        {"je_id": je_id, "acc_id": _account_id(debit_code), "amount": amount, "memo": memo},
-    )
-
-    run_query(
-        """
-        INSERT INTO journal_lines (journal_entry_id, account_id, debit, credit, memo)
-        VALUES (:je_id, :acc_id, 0, :amount, :memo)
+        OUTPUT INSERTED.id
+        SELECT :je_id, a.id,
+               CASE WHEN a.code = :debit THEN :amount ELSE 0 END,
+               CASE WHEN a.code = :credit THEN :amount ELSE 0 END,
+               :memo
+        FROM accounts a
+        WHERE a.code IN (:debit, :credit)
+          AND (SELECT COUNT(*) FROM accounts WHERE code IN (:debit, :credit)) = 2
         """,
-        {"je_id": je_id, "acc_id": _account_id(credit_code), "amount": amount, "memo": memo},
+        {"je_id": je_id, "debit": debit_code, "credit": credit_code, "amount": amount, "memo": memo},
+        fetch=True,
     )
+    if len(df_lines) != 2:
+        raise ValueError(f"Unknown account code: {debit_code} / {credit_code}")
 
+    if source_table:
+        _link_row(source_table, source_id, je_id, tx=tx)
     return je_id
 
+# ── 분개 규칙 (등록 / 재분개 / 대사에서 공통 사용) ─────────────────────────────
+INCOME_RULES = {
+    # source_type → (설명, source_kind, 차변, 대변)
+    "school_budget": ("학교/학과 지원금 입금", "SCHOOL_BUDGET", "1100", "4100"),
+    "reserve_fund": ("예비비/이월금 유입", "RESERVE_IN", "1110", "4110"),
+    "reserve_recovery": ("회수/정산 입금(예비비 복구)", "RESERVE_RECOVERY", "1110", "1200"),
+    "student_dues": ("학생회비 입금", "STUDENT_DUES", "1100", "4120"),
+}
+JACKET_ADVANCE_CATEGORY = "과잠 제작비(예비비 선지출)"
+
+def income_posting(source_type: str, extra_label: str = "") -> Optional[tuple]:
+    """(설명, source_kind, 차변, 대변). 모르는 source_type이면 None."""
+    rule = INCOME_RULES.get(source_type)
+    if rule is None:
+        return None
+    desc, kind, debit, credit = rule
+    return _compose_desc(desc, extra_label), kind, debit, credit
+
+def expense_posting(category: str, item: str) -> tuple:
+    """(설명, source_kind, 차변, 대변, memo)."""
+    if category == JACKET_ADVANCE_CATEGORY:
+        return f"{item} 선지출", "JACKET_ADVANCE", "1200", "1110", item
+    expense_code = "5110" if "과잠" in (category or "") else "5100"
+    return f"{item} 지출", "EXPENSE", expense_code, "1100", category
+
 def record_income_entry(
     project_id: int, tx_date: str, source_type: str, actor_name: str, amount: int, note: str = "", extra_label: str = "",
+    source_id: int = None, tx: Transaction = None,
 ) -> Optional[int]:
     if amount <= 0: return None
-    if source_type == "school_budget": return _post_journal(project_id, tx_date, _compose_desc("학교/학과 지원금 입금", extra_label), "SCHOOL_BUDGET", actor_name, "1100", "4100", amount, note)
-    if source_type == "reserve_fund": return _post_journal(project_id, tx_date, _compose_desc("예비비/이월금 유입", extra_label), "RESERVE_IN", actor_name, "1110", "4110", amount, note)
-    if source_type == "reserve_recovery": return _post_journal(project_id, tx_date, _compose_desc("회수/정산 입금(예비비 복구)", extra_label), "RESERVE_RECOVERY", actor_name, "1110", "1200", amount, note)
-    if source_type == "student_dues": return _post_journal(project_id, tx_date, _compose_desc("학생회비 입금", extra_label), "STUDENT_DUES", actor_name, "1100", "4120", amount, note)
-    return None
+    posting = income_posting(source_type, extra_label)
+    if posting is None: return None
+    desc, kind, debit, credit = posting
+    table = "members" if source_type == "student_dues" else "budget_entries"
+    return _post_journal(project_id, tx_date, desc, kind, actor_name, debit, credit, amount, note,
+                         source_table=table if source_id is not None else None, source_id=source_id, tx=tx)
 
 def record_expense_entry(
-    project_id: int, tx_date: str, category: str, item: str, amount: int, actor_name: str,
+    project_id: int, tx_date: str, category: str, item: str, amount: int, actor_name: str, source_id: int = None,
+    tx: Transaction = None,
 ):
     if amount <= 0: return None
-    if category == "과잠 제작비(예비비 선지출)": return _post_journal(project_id, tx_date, f"{item} 선지출", "JACKET_ADVANCE", actor_name, "1200", "1110", amount, item)
-    expense_code = "5110" if "과잠" in category else "5100"
-    return _post_journal(project_id, tx_date, f"{item} 지출", "EXPENSE", actor_name, expense_code, "1100", amount, category)
+    desc, kind, debit, credit, memo = expense_posting(category, item)
+    return _post_journal(project_id, tx_date, desc, kind, actor_name, debit, credit, amount, memo,
+                         source_table="expenses" if source_id is not None else None, source_id=source_id, tx=tx)
+
+# ── 운영 행 ↔ 전표 연결 / 역분개 ───────────────────────────────────────────────
+# 운영 테이블 → 분개에 필요한 컬럼 (tx_date, source_type/category, item, amount, note, extra_label, actor)
+SOURCE_ROW_SQL = {
+    "budget_entries": """
+        SELECT id, project_id, entry_date AS tx_date, source_type, '' AS category, '' AS item, amount,
+               ISNULL(note, '') AS note, ISNULL(extra_label, '') AS extra_label,
+               contributor_name AS actor, journal_entry_id, updated_at
+        FROM budget_entries
+    """,
+    "members": """
+        SELECT id, project_id, paid_date AS tx_date, 'student_dues' AS source_type, '' AS category, '' AS item,
+               deposit_amount AS amount, ISNULL(note, '') AS note, '' AS extra_label,
+               name AS actor, journal_entry_id, updated_at
+        FROM members
+    """,
+    "expenses": """
+        SELECT id, project_id, date AS tx_date, '' AS source_type, category, item, amount,
+               '' AS note, '' AS extra_label, '' AS actor, journal_entry_id, updated_at
+        FROM expenses
+    """,
+}
+
+def expected_posting(table: str, row) -> Optional[tuple]:
+    """운영 행이 가져야 할 분개 (차변, 대변, 금액). 금액 0 이하 등 분개 대상이 아니면 None."""
+    amount = int(row["amount"] or 0)
+    if amount <= 0:
+        return None
+    if table == "expenses":
+        _, _, debit, credit, _ = expense_posting(row["category"], row["item"])
+        return debit, credit, amount
+    posting = income_posting(row["source_type"], row["extra_label"])
+    if posting is None:
+        return None
+    return posting[2], posting[3], amount
+
+def _link_row(table: str, row_id: int, je_id: Optional[int], tx: Transaction = None):
+    if table not in SOURCE_ROW_SQL:
+        raise ValueError(f"Unknown source table: {table}")
+    query = tx.query if tx is not None else run_query
+    query(f"UPDATE {table} SET journal_entry_id = :je WHERE id = :id", {"je": je_id, "id": row_id})
+
+def _load_row(table: str, row_id: int, tx: Transaction = None):
+    query = tx.query if tx is not None else run_query
+    df = query(SOURCE_ROW_SQL[table] + " WHERE id = :id", {"id": row_id}, fetch=True)
+    if df is None or df.empty:
+        return None
+    return df.iloc[0]
+
+def reverse_entry(je_id: int, actor_name: str, tx: Transaction = None) -> Optional[int]:
+    """
+    전표를 지우지 않고 차변/대변을 뒤집은 역분개 전표를 추가.
+    헤더/라인 복사/원 전표 표시를 한 트랜잭션으로 (라인 복사가 실패하면 원 전표는 그대로 살아 있음).
+    이미 역분개된 전표, 역분개 전표 자체는 대상 아님 → None. 마감된 기간의 전표면 PeriodClosedError.
+    """
+    if tx is None:
+        return run_transaction(lambda t: reverse_entry(je_id, actor_name, tx=t))
+    df_new = tx.query(
+        """
+        INSERT INTO journal_entries
+            (project_id, tx_date, description, source_kind, created_by, source_table, source_id, reverses_entry_id)
+        OUTPUT INSERTED.id
+        SELECT project_id, tx_date, CONCAT(N'[역분개] ', description), source_kind, :user,
+               source_table, source_id, id
+        FROM journal_entries
+        WHERE id = :je AND reversed_by_entry_id IS NULL AND reverses_entry_id IS NULL
+          AND NOT EXISTS (SELECT 1 FROM period_closes pc WHERE pc.end_date >= journal_entries.tx_date)
+        """,
+        {"je": je_id, "user": actor_name},
+        fetch=True,
+    )
+    if df_new.empty:
+        active = tx.query(
+            "SELECT tx_date FROM journal_entries WHERE id = :je AND reversed_by_entry_id IS NULL AND reverses_entry_id IS NULL",
+            {"je": je_id}, fetch=True,
+        )
+        if not active.empty:
+            # 살아 있는 전표인데 못 뒤집음 = 마감된 기간 (재분개로 이중 계상되지 않도록 중단)
+            raise PeriodClosedError(f"Period closed: {active.iloc[0]['tx_date']}")
+        return None
+
+    new_id = int(df_new.iloc[0]["id"])
+    # 차대 불일치 트리거(trg_journal_lines_balanced) 등으로 실패하면 위 헤더까지 같이 롤백
+    tx.query(
+        """
+        INSERT INTO journal_lines (journal_entry_id, account_id, debit, credit, memo)
+        SELECT :new_id, account_id, credit, debit, memo
+        FROM journal_lines
+        WHERE journal_entry_id = :je
+        """,
+        {"new_id": new_id, "je": je_id},
+    )
+    tx.query("UPDATE journal_entries SET reversed_by_entry_id = :new_id WHERE id = :je", {"new_id": new_id, "je": je_id})
+    return new_id
+
+def repost_row(table: str, row_id: int, actor_name: str = None, tx: Transaction = None) -> Optional[int]:
+    """
+    운영 행 수정 후 호출: 연결된 전표를 역분개하고 현재 값으로 다시 분개해 연결 (한 트랜잭션).
+    마감된 기간이면 PeriodClosedError (장부는 그대로).
+    """
+    if tx is None:
+        return run_transaction(lambda t: repost_row(table, row_id, actor_name, tx=t))
+    row = _load_row(table, row_id, tx=tx)
+    if row is None:
+        return None
+    if pd.notna(row["journal_entry_id"]):
+        reverse_entry(int(row["journal_entry_id"]), actor_name or row["actor"], tx=tx)
+        _link_row(table, row_id, None, tx=tx)
+
+    project_id, tx_date, amount = int(row["project_id"]), row["tx_date"], int(row["amount"] or 0)
+    if table == "expenses":
+        return record_expense_entry(project_id, tx_date, row["category"], row["item"], amount,
+                                    actor_name or "", source_id=row_id, tx=tx)
+    return record_income_entry(project_id, tx_date, row["source_type"], actor_name or row["actor"], amount,
+                               note=row["note"], extra_label=row["extra_label"], source_id=row_id, tx=tx)
+
+def reverse_row(table: str, row_id: int, actor_name: str, tx: Transaction = None) -> Optional[int]:
+    """운영 행 삭제 전에 호출: 연결된 전표를 역분개 (장부에는 원 전표 + 역분개가 남음)."""
+    row = _load_row(table, row_id, tx=tx)
+    if row is None or pd.isna(row["journal_entry_id"]):
+        return None
+    return reverse_entry(int(row["journal_entry_id"]), actor_name, tx=tx)
+
+def update_row(table: str, row_id: int, query: str, params: dict, actor_name: str = None) -> Optional[bool]:
+    """
+    운영 행 UPDATE + 재분개를 한 트랜잭션으로.
+    원래/새 날짜 중 하나라도 마감된 기간이면 PeriodClosedError (UPDATE도 롤백). DB 오류면 None.
+    """
+    def work(tx):
+        tx.query(query, params)
+        repost_row(table, row_id, actor_name, tx=tx)
+        return True
+    return run_transaction(work)
+
+def delete_row(table: str, row_id: int, actor_name: str) -> Optional[bool]:
+    """역분개 후 운영 행 DELETE (한 트랜잭션). 마감된 기간이면 PeriodClosedError (행은 그대로). DB 오류면 None."""
+    if table not in SOURCE_ROW_SQL:
+        raise ValueError(f"Unknown source table: {table}")
+
+    def work(tx):
+        reverse_row(table, row_id, actor_name, tx=tx)
+        tx.query(f"DELETE FROM {table} WHERE id = :id", {"id": row_id})
+        return True
+    return run_transaction(work)
@@ -1,17 +1,31 @@
 import pandas as pd
 from groq import Groq
 
+import anomaly
+from receipts.parser import ocr_available, parse_receipt, parse_receipts_batch
+
+def receipt_parsing_available() -> bool:
+    return ocr_available()
+
 def parse_receipt_image(client, image_bytes: bytes, mime_type: str = "image/jpeg") -> dict:
     """
-    ⚠️ Groq은 이미지 입력 미지원 → 텍스트 안내 반환
+    로컬 OCR로 영수증을 읽고 날짜/합계/상호를 추출 (이미지 해시 기준 캐시).
+    Groq은 이미지 입력 미지원 → RECEIPT_PARSER_BACKEND=llm이면 OCR 텍스트만 LLM으로 정리.
+    OCR 엔진이 없으면 수동 입력 안내를 반환.
     """
-    return {
-        "date": None, "item": "", "amount": 0,
-        "category": "기타",
-        "raw_text": "영수증 이미지 파싱은 Gemini 전용 기능입니다. 수동 입력해 주세요."
-    }
+    return parse_receipt(image_bytes, client)
+
+def parse_receipt_images(client, images: list) -> list:
+    """여러 장 한꺼번에 (캐시에 없는 것만 프로세스 풀에서 OCR). 입력 순서대로 결과."""
+    return parse_receipts_batch(images, client)
 
-def run_ai_audit(client, df_expenses: pd.DataFrame, total_budget: int):
+def run_ai_audit(client, df_expenses: pd.DataFrame, total_budget: int, anomalies: pd.DataFrame = None):
+    """
+    LLM 감사 보고서 + 분류별 위험도 차트 데이터.
+    anomalies: anomaly.detect 결과 (없으면 빈 결과). 프롬프트의 이상 징후 섹션과 차트에 같이 사용.
+    """
+    if anomalies is None:
+        anomalies = pd.DataFrame(columns=anomaly.RESULT_COLUMNS)
     total_spent  = int(df_expenses["amount"].sum()) if not df_expenses.empty else 0
     balance      = total_budget - total_spent
     usage_rate   = (total_spent / total_budget * 100) if total_budget > 0 else 0
@@ -76,6 +90,9 @@ def run_ai_audit(client, df_expenses: pd.DataFrame, total_budget: int):
 ### 고액 지출 TOP 3
 {top3_str}
 
+### 통계 기반 이상 징후 (분류별 robust z-score, 중복, 시간외 입력, 결재 기준 쪼개기)
+{anomaly.prompt_section(anomalies)}
+
 ---
 
 ## 🎯 감사 수행 지침
@@ -92,6 +109,7 @@ def run_ai_audit(client, df_expenses: pd.DataFrame, total_budget: int):
 **[분석 항목 2: 현미경 지출 분석]**
 - 30% 이상 편중 카테고리를 **'불균형 지출'**로 공식 지적
 - TOP 3 고액 지출 타당성 검토
+- 통계 기반 이상 징후 목록의 각 건이 실제 문제인지, 해명이 필요한지 판단
 
 **[분석 항목 3: 리스크 레이더]**
 - 예산 초과 가능성 및 원인 분석
@@ -128,18 +146,7 @@ def run_ai_audit(client, df_expenses: pd.DataFrame, total_budget: int):
         max_tokens=2048,
     )
 
-    if not df_expenses.empty:
-        risk_data = [
-            {"항목": row[cat_col], "위험도": row["비중(%)"]}
-            for _, row in category_stats.iterrows()
-        ]
-    else:
-        risk_data = []
-
-    risk_df = (
-        pd.DataFrame(risk_data) if risk_data
-        else pd.DataFrame(columns=["항목", "위험도"])
-    )
+    risk_df = anomaly.category_risk(anomalies)
 
     return response.choices[0].message.content, risk_df
 
@@ -0,0 +1,202 @@
+# anomaly.py
+"""
+지출 이상 징후 탐지 (로컬, pandas/NumPy 벡터 연산만 사용)
+- 분류별 robust z-score: 중앙값/MAD 기준 (MAD=0이면 평균절대편차로 대체), |z| > 3.5
+- 중복 의심: 같은 날 같은 금액 / 며칠 안에 같은 금액 / 같은 날·같은 분류에서 금액 1% 이내
+- 시간외 입력: created_at 기준 주말, 심야(23~6시). DB 시각(Azure SQL GETDATE = UTC) → 한국 시각 보정
+- 결재 기준 회피: 기준 금액 바로 아래 지출, 같은 분류에서 하루 이틀 사이 쪼개서 합치면 기준을 넘는 지출
+- 결과는 지출 행별 위험도(0~1) + 분류별 위험도(0~100) → 결산 차트와 AI 감사 프롬프트에 같이 사용
+- 기준 금액/시차는 system_config(anomaly_thresholds, anomaly_clock_offset_hours)로 조정
+"""
+
+import numpy as np
+import pandas as pd
+
+from system_config import get_system_config
+
+Z_CUTOFF = 3.5              # Iglewicz-Hoaglin 권장값
+MIN_GROUP_SIZE = 5          # 분류 표본이 이보다 적으면 z-score 생략
+NEAR_DUP_DAYS = 3
+NEAR_AMOUNT_RATIO = 0.01
+SPLIT_WINDOW_DAYS = 1
+SPLIT_FLOOR = 0.9           # 기준 금액의 90% 이상 ~ 기준 미만 = "바로 아래"
+SPLIT_MIN_SHARE = 0.4       # 쪼개기 판단 시 기준의 40% 미만 소액은 제외
+LATE_START, LATE_END = 23, 6
+DEFAULT_THRESHOLDS = (100_000, 300_000, 500_000, 1_000_000)
+DEFAULT_CLOCK_OFFSET_HOURS = 9
+
+# 징후 → (표시 이름, 가중치). 행 위험도 = 1 - Π(1 - 가중치)
+FLAGS = {
+    "outlier":     ("분류 대비 이상 금액", 0.6),
+    "duplicate":   ("같은 날 같은 금액", 0.7),
+    "near_dup":    ("유사 중복", 0.4),
+    "split":       ("쪼개기 의심", 0.6),
+    "just_under":  ("결재 기준 바로 아래", 0.2),
+    "weekend":     ("주말 입력", 0.15),
+    "late_night":  ("심야 입력", 0.15),
+}
+RESULT_COLUMNS = ["id", "날짜", "분류", "내역", "금액", "z", *FLAGS, "징후", "위험도"]
+
+
+def settings() -> tuple:
+    """(기준 금액들, DB 시각 → 한국 시각 보정 시간)."""
+    config = get_system_config()
+    raw = config.get("anomaly_thresholds", "")
+    try:
+        thresholds = tuple(sorted(int(v) for v in str(raw).split(",") if v.strip())) or DEFAULT_THRESHOLDS
+    except ValueError:
+        thresholds = DEFAULT_THRESHOLDS
+    return thresholds, config.get_int("anomaly_clock_offset_hours", DEFAULT_CLOCK_OFFSET_HOURS)
+
+
+def _robust_z(amount: pd.Series, category: pd.Series) -> pd.Series:
+    med = amount.groupby(category).transform("median")
+    dev = (amount - med).abs()
+    mad = dev.groupby(category).transform("median")
+    mean_ad = dev.groupby(category).transform("mean")
+    scale = np.where(mad > 0, mad / 0.6745, mean_ad * 1.2533)
+    z = np.divide((amount - med).to_numpy(), scale, out=np.zeros(len(amount)), where=scale > 0)
+    return pd.Series(z, index=amount.index)
+
+
+def _window_pairs(frame: pd.DataFrame, key: str, days: int) -> pd.DataFrame:
+    """같은 key에서 날짜 차이가 days 이내인 (왼쪽, 오른쪽) 행 쌍 (자기 자신 제외). 날짜 펼치기 + 동등 조인."""
+    left = frame[["row", key, "day", "amount"]]
+    offsets = np.arange(-days, days + 1)
+    right = frame.loc[frame.index.repeat(len(offsets)), ["row", key, "day", "amount"]]
+    right = right.assign(day_r=right["day"], day=right["day"].to_numpy() + np.tile(offsets, len(frame)))
+    pairs = left.merge(right, on=[key, "day"], suffixes=("", "_r"))
+    return pairs[pairs["row"] != pairs["row_r"]]
+
+
+def _split_flags(dated: pd.DataFrame, thresholds, size: int) -> tuple:
+    """(쪼개기 의심, 기준 바로 아래) 불리언 배열 (전체 행 기준 위치)."""
+    split = np.zeros(size, dtype=bool)
+    just_under = np.zeros(size, dtype=bool)
+    rows = dated["row"].to_numpy()
+    amount = dated["amount"].to_numpy()
+    for t in thresholds:
+        just_under[rows[(amount >= SPLIT_FLOOR * t) & (amount < t)]] = True
+
+    pieces = dated[(dated["amount"] >= SPLIT_MIN_SHARE * min(thresholds)) & (dated["amount"] < max(thresholds))]
+    if pieces.empty:
+        return split, just_under
+    pairs = _window_pairs(pieces, "category", SPLIT_WINDOW_DAYS)
+    left, a, b = pairs["row"].to_numpy(), pairs["amount"].to_numpy(), pairs["amount_r"].to_numpy()
+    own = np.zeros(size)
+    own[rows] = amount
+    for t in thresholds:
+        band = (a < t) & (b < t) & (a >= SPLIT_MIN_SHARE * t) & (b >= SPLIT_MIN_SHARE * t)
+        if not band.any():
+            continue
+        partners = np.bincount(left[band], weights=b[band], minlength=size)
+        split |= (partners > 0) & (own + partners >= t)
+    return split, just_under & ~split
+
+
+def detect(expenses: pd.DataFrame, thresholds=None, clock_offset_hours=None) -> pd.DataFrame:
+    """
+    expenses: ProjectSnapshot.expenses 모양 (id, date, category, item, amount, created_at).
+    반환: 지출 행별 징후 플래그 + 위험도, 위험도 내림차순.
+    """
+    if expenses is None or expenses.empty:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    if thresholds is None or clock_offset_hours is None:
+        default_thresholds, default_offset = settings()
+        thresholds = thresholds or default_thresholds
+        clock_offset_hours = default_offset if clock_offset_hours is None else clock_offset_hours
+
+    frame = pd.DataFrame({
+        "row": np.arange(len(expenses)),
+        "category": expenses["category"].fillna("기타").to_numpy(),
+        "amount": pd.to_numeric(expenses["amount"], errors="coerce").fillna(0).to_numpy(dtype="float64"),
+    })
+    dates = pd.to_datetime(expenses["date"], errors="coerce").reset_index(drop=True)
+    frame["day"] = (dates - pd.Timestamp("1970-01-01")).dt.days.fillna(-1).astype("int64")
+    dated = frame[frame["day"] >= 0]
+
+    z = _robust_z(frame["amount"], frame["category"])
+    group_size = frame.groupby("category")["amount"].transform("size")
+    outlier = ((group_size >= MIN_GROUP_SIZE) & (z.abs() > Z_CUTOFF)).to_numpy()
+
+    positive = dated[dated["amount"] > 0]
+    p_row, p_day, p_amount = positive["row"].to_numpy(), positive["day"].to_numpy(), positive["amount"].to_numpy()
+    p_cat = pd.factorize(positive["category"])[0]
+    duplicate = np.zeros(len(frame), dtype=bool)
+    near_dup = np.zeros(len(frame), dtype=bool)
+
+    # 같은 금액끼리 날짜순 → 이웃 간격 0일 = 중복, 1~N일 = 유사 중복
+    order = np.lexsort((p_day, p_amount))
+    rows, gap = p_row[order], np.diff(p_day[order])
+    same_amount = np.diff(p_amount[order]) == 0
+    for mask, target in ((same_amount & (gap == 0), duplicate),
+                         (same_amount & (gap > 0) & (gap <= NEAR_DUP_DAYS), near_dup)):
+        target[rows[1:][mask]] = True
+        target[rows[:-1][mask]] = True
+
+    # 같은 날·같은 분류에서 금액순 → 이웃 금액 차이 1% 이내
+    order = np.lexsort((p_amount, p_cat, p_day))
+    rows, amounts = p_row[order], p_amount[order]
+    step = np.diff(amounts)
+    close = ((np.diff(p_day[order]) == 0) & (np.diff(p_cat[order]) == 0)
+             & (step > 0) & (step <= amounts[1:] * NEAR_AMOUNT_RATIO))
+    near_dup[rows[1:][close]] = True
+    near_dup[rows[:-1][close]] = True
+    near_dup &= ~duplicate
+
+    split, just_under = _split_flags(dated, thresholds, len(frame))
+
+    if "created_at" in expenses.columns:
+        local = pd.to_datetime(expenses["created_at"], errors="coerce").reset_index(drop=True) + pd.Timedelta(hours=clock_offset_hours)
+        weekend = (local.dt.dayofweek >= 5).to_numpy()
+        late_night = ((local.dt.hour >= LATE_START) | (local.dt.hour < LATE_END)).to_numpy() & local.notna().to_numpy()
+    else:
+        weekend = late_night = np.zeros(len(frame), dtype=bool)
+
+    result = pd.DataFrame({
+        "id": expenses["id"].to_numpy() if "id" in expenses.columns else frame["row"].to_numpy(),
+        "날짜": expenses["date"].to_numpy(),
+        "분류": frame["category"],
+        "내역": expenses["item"].to_numpy(),
+        "금액": frame["amount"].astype("int64"),
+        "z": z.round(2),
+        "outlier": outlier, "duplicate": duplicate, "near_dup": near_dup,
+        "split": split, "just_under": just_under,
+        "weekend": weekend, "late_night": late_night,
+    })
+    flags = result[list(FLAGS)].to_numpy()
+    weights = np.array([w for _, w in FLAGS.values()])
+    result["위험도"] = (1 - np.prod(np.where(flags, 1 - weights, 1.0), axis=1)).round(3)
+    labels = pd.Series("", index=result.index)
+    for code, (label, _) in FLAGS.items():
+        labels = labels + np.where(result[code], label + ", ", "")
+    result["징후"] = labels.str.rstrip(", ")
+    return result.sort_values(["위험도", "금액"], ascending=False, kind="stable")[RESULT_COLUMNS].reset_index(drop=True)
+
+
+def category_risk(result: pd.DataFrame) -> pd.DataFrame:
+    """분류별 위험도(0~100) = 금액 가중 평균 행 위험도. 결산 차트 모양 (항목, 위험도)."""
+    if result.empty:
+        return pd.DataFrame(columns=["항목", "위험도"])
+    weight = result["금액"].clip(lower=1)
+    scored = result.assign(_w=weight, _wr=weight * result["위험도"])
+    grouped = scored.groupby("분류")[["_w", "_wr"]].sum()
+    risk = (grouped["_wr"] / grouped["_w"] * 100).round(1)
+    return risk.rename("위험도").rename_axis("항목").reset_index().sort_values("위험도", ascending=False)
+
+
+def flagged(result: pd.DataFrame) -> pd.DataFrame:
+    return result[result["징후"] != ""]
+
+
+def prompt_section(result: pd.DataFrame, limit: int = 10) -> str:
+    """AI 감사 프롬프트용 요약 (징후별 건수 + 위험도 상위 지출)."""
+    hits = flagged(result)
+    if hits.empty:
+        return "로컬 탐지 결과 이상 징후 없음"
+    counts = "\n".join(
+        f"- {label}: {int(result[code].sum())}건"
+        for code, (label, _) in FLAGS.items() if result[code].any()
+    )
+    top = hits.head(limit)[["날짜", "분류", "내역", "금액", "z", "징후", "위험도"]].to_markdown(index=False)
+    return f"{counts}\n\n{top}"
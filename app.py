@@ -1,82 +1,13 @@
-import inspect
-import pandas as pd
 import streamlit as st
-from importlib import import_module
 
+import profiler
+import query_log
 from config import init_page, init_ai
-from db import init_db, run_query
+from db import DatabaseUnavailable, init_db
 from security import check_rubicon_security
 from sidebar import render_sidebar
-
-def _resolve_tab_renderer(module_name: str, *candidate_names: str):
-    module = import_module(module_name)
-    for name in candidate_names:
-        fn = getattr(module, name, None)
-        if callable(fn):
-            return fn
-    raise ImportError(f"{module_name}에서 사용할 수 있는 렌더 함수를 찾지 못했습니다: {candidate_names}")
-
-def _call_with_supported_args(fn, **kwargs):
-    sig = inspect.signature(fn)
-    bound = {k: v for k, v in kwargs.items() if k in sig.parameters}
-
-    # **kwargs 파라미터가 있으면 전부 넘기기
-    for param in sig.parameters.values():
-        if param.kind == inspect.Parameter.VAR_KEYWORD:
-            return fn(**kwargs)
-
-    if not bound and kwargs:
-        params = list(sig.parameters.keys())
-        if params:
-            if len(params) == 1:
-                return fn(kwargs.get("current_project_id"))
-            if len(params) >= 2:
-                return fn(kwargs.get("current_project_id"), kwargs.get("user_role"))
-
-    return fn(**bound)
-
-def _fallback_budget_data(current_project_id: int):
-    df_budget = run_query(
-        "SELECT COALESCE(SUM(amount), 0) AS total FROM budget_entries WHERE project_id = :pid",
-        {"pid": current_project_id}, fetch=True,
-    )
-    budget_total = int(df_budget.iloc[0]["total"]) if (df_budget is not None and not df_budget.empty) else 0
-
-    df_members_raw = run_query(
-        "SELECT paid_date, name, student_id, deposit_amount, note FROM members WHERE project_id = :pid",
-        {"pid": current_project_id}, fetch=True,
-    )
-    if df_members_raw is not None and not df_members_raw.empty:
-        df_members = df_members_raw.rename(columns={
-            "paid_date": "납부일", "name": "이름", "student_id": "학번",
-            "deposit_amount": "납부액", "note": "비고"
-        })
-    else:
-        df_members = pd.DataFrame(columns=["납부일", "이름", "학번", "납부액", "비고"])
-
-    total_student_dues = int(df_members["납부액"].sum()) if not df_members.empty else 0
-    return budget_total + total_student_dues, total_student_dues, df_members
-
-def _fallback_expense_data(current_project_id: int):
-    df_exp = run_query(
-        "SELECT id, date, item, amount, category FROM expenses WHERE project_id = :pid",
-        {"pid": current_project_id}, fetch=True,
-    )
-    if df_exp is not None and not df_exp.empty:
-        df = df_exp.rename(columns={"id": "ID", "date": "날짜", "item": "항목", "amount": "금액", "category": "분류"})
-        return int(df["금액"].sum()), df
-    return 0, pd.DataFrame(columns=["ID", "날짜", "항목", "금액", "분류"])
-
-def _normalize_budget_result(result, current_project_id: int):
-    if isinstance(result, tuple) and len(result) == 3:
-        return result
-    return _fallback_budget_data(current_project_id)
-
-def _normalize_expense_result(result, current_project_id: int):
-    if isinstance(result, tuple) and len(result) == 2:
-        return result
-    return _fallback_expense_data(current_project_id)
-
+from tabs.context import RenderContext, load_project_snapshot
+from tabs.registry import TabSpec, load_tabs
 
 def _render_db_connection_error(err: Exception):
     msg = str(err)
@@ -95,25 +26,56 @@ def _render_db_connection_error(err: Exception):
 
     st.stop()
 
-render_budget_tab = _resolve_tab_renderer(
-    "tabs.tab_budget", "render_budget_tab", "render_budget", "render",
-)
-render_expense_tab = _resolve_tab_renderer(
-    "tabs.tab_expense", "render_expense_tab", "render_expense", "render",
-)
-render_summary_tab = _resolve_tab_renderer(
-    "tabs.tab_summary", "render_summary_tab", "render_summary", "render",
-)
-render_ledger_tab = _resolve_tab_renderer(
-    "tabs.tab_ledger", "render_ledger_tab", "render",
-)
+def _render_db_waking_up(err: DatabaseUnavailable):
+    st.warning(
+        "⏳ 데이터베이스가 깨어나는 중이에요. "
+        f"약 {int(err.retry_after) + 1}초 후 새로고침하면 다시 연결됩니다."
+    )
+    st.stop()
+
+TABS = load_tabs()
+
+def _select_view(tabs: list[TabSpec]) -> TabSpec:
+    """
+    st.tabs는 모든 탭을 매 rerun마다 실행하므로, 선택된 화면 하나만 렌더링.
+    선택 상태는 session_state + ?view= 쿼리 파라미터로 유지 (새로고침/링크 공유 가능).
+    """
+    keys = [spec.key for spec in tabs]
+    if "active_view" not in st.session_state:
+        requested = st.query_params.get("view")
+        st.session_state["active_view"] = requested if requested in keys else keys[0]
+
+    labels = {spec.key: spec.label for spec in tabs}
+    active = st.radio(
+        "화면 선택", keys,
+        format_func=labels.get,
+        horizontal=True,
+        key="active_view",
+        label_visibility="collapsed",
+    )
+    st.query_params["view"] = active
+    return next(spec for spec in tabs if spec.key == active)
 
 def main():
+    query_log.begin_rerun()
+    try:
+        with profiler.session():
+            _run()
+        profiler.render_report()
+    finally:
+        # 다음 rerun의 "성능" 패널에서 보여줄 이번 rerun 쿼리 리포트
+        st.session_state["last_query_report"] = query_log.end_rerun()
+
+def _run():
     init_page()
-    client, ai_available = init_ai()
+    with profiler.section("init_ai"):
+        client, ai_available = init_ai()
 
     try:
-        init_db()
+        with profiler.section("init_db"):
+            init_db()
+    except DatabaseUnavailable as e:
+        _render_db_waking_up(e)
     except Exception as e:
         _render_db_connection_error(e)
 
@@ -121,7 +83,8 @@ def main():
 
     check_rubicon_security()
 
-    current_user, selected_project_name, current_project_id = render_sidebar(ai_available)
+    with profiler.section("sidebar"):
+        current_user, selected_project_name, current_project_id = render_sidebar(ai_available)
 
     check_rubicon_security(current_user)
 
@@ -130,58 +93,19 @@ def main():
     if current_user.get("role") not in {"admin", "treasurer"}:
         st.caption(f"👋 안녕하세요, **{current_user.get('name')}** 학우님! 꼼꼼한 기록 부탁드려요.")
 
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "💰 예산 조성 (수입)",
-        "💸 지출 내역",
-        "📊 최종 결산",
-        "📒 통합 가계부",
-    ])
-
-    with tab1:
-        budget_result = _call_with_supported_args(
-            render_budget_tab,
-            current_project_id=current_project_id,
-            project_id=current_project_id,
-            user_role=current_user.get("role"),
-            current_user=current_user,
-        )
-        total_budget, total_student_dues, df_members = _normalize_budget_result(
-            budget_result, current_project_id,
-        )
-
-    with tab2:
-        expense_result = _call_with_supported_args(
-            render_expense_tab,
-            current_project_id=current_project_id,
-            project_id=current_project_id,
-            user_role=current_user.get("role"),
-            current_user=current_user,
-        )
-        total_expense, df_expenses = _normalize_expense_result(
-            expense_result, current_project_id,
-        )
-
-    with tab3:
-        _call_with_supported_args(
-            render_summary_tab,
-            selected_project_name=selected_project_name,
-            total_budget=total_budget,
-            total_expense=total_expense,
-            df_expenses=df_expenses,
-            df_members=df_members,
-            model=client,
-            ai_available=ai_available,
-            current_project_id=current_project_id,
-            project_id=current_project_id,
-            user_role=current_user.get("role"),
-            current_user=current_user,
-        )
+    # 스냅샷은 접근 시 조회 → 선택된 화면이 쓰는 데이터만 불러옴
+    ctx = RenderContext(
+        project_id=current_project_id,
+        project_name=selected_project_name,
+        current_user=current_user,
+        snapshot=load_project_snapshot(current_project_id),
+        ai_client=client if ai_available else None,
+        ai_available=ai_available,
+    )
 
-    with tab4:
-        _call_with_supported_args(
-            render_ledger_tab,
-            current_project_id=current_project_id,
-        )
+    spec = _select_view(TABS)
+    with profiler.section(f"tab:{spec.key}"):
+        spec.render(ctx)
 
 if __name__ == "__main__":
     main()
@@ -1,9 +1,15 @@
 import datetime
+import decimal
+import gzip
+import hashlib
+import io
 import json
+import zipfile
 import pandas as pd
-from typing import Any, Tuple
+from typing import Tuple
 import streamlit as st
-from db import run_query
+from db import run_query, stream_query
+from receipts.storage import collect_orphan_blobs
 
 def _table_exists(table: str) -> bool:
     """Azure SQL에서 테이블 존재 확인"""
@@ -14,14 +20,6 @@ def _table_exists(table: str) -> bool:
     )
     return df is not None and not df.empty
 
-def _fetch_if_exists(table: str, query: str, params=None) -> list[dict[str, Any]]:
-    if not _table_exists(table):
-        return []
-    df = run_query(query, params, fetch=True)
-    if df is not None and not df.empty:
-        return df.astype(str).to_dict(orient="records")
-    return []
-
 def _ensure_archive_history_table():
     """Azure SQL용 IDENTITY 문법 적용"""
     run_query("""
@@ -37,51 +35,152 @@ def _ensure_archive_history_table():
         )
     """)
 
-def archive_project(project_id: int, current_user: dict, archive_reason: str) -> Tuple[str, str]:
+# 아카이브 v2: zip 안에 테이블별 gzip NDJSON + manifest.json
+# 테이블 → (존재 확인할 테이블, 조회 쿼리). 행은 stream_query로 청크 단위로 읽어 바로 압축
+ARCHIVE_FORMAT = "project-archive/v2"
+MANIFEST_NAME = "manifest.json"
+ARCHIVE_TABLES = {
+    "journal_entries": ("journal_entries", "SELECT * FROM journal_entries WHERE project_id = :pid ORDER BY id"),
+    "journal_lines": ("journal_lines", """
+        SELECT l.* FROM journal_lines l
+        WHERE l.journal_entry_id IN (SELECT e.id FROM journal_entries e WHERE e.project_id = :pid)
+        ORDER BY l.id
+    """),
+    "budget_entries": ("budget_entries", "SELECT * FROM budget_entries WHERE project_id = :pid ORDER BY id"),
+    "expenses": ("expenses", "SELECT * FROM expenses WHERE project_id = :pid ORDER BY id"),
+    "members": ("members", "SELECT * FROM members WHERE project_id = :pid ORDER BY id"),
+}
+_VERIFY_BLOCK = 1 << 20
+
+
+def _value_type(value) -> str:
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "number"
+    if isinstance(value, decimal.Decimal):
+        return "decimal"
+    if isinstance(value, datetime.datetime):
+        return "datetime"
+    if isinstance(value, datetime.date):
+        return "date"
+    return "string"
+
+
+def _column_type(series: pd.Series) -> str:
+    """컬럼 타입 (청크 기준). 값이 모두 NULL이면 "null" → 다음 청크에서 다시 판정."""
+    values = series.dropna()
+    if values.empty:
+        return "null"
+    if pd.api.types.is_bool_dtype(series):
+        return "boolean"
+    if pd.api.types.is_integer_dtype(series):
+        return "integer"
+    if pd.api.types.is_float_dtype(series):
+        # NULL 섞인 정수 컬럼은 pandas에서 float가 됨
+        return "integer" if (values % 1 == 0).all() else "number"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    return _value_type(values.iloc[0])
+
+
+def _to_ndjson(df: pd.DataFrame, schema: dict) -> bytes:
+    """타입을 유지한 NDJSON (정수는 정수, 시각은 ISO 문자열, NULL은 null)."""
+    out = df.copy()
+    for column, kind in schema.items():
+        if kind == "integer" and pd.api.types.is_float_dtype(out[column]):
+            out[column] = out[column].astype("Int64")
+        elif kind == "decimal":
+            out[column] = out[column].map(lambda v: None if v is None or pd.isna(v) else str(v))
+    text = out.to_json(orient="records", lines=True, date_format="iso", force_ascii=False)
+    return (text if text.endswith("\n") else text + "\n").encode("utf-8")
+
+
+def _write_table(zf: zipfile.ZipFile, name: str, query: str, params: dict) -> dict:
+    """쿼리 결과를 청크마다 NDJSON → gzip으로 zip 항목에 바로 씀. 반환: manifest 항목."""
+    path = f"tables/{name}.ndjson.gz"
+    sha, rows, schema = hashlib.sha256(), 0, {}
+    with zf.open(path, "w") as entry, gzip.GzipFile(fileobj=entry, mode="wb", mtime=0) as gz:
+        for chunk in stream_query(query, params):
+            for column in chunk.columns:
+                kind, seen = _column_type(chunk[column]), schema.get(column, "null")
+                if seen == "null" or (seen == "integer" and kind == "number"):
+                    schema[column] = kind
+            if chunk.empty:
+                continue
+            data = _to_ndjson(chunk, schema)
+            sha.update(data)
+            gz.write(data)
+            rows += len(chunk)
+    return {
+        "file": path,
+        "rows": rows,
+        "sha256": sha.hexdigest(),   # 압축 풀기 전 NDJSON 바이트 기준
+        "schema": [{"name": c, "type": "string" if t == "null" else t} for c, t in schema.items()],
+    }
+
+
+def verify_archive(data: bytes) -> dict:
+    """zip CRC + 테이블별 행 수/SHA-256을 manifest와 대조. 맞으면 manifest, 틀리면 ValueError."""
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        broken = zf.testzip()
+        if broken is not None:
+            raise ValueError(f"archive entry corrupted: {broken}")
+        manifest = json.loads(zf.read(MANIFEST_NAME))
+        if manifest.get("format") != ARCHIVE_FORMAT:
+            raise ValueError(f"unsupported archive format: {manifest.get('format')}")
+        for name, info in manifest["tables"].items():
+            sha, rows = hashlib.sha256(), 0
+            with zf.open(info["file"]) as entry, gzip.GzipFile(fileobj=entry, mode="rb") as gz:
+                while block := gz.read(_VERIFY_BLOCK):
+                    sha.update(block)
+                    rows += block.count(b"\n")
+            if rows != info["rows"] or sha.hexdigest() != info["sha256"]:
+                raise ValueError(f"archive verification failed: {name}")
+    return manifest
+
+
+def archive_project(project_id: int, current_user: dict, archive_reason: str) -> Tuple[str, bytes]:
+    """
+    프로젝트 데이터를 아카이브 v2(zip)로 만들어 (파일명, zip 바이트) 반환.
+    만든 직후 verify_archive로 다시 읽어 검증 (실패하면 ValueError → 삭제 단계로 못 넘어감).
+    """
     if not archive_reason or not archive_reason.strip():
         raise ValueError("archive_reason is required")
 
     df_meta = run_query("SELECT * FROM projects WHERE id = :pid", {"pid": project_id}, fetch=True)
     if df_meta is None or df_meta.empty:
         raise ValueError(f"Invalid project_id: {project_id}")
-
-    project_meta_dict = df_meta.astype(str).iloc[0].to_dict()
-
-    journal_entries = _fetch_if_exists("journal_entries", "SELECT * FROM journal_entries WHERE project_id = :pid ORDER BY id", {"pid": project_id})
-    journal_entry_ids = [int(row["id"]) for row in journal_entries] if journal_entries else []
-
-    # Azure SQL에서는 IN 구문 사용
-    if journal_entry_ids and _table_exists("journal_lines"):
-        id_list = ",".join(map(str, journal_entry_ids))
-        df_lines = run_query(f"SELECT * FROM journal_lines WHERE journal_entry_id IN ({id_list}) ORDER BY id", fetch=True)
-        journal_lines = df_lines.astype(str).to_dict(orient="records") if (df_lines is not None and not df_lines.empty) else []
-    else:
-        journal_lines = []
-
-    budget_entries = _fetch_if_exists("budget_entries", "SELECT * FROM budget_entries WHERE project_id = :pid ORDER BY id", {"pid": project_id})
-    expenses = _fetch_if_exists("expenses", "SELECT * FROM expenses WHERE project_id = :pid ORDER BY id", {"pid": project_id})
-    members = _fetch_if_exists("members", "SELECT * FROM members WHERE project_id = :pid ORDER BY id", {"pid": project_id})
+    project_meta = json.loads(df_meta.head(1).to_json(orient="records", date_format="iso", force_ascii=False))[0]
 
     archived_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    archive_filename = f"archive_project_{project_id}_{timestamp}.json"
-
-    payload = {
-        "archived_at": archived_at,
-        "archived_by": current_user.get("name", "unknown"),
-        "archive_reason": archive_reason,
-        "project_id": project_id,
-        "project_meta": project_meta_dict,
-        "data": {
-            "journal_entries": journal_entries,
-            "journal_lines": journal_lines,
-            "budget_entries": budget_entries,
-            "expenses": expenses,
-            "members": members,
-            "audit_logs": [],
-        },
-    }
-    return archive_filename, json.dumps(payload, ensure_ascii=False, indent=2)
+    archive_filename = f"archive_project_{project_id}_{timestamp}.zip"
+
+    buffer = io.BytesIO()
+    tables = {}
+    # 테이블 항목은 이미 gzip이라 그대로 저장, manifest만 deflate
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name, (table, query) in ARCHIVE_TABLES.items():
+            if _table_exists(table):
+                tables[name] = _write_table(zf, name, query, {"pid": project_id})
+        manifest = {
+            "format": ARCHIVE_FORMAT,
+            "archived_at": archived_at,
+            "archived_by": current_user.get("name", "unknown"),
+            "archive_reason": archive_reason,
+            "project_id": project_id,
+            "project_meta": project_meta,
+            "tables": tables,
+        }
+        zf.writestr(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2),
+                    compress_type=zipfile.ZIP_DEFLATED)
+
+    payload = buffer.getvalue()
+    verify_archive(payload)
+    return archive_filename, payload
 
 def delete_archived_project_data(project_id: int, archived_by: str = "unknown", archive_reason: str = "", filename: str = "", delete_project: bool = False):
     _ensure_archive_history_table()
@@ -118,6 +217,9 @@ def delete_archived_project_data(project_id: int, archived_by: str = "unknown",
 
         if delete_project:
             run_query("DELETE FROM projects WHERE id = :pid", {"pid": project_id})
+
+        # 지출/프로젝트 삭제로 참조가 끊긴 영수증 blob 정리
+        collect_orphan_blobs()
     except Exception as e:
         st.error(f"데터 삭제 중 오류 발생: {e}")
         raise e
@@ -62,7 +62,7 @@ def render_approved_user_admin():
                 run_query(
                     """
                     IF EXISTS (SELECT 1 FROM approved_users WHERE student_id = :sid)
-                        UPDATE approved_users SET name=:name, status='APPROVED' WHERE student_id = :sid
+                        UPDATE approved_users SET name=:name, status='APPROVED', perm_version = perm_version + 1 WHERE student_id = :sid
                     ELSE
                         INSERT INTO approved_users (student_id, name, role, status)
                         VALUES (:sid, :name, 'user', 'APPROVED')
@@ -92,7 +92,7 @@ def render_approved_user_admin():
         if st.button("학번 비활성화"):
             if len(disable_sid) == 9 and disable_sid.isdigit():
                 run_query(
-                    "UPDATE approved_users SET status = 'SUSPENDED' WHERE student_id = :sid",
+                    "UPDATE approved_users SET status = 'SUSPENDED', perm_version = perm_version + 1 WHERE student_id = :sid",
                     {"sid": disable_sid},
                 )
                 st.success("비활성화 완료.")
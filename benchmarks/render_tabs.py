@@ -0,0 +1,27 @@
+# benchmarks/render_tabs.py
+"""AppTest로 실행하는 헤드리스 렌더 스크립트: 로그인/사이드바 없이 모든 탭을 한 번씩 렌더링."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit as st
+
+from tabs.context import RenderContext, load_project_snapshot
+from tabs.registry import load_tabs
+
+project_id = int(os.environ.get("BENCH_PROJECT_ID", "1"))
+st.session_state["current_user"] = {
+    "name": "bench", "student_id": "bench", "role": "treasurer",
+    "permissions": frozenset(), "perm_version": 1,
+}
+
+ctx = RenderContext(
+    project_id=project_id,
+    project_name=f"project {project_id}",
+    current_user=st.session_state["current_user"],
+    snapshot=load_project_snapshot(project_id),
+)
+for spec in load_tabs():
+    spec.render(ctx)
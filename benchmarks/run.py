@@ -0,0 +1,232 @@
+# benchmarks/run.py
+"""
+오프라인 벤치마크 (Azure SQL 없이 SQLite 대체 DB로 실행)
+    python -m benchmarks.run                      # 측정 + baselines.json과 비교
+    python -m benchmarks.run --scale 0.5 --repeat 3
+    python -m benchmarks.run --update-baseline    # 현재 결과를 기준값으로 저장
+
+- seed.py로 합성 프로젝트를 만든 뒤 주요 경로를 반복 측정 (중앙값 기준)
+- 기준값 대비 --tolerance 이상 느려지면 종료 코드 1 → 배포 전 CI에서 사용
+- 측정 중 run_query가 삼킨 SQL 오류가 있으면 해당 항목은 실패로 표시
+- 이 환경에서 돌릴 수 없는 항목(예: tesseract 없는 OCR)은 SKIP (실패 아님)
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+POSTS_PER_RUN = 50
+RECEIPTS_PER_BATCH = 8
+
+
+class SkipCase(Exception):
+    """이 환경에서 측정할 수 없는 항목 (사유를 메시지로)."""
+
+
+def _sample_receipts(n: int) -> list:
+    """OCR용 합성 영수증 PNG (영문/숫자만, 기본 글꼴)."""
+    import io
+
+    from PIL import Image, ImageDraw, ImageFont
+
+    font = ImageFont.load_default(size=36)
+    images = []
+    for i in range(n):
+        img = Image.new("L", (900, 420), 255)
+        draw = ImageDraw.Draw(img)
+        lines = ["BENCH MART", f"2025-06-{i + 1:02d} 12:30", "COFFEE 2 x 4,500", f"TOTAL {9000 + i * 1000:,}"]
+        for row, line in enumerate(lines):
+            draw.text((40, 30 + row * 90), line, fill=0, font=font)
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        images.append(buf.getvalue())
+    return images
+
+
+def _timed(fn, repeat: int) -> dict:
+    import streamlit as st
+
+    fn()  # warm-up (import/캐시 리소스 준비)
+    samples = []
+    for _ in range(repeat):
+        st.cache_data.clear()
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(samples), 2), "min_ms": round(min(samples), 2)}
+
+
+def _cases(project_id: int, render_script: str) -> dict:
+    """이름 → 측정 함수. 각 함수는 결과가 비정상이면 AssertionError."""
+    from accounting.service import _post_journal
+    from archive.archive_service import archive_project
+    from db import get_ledger, run_query
+    from export_excel import create_settlement_excel
+    from receipts import parser as receipt_parser
+    from sidebar import _build_all_projects_zip
+    from streamlit.testing.v1 import AppTest
+
+    projects = run_query("SELECT id, name FROM projects ORDER BY id", fetch=True)
+    project_list = list(projects.itertuples(index=False, name=None))
+    df_expenses = run_query(
+        "SELECT date AS 날짜, category AS 분류, item AS 내역, amount AS 금액 FROM expenses WHERE project_id = :pid",
+        {"pid": project_id}, fetch=True,
+    )
+    df_members = run_query(
+        "SELECT paid_date AS 납부일, name AS 이름, student_id AS 학번, deposit_amount AS 납부액, note AS 비고 FROM members WHERE project_id = :pid",
+        {"pid": project_id}, fetch=True,
+    )
+
+    def ledger():
+        assert not get_ledger(project_id).empty
+
+    def post_journal():
+        for i in range(POSTS_PER_RUN):
+            assert _post_journal(project_id, "2025-06-01", f"bench {i}", "EXPENSE", "bench", "5100", "1100", 1000)
+
+    def archive():
+        _, payload = archive_project(project_id, {"name": "bench"}, "benchmark")
+        assert payload
+
+    def all_projects_zip():
+        assert _build_all_projects_zip(project_list)
+
+    def settlement_excel():
+        total_expense = int(df_expenses["금액"].sum())
+        assert create_settlement_excel(
+            project_name="bench", total_budget=total_expense * 2, total_expense=total_expense,
+            final_balance=total_expense, df_expenses=df_expenses, df_members=df_members,
+        )
+
+    receipt_images = _sample_receipts(RECEIPTS_PER_BATCH)
+
+    def receipts_batch():
+        if not receipt_parser.ocr_available():
+            raise SkipCase("OCR 엔진(tesseract) 없음")
+        # 매번 캐시를 비워 프로세스 풀 OCR 경로를 측정
+        receipt_parser._memo.clear()
+        run_query("DELETE FROM receipt_parse_cache")
+        results = receipt_parser.parse_receipts_batch(receipt_images)
+        assert len(results) == RECEIPTS_PER_BATCH and all(r["amount"] > 0 for r in results), results
+
+    def tab_render():
+        at = AppTest.from_file(render_script, default_timeout=120)
+        at.run()
+        assert not at.exception, [e.value for e in at.exception]
+
+    return {
+        "get_ledger": ledger,
+        f"_post_journal_x{POSTS_PER_RUN}": post_journal,
+        "archive_project": archive,
+        "_build_all_projects_zip": all_projects_zip,
+        "create_settlement_excel": settlement_excel,
+        f"parse_receipts_batch_x{RECEIPTS_PER_BATCH}": receipts_batch,
+        "tab_render": tab_render,
+    }
+
+
+def run(scale: float, repeat: int, only: list = None) -> dict:
+    from benchmarks.seed import SeedSize, create_database
+
+    size = SeedSize.scaled(scale)
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench_"), "bench.db")
+    os.environ["DATABASE_URL"] = create_database(db_path, size)
+    os.environ["BENCH_PROJECT_ID"] = "1"
+
+    import query_log
+
+    results = {}
+    for name, fn in _cases(1, os.path.join(ROOT, "benchmarks", "render_tabs.py")).items():
+        if only and name not in only:
+            continue
+        failed_before = int((~query_log.records_frame()["ok"]).sum())
+        try:
+            results[name] = _timed(fn, repeat)
+        except AssertionError as e:
+            results[name] = {"error": f"결과 이상: {e}"}
+            continue
+        except SkipCase as e:
+            results[name] = {"skipped": str(e)}
+            continue
+        failed = int((~query_log.records_frame()["ok"]).sum()) - failed_before
+        if failed:
+            results[name]["error"] = f"SQL 오류 {failed}건 (SQLite 변환 누락 가능)"
+    return {
+        "meta": {"scale": scale, "size": size.__dict__, "repeat": repeat,
+                 "python": platform.python_version(), "machine": platform.platform()},
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """(이름, 현재 ms, 기준 ms, 비율, 상태) 목록."""
+    rows = []
+    base_results = (baseline or {}).get("results", {})
+    for name, result in current["results"].items():
+        base = base_results.get(name, {}).get("median_ms")
+        if "error" in result:
+            rows.append((name, None, base, None, "FAIL"))
+            continue
+        if "skipped" in result:
+            rows.append((name, None, base, None, "SKIP"))
+            continue
+        ratio = result["median_ms"] / base if base else None
+        status = "NEW" if ratio is None else ("REGRESSION" if ratio > 1 + tolerance else "ok")
+        rows.append((name, result["median_ms"], base, ratio, status))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="오프라인 성능 벤치마크")
+    parser.add_argument("--scale", type=float, default=1.0, help="데이터 크기 배수 (기본 20개 프로젝트)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.3, help="허용 느려짐 비율 (0.3 = 30%%)")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--only", nargs="*", help="측정할 항목 이름")
+    args = parser.parse_args()
+
+    # 런타임 밖 실행 경고(No runtime found 등) 숨김 (AppTest가 설정을 다시 읽어도 유지되도록 환경변수도 지정)
+    os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+    from streamlit import logger as st_logger
+    st_logger.set_log_level("error")
+    current = run(args.scale, args.repeat, args.only)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("scale") != args.scale:
+            print(f"⚠️ 기준값 scale({baseline['meta'].get('scale')})과 현재 scale({args.scale})이 다릅니다.")
+
+    rows = compare(current, baseline, args.tolerance)
+    print(f"{'항목':<28}{'현재 ms':>12}{'기준 ms':>12}{'비율':>8}  상태")
+    for name, now, base, ratio, status in rows:
+        now_s = f"{now:.1f}" if now is not None else "-"
+        base_s = f"{base:.1f}" if base is not None else "-"
+        ratio_s = f"{ratio:.2f}" if ratio is not None else "-"
+        print(f"{name:<28}{now_s:>12}{base_s:>12}{ratio_s:>8}  {status}")
+        if status == "FAIL":
+            print(f"    {current['results'][name]['error']}")
+        elif status == "SKIP":
+            print(f"    {current['results'][name]['skipped']}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"기준값 저장: {args.baseline}")
+        return 0
+
+    return 1 if any(status in {"REGRESSION", "FAIL"} for *_, status in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    sys.exit(main())
@@ -0,0 +1,219 @@
+-- benchmarks/schema_sqlite.sql
+-- db.init_db(T-SQL)과 같은 테이블 구조의 SQLite 버전 (벤치마크 전용)
+
+CREATE TABLE system_config (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE approved_users (
+    student_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    role TEXT DEFAULT 'member',
+    status TEXT DEFAULT 'PENDING',
+    password_hash TEXT,
+    permissions TEXT,
+    security_question TEXT,
+    security_answer_hash TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    perm_version INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE projects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE members (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id INTEGER REFERENCES projects(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    student_id TEXT,
+    deposit_amount INTEGER DEFAULT 0,
+    paid_date TEXT,
+    note TEXT,
+    journal_entry_id INTEGER,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    submission_token TEXT,
+    fingerprint TEXT
+);
+
+CREATE TABLE budget_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id INTEGER REFERENCES projects(id) ON DELETE CASCADE,
+    entry_date TEXT,
+    source_type TEXT,
+    contributor_name TEXT,
+    amount INTEGER,
+    note TEXT,
+    extra_label TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    journal_entry_id INTEGER,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    submission_token TEXT,
+    fingerprint TEXT
+);
+
+CREATE TABLE expenses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id INTEGER REFERENCES projects(id) ON DELETE CASCADE,
+    date TEXT,
+    item TEXT,
+    amount INTEGER,
+    category TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    journal_entry_id INTEGER,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    submission_token TEXT,
+    fingerprint TEXT
+);
+CREATE INDEX ix_members_updated_at ON members (updated_at);
+CREATE INDEX ix_budget_entries_updated_at ON budget_entries (updated_at);
+CREATE INDEX ix_expenses_updated_at ON expenses (updated_at);
+CREATE INDEX ix_members_project ON members (project_id, id, updated_at);
+CREATE INDEX ix_budget_entries_project ON budget_entries (project_id, id, updated_at);
+CREATE INDEX ix_expenses_project ON expenses (project_id, id, updated_at);
+CREATE UNIQUE INDEX ux_members_submission_token ON members (submission_token) WHERE submission_token IS NOT NULL;
+CREATE UNIQUE INDEX ux_members_fingerprint ON members (fingerprint) WHERE fingerprint IS NOT NULL;
+CREATE UNIQUE INDEX ux_budget_entries_submission_token ON budget_entries (submission_token) WHERE submission_token IS NOT NULL;
+CREATE UNIQUE INDEX ux_budget_entries_fingerprint ON budget_entries (fingerprint) WHERE fingerprint IS NOT NULL;
+CREATE UNIQUE INDEX ux_expenses_submission_token ON expenses (submission_token) WHERE submission_token IS NOT NULL;
+CREATE UNIQUE INDEX ux_expenses_fingerprint ON expenses (fingerprint) WHERE fingerprint IS NOT NULL;
+
+CREATE TABLE row_tombstones (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    project_id INTEGER,
+    deleted_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX ix_row_tombstones_feed ON row_tombstones (table_name, project_id, id, row_id);
+CREATE TRIGGER trg_members_tombstone AFTER DELETE ON members
+BEGIN
+    INSERT INTO row_tombstones (table_name, row_id, project_id) VALUES ('members', OLD.id, OLD.project_id);
+END;
+CREATE TRIGGER trg_budget_entries_tombstone AFTER DELETE ON budget_entries
+BEGIN
+    INSERT INTO row_tombstones (table_name, row_id, project_id) VALUES ('budget_entries', OLD.id, OLD.project_id);
+END;
+CREATE TRIGGER trg_expenses_tombstone AFTER DELETE ON expenses
+BEGIN
+    INSERT INTO row_tombstones (table_name, row_id, project_id) VALUES ('expenses', OLD.id, OLD.project_id);
+END;
+
+CREATE TABLE receipt_images (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id INTEGER REFERENCES projects(id) ON DELETE CASCADE,
+    expense_id INTEGER REFERENCES expenses(id) ON DELETE CASCADE,
+    filename TEXT,
+    filepath TEXT,
+    description TEXT,
+    uploaded_by TEXT,
+    uploaded_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    content_hash TEXT,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX ix_receipt_images_gallery ON receipt_images (project_id, uploaded_at DESC, id DESC);
+
+CREATE TABLE receipt_blobs (
+    content_hash TEXT PRIMARY KEY,
+    backend TEXT NOT NULL,
+    locator TEXT NOT NULL,
+    size_bytes INTEGER DEFAULT 0,
+    ref_count INTEGER DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    last_referenced_at DATETIME
+);
+
+CREATE TABLE receipt_parse_cache (
+    content_hash TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    result TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (content_hash, backend)
+);
+
+CREATE TABLE accounts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    code TEXT UNIQUE NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL
+);
+
+CREATE TABLE journal_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id INTEGER REFERENCES projects(id) ON DELETE CASCADE,
+    tx_date TEXT,
+    description TEXT,
+    source_kind TEXT,
+    created_by TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    source_table TEXT,
+    source_id INTEGER,
+    reverses_entry_id INTEGER,
+    reversed_by_entry_id INTEGER
+);
+
+CREATE TABLE journal_lines (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    journal_entry_id INTEGER REFERENCES journal_entries(id) ON DELETE CASCADE,
+    account_id INTEGER REFERENCES accounts(id),
+    debit INTEGER DEFAULT 0,
+    credit INTEGER DEFAULT 0,
+    memo TEXT,
+    CONSTRAINT ck_journal_lines_one_sided CHECK (debit >= 0 AND credit >= 0 AND (debit = 0 OR credit = 0))
+);
+
+CREATE INDEX ix_journal_entries_project ON journal_entries (project_id, id);
+CREATE INDEX ix_journal_entries_source ON journal_entries (source_table, source_id);
+
+CREATE INDEX ix_journal_entries_tx_date ON journal_entries (tx_date, project_id);
+
+CREATE TABLE period_closes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    label TEXT NOT NULL,
+    end_date TEXT NOT NULL UNIQUE,
+    closed_by TEXT,
+    closed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE closing_balances (
+    close_id INTEGER NOT NULL REFERENCES period_closes(id) ON DELETE CASCADE,
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    account_id INTEGER NOT NULL REFERENCES accounts(id),
+    debit INTEGER NOT NULL DEFAULT 0,
+    credit INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (close_id, project_id, account_id)
+);
+
+CREATE TABLE reconcile_watermarks (
+    name TEXT PRIMARY KEY,
+    changed_since DATETIME,
+    last_journal_id INTEGER NOT NULL DEFAULT 0,
+    checked_rows INTEGER NOT NULL DEFAULT 0,
+    issues INTEGER NOT NULL DEFAULT 0,
+    ran_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE reconcile_issues (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    row_id INTEGER,
+    journal_entry_id INTEGER,
+    project_id INTEGER,
+    detail TEXT,
+    found_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX ix_journal_lines_entry ON journal_lines (journal_entry_id, account_id, debit, credit);
+
+CREATE TABLE audit_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    action TEXT,
+    details TEXT,
+    user_mode TEXT,
+    ip_address TEXT,
+    device_info TEXT,
+    operator_name TEXT
+);
@@ -0,0 +1,109 @@
+# benchmarks/seed.py
+"""
+벤치마크용 합성 데이터 생성 (SQLite 파일)
+- 프로젝트 수 / 프로젝트당 수입·회비·지출 건수를 지정
+- 같은 seed면 항상 같은 데이터 → 실행 간 비교 가능
+"""
+
+import datetime
+import os
+import random
+import sqlite3
+from dataclasses import dataclass
+
+from accounting.service import ACCOUNT_SEED
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "schema_sqlite.sql")
+
+CATEGORIES = ["식비", "물품 구입비", "대관료", "인쇄비", "교통비", "과잠 제작비", "기타"]
+SOURCE_TYPES = ["school_budget", "reserve_fund", "reserve_recovery"]
+NAMES = ["김민준", "이서연", "박지호", "최수아", "정도윤", "강하은", "조시우", "윤지유", "장예준", "임채원"]
+
+# source_type / 지출 분류 → (차변, 대변) — accounting.service의 분개 규칙과 동일
+INCOME_ACCOUNTS = {
+    "school_budget": ("1100", "4100"),
+    "reserve_fund": ("1110", "4110"),
+    "reserve_recovery": ("1110", "1200"),
+    "student_dues": ("1100", "4120"),
+}
+
+
+@dataclass(frozen=True)
+class SeedSize:
+    projects: int = 20
+    budget_entries: int = 30     # 프로젝트당
+    members: int = 120           # 프로젝트당
+    expenses: int = 200          # 프로젝트당
+
+    @classmethod
+    def scaled(cls, factor: float) -> "SeedSize":
+        base = cls()
+        return cls(
+            projects=max(1, int(base.projects * factor)),
+            budget_entries=max(1, int(base.budget_entries * factor)),
+            members=max(1, int(base.members * factor)),
+            expenses=max(1, int(base.expenses * factor)),
+        )
+
+
+def create_database(path: str, size: SeedSize = SeedSize(), seed: int = 42) -> str:
+    """스키마 생성 + 데이터 채우기. SQLAlchemy URL 반환."""
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    start = datetime.date(2025, 3, 1)
+
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_PATH, encoding="utf-8") as f:
+        conn.executescript(f.read())
+
+    conn.execute("INSERT INTO system_config (key, value) VALUES ('status', 'NORMAL')")
+    conn.executemany("INSERT INTO accounts (code, name, type) VALUES (?, ?, ?)", ACCOUNT_SEED)
+    account_ids = dict(conn.execute("SELECT code, id FROM accounts"))
+
+    def day(i):
+        return (start + datetime.timedelta(days=i % 240)).isoformat()
+
+    def post(pid, tx_date, desc, kind, debit, credit, amount, source_table, source_id):
+        je_id = conn.execute(
+            "INSERT INTO journal_entries (project_id, tx_date, description, source_kind, created_by, source_table, source_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (pid, tx_date, desc, kind, "bench", source_table, source_id),
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO journal_lines (journal_entry_id, account_id, debit, credit, memo) VALUES (?, ?, ?, ?, '')",
+            [(je_id, account_ids[debit], amount, 0), (je_id, account_ids[credit], 0, amount)],
+        )
+        conn.execute(f"UPDATE {source_table} SET journal_entry_id = ? WHERE id = ?", (je_id, source_id))
+
+    for p in range(size.projects):
+        pid = conn.execute("INSERT INTO projects (name) VALUES (?)", (f"벤치마크 행사 {p + 1:03d}",)).lastrowid
+
+        for i in range(size.budget_entries):
+            src = rng.choice(SOURCE_TYPES)
+            amount = rng.randrange(50_000, 2_000_000, 10_000)
+            row_id = conn.execute(
+                "INSERT INTO budget_entries (project_id, entry_date, source_type, contributor_name, amount, note, extra_label) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (pid, day(i), src, rng.choice(NAMES), amount, "", ""),
+            ).lastrowid
+            post(pid, day(i), "예산 입금", src.upper(), *INCOME_ACCOUNTS[src], amount, "budget_entries", row_id)
+
+        for i in range(size.members):
+            amount = rng.choice([10_000, 15_000, 20_000, 30_000])
+            row_id = conn.execute(
+                "INSERT INTO members (project_id, name, student_id, deposit_amount, paid_date, note) VALUES (?, ?, ?, ?, ?, '')",
+                (pid, rng.choice(NAMES), f"2025{i:05d}", amount, day(i)),
+            ).lastrowid
+            post(pid, day(i), "학생회비 입금", "STUDENT_DUES", *INCOME_ACCOUNTS["student_dues"], amount, "members", row_id)
+
+        for i in range(size.expenses):
+            category = rng.choice(CATEGORIES)
+            amount = rng.randrange(1_000, 500_000, 100)
+            row_id = conn.execute(
+                "INSERT INTO expenses (project_id, date, item, amount, category) VALUES (?, ?, ?, ?, ?)",
+                (pid, day(i), f"{category} #{i}", amount, category),
+            ).lastrowid
+            post(pid, day(i), f"{category} 지출", "EXPENSE", "5110" if "과잠" in category else "5100", "1100", amount, "expenses", row_id)
+
+    conn.commit()
+    conn.close()
+    return f"sqlite:///{os.path.abspath(path)}"
@@ -8,15 +8,22 @@ Azure SQL (MS SQL Server) + Streamlit Cloud + pymssql 안정 버전
 
 import os
 import json
-import hashlib
+import time
+import functools
 import urllib.parse
 
 import pandas as pd
 import streamlit as st
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError, TimeoutError as SATimeoutError
 
+import db_metrics
+import db_retry
+import query_log
+import sql_compat
 from config import get_admin_bootstrap
+from password_hashing import hash_password, needs_rehash, verify_password
 
 
 # ─────────────────────────────────────────────
@@ -67,42 +74,264 @@ def _build_sqlalchemy_url() -> str:
     return f"mssql+pymssql://{username}:{quoted_password}@{server}:{port}/{database}"
 
 
+def _int_secret(key: str, default: int) -> int:
+    try:
+        return int(_secret_get(key, default=default))
+    except (TypeError, ValueError):
+        return default
+
+
+def pool_settings() -> dict:
+    """
+    커넥션 풀 설정 (Secrets/환경변수, 없으면 기존 기본값).
+    DB_POOL_PRE_PING=false면 checkout마다 ping 왕복을 생략하고,
+    끊긴 연결은 run_query에서 한 번 재시도해 복구.
+    """
+    pre_ping = str(_secret_get("DB_POOL_PRE_PING", default="true")).strip().lower()
+    return {
+        "pool_size":     _int_secret("DB_POOL_SIZE", 5),
+        "max_overflow":  _int_secret("DB_MAX_OVERFLOW", 0),
+        "pool_timeout":  _int_secret("DB_POOL_TIMEOUT", 30),
+        "pool_recycle":  _int_secret("DB_POOL_RECYCLE", 300),
+        "pool_pre_ping": pre_ping not in {"0", "false", "no", "off"},
+    }
+
+
 @st.cache_resource(show_spinner=False)
 def _get_engine() -> Engine:
     db_url = _build_sqlalchemy_url()
+    if db_url.startswith("sqlite"):
+        # 로컬 대체 DB (벤치마크/개발용): pymssql 전용 옵션 없이 기본 풀 사용
+        return create_engine(db_url)
     return create_engine(
         db_url,
-        pool_size=5,
-        max_overflow=0,
-        pool_recycle=300,
-        pool_pre_ping=True,
-        pool_timeout=30,
+        **pool_settings(),
         connect_args={"login_timeout": 30, "timeout": 30},
     )
 
 
-def run_query(query: str, params=None, fetch: bool = False):
+def _adapt(query: str) -> str:
+    if _get_engine().dialect.name == "sqlite":
+        return sql_compat.to_sqlite(query)
+    return query
+
+
+def pool_status() -> dict:
+    pool = _get_engine().pool
+    status = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        attr = getattr(pool, name, None)
+        status[name] = attr() if callable(attr) else None
+    return status
+
+
+def _statement(stmt, params, fetch: bool):
+    """문장 하나를 실행하는 work (run_query용). 반환: (DataFrame 또는 None, 행 수)."""
+    def work(conn):
+        res = conn.execute(stmt, params or {})
+        df = pd.DataFrame(res.fetchall(), columns=res.keys()) if fetch else None
+        return df, (len(df) if fetch else res.rowcount)
+    return work
+
+
+def _execute(work):
+    """work(conn)을 연결 하나, 트랜잭션 하나로 실행 (예외 시 전체 롤백)."""
+    engine = _get_engine()
+    started = time.perf_counter()
+    try:
+        conn = engine.connect()
+    except SATimeoutError:
+        raise
+    except Exception as e:
+        raise db_retry.NotExecuted(e) from e
+    with conn:
+        db_metrics.checkout_wait.observe((time.perf_counter() - started) * 1000)
+        executed = time.perf_counter()
+        with conn.begin():
+            try:
+                result = work(conn)
+            except DBAPIError as e:
+                if e.connection_invalidated:
+                    # 풀에서 꺼낸 연결이 이미 끊겨 있었음 (pre-ping 생략 시). 커밋 전이라 반영된 것 없음
+                    raise db_retry.NotExecuted(e, stale=True) from e
+                raise
+        db_metrics.query_latency.observe((time.perf_counter() - executed) * 1000)
+        return result
+
+
+class DatabaseUnavailable(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"DB 연결 대기 중 ({retry_after:.0f}초 후 재시도)")
+        self.retry_after = retry_after
+
+
+def _execute_with_retry(work, idempotent: bool):
+    """
+    일시 오류는 지터 포함 지수 백오프로 재시도.
+    - 실행되지 않았음이 확실한 오류(SAFE)는 읽기/쓰기 모두 재시도
+    - 실행됐을 수도 있는 오류(AMBIGUOUS)는 idempotent일 때만 재시도
+    """
+    deadline = time.monotonic() + db_retry.RETRY_BUDGET_SECONDS
+    attempt = 0
+    while True:
+        if not db_retry.breaker.allow():
+            raise DatabaseUnavailable(db_retry.breaker.retry_after())
+        try:
+            result = _execute(work)
+        except (SQLAlchemyError, db_retry.NotExecuted) as e:
+            kind, outage = db_retry.classify(e)
+            if outage:
+                db_retry.breaker.record_failure()
+            else:
+                db_retry.breaker.record_success()   # 응답은 온 것 → DB 자체는 살아 있음
+            if kind is None or (kind == db_retry.AMBIGUOUS and not idempotent):
+                raise
+            delay = db_retry.backoff_delay(attempt)
+            attempt += 1
+            if attempt >= db_retry.MAX_ATTEMPTS or time.monotonic() + delay > deadline:
+                raise
+            db_metrics.incr("disconnect_retries" if getattr(e, "stale", False) else "transient_retries")
+            time.sleep(delay)
+            continue
+        db_retry.breaker.record_success()
+        return result
+
+
+def _report_error(e: Exception):
+    if isinstance(e, SATimeoutError):
+        db_metrics.incr("checkout_timeouts")
+        st.error(f"❌ DB 에러: 커넥션 풀 대기 시간 초과 ({e})")
+    elif db_retry.classify(e)[0] is not None:
+        st.error("❌ DB 일시 오류: 잠시 후 다시 시도해주세요.")
+    else:
+        st.error(f"❌ DB 에러: {e}")
+
+
+def run_query(query: str, params=None, fetch: bool = False, idempotent: bool = None):
     """
     params는 dict로 넘기면 됨.
     fetch=True면 DataFrame 반환.
+    idempotent: 일시 오류 후 재실행해도 되는지. 기본값은 읽기 전용 쿼리만 True.
     """
+    if idempotent is None:
+        idempotent = db_retry.is_read_only(query)
+    started = time.perf_counter()
+    rows, ok = 0, False
     try:
-        engine = _get_engine()
-        stmt = text(query)
-        with engine.begin() as db:
-            if fetch:
-                res = db.execute(stmt, params or {})
-                return pd.DataFrame(res.fetchall(), columns=res.keys())
-            db.execute(stmt, params or {})
+        df, rows = _execute_with_retry(_statement(text(_adapt(query)), params, fetch), idempotent)
+        ok = True
+        if fetch:
+            return df
         st.cache_data.clear()
         return None
+    except DatabaseUnavailable:
+        # 브레이커가 열린 동안은 조용히 실패 (화면 상단 안내는 app에서 한 번만)
+        return None
     except Exception as e:
-        st.error(f"❌ DB 에러: {e}")
+        _report_error(e)
         return None
+    finally:
+        query_log.record(query, (time.perf_counter() - started) * 1000, rows, ok)
+
+
+class Rollback(Exception):
+    """run_transaction의 work 안에서 올리면 전체 롤백 후 value를 반환 (오류 표시 없음)."""
 
+    def __init__(self, value=None):
+        super().__init__()
+        self.value = value
 
-def _hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+
+class Transaction:
+    """run_transaction이 work에 넘기는 객체. query()는 run_query와 같은 인자, 같은 트랜잭션에서 실행."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def query(self, query: str, params=None, fetch: bool = False):
+        """fetch=True면 DataFrame, 아니면 영향받은 행 수."""
+        started = time.perf_counter()
+        rows, ok = 0, False
+        try:
+            df, rows = _statement(text(_adapt(query)), params, fetch)(self._conn)
+            ok = True
+            return df if fetch else rows
+        finally:
+            query_log.record(query, (time.perf_counter() - started) * 1000, rows, ok)
+
+
+def run_transaction(work, idempotent: bool = False):
+    """
+    work(tx)를 연결 하나, 트랜잭션 하나로 실행해 반환값을 돌려줌 (여러 문장이 모두 반영되거나 모두 취소).
+    - DB 오류: run_query처럼 화면에 표시하고 None
+    - work가 Rollback(value)을 올리면 롤백 후 value
+    - 그 밖의 예외(PeriodClosedError 등)는 롤백 후 그대로 올림
+    일시 오류 재시도는 work 전체를 다시 실행 (idempotent=False면 실행됐을 수도 있는 오류는 재시도 안 함).
+    """
+    try:
+        result = _execute_with_retry(lambda conn: work(Transaction(conn)), idempotent)
+    except Rollback as r:
+        return r.value
+    except DatabaseUnavailable:
+        return None
+    except (SQLAlchemyError, db_retry.NotExecuted) as e:
+        _report_error(e)
+        return None
+    st.cache_data.clear()
+    return result
+
+
+def watermark_param(value):
+    """
+    조회한 updated_at 값 → 다음 증분 조회에 :since 파라미터로 다시 쓸 문자열.
+    datetime은 ms까지 ISO 형식 (str(Timestamp)의 6자리 소수는 SQL Server DATETIME 변환 실패, 오류 241).
+    SQLite 대체 DB는 원래 문자열이라 그대로.
+    """
+    if value is None or pd.isna(value):
+        return None
+    if hasattr(value, "isoformat"):
+        return pd.Timestamp(value).isoformat(timespec="milliseconds")
+    return str(value)
+
+
+STREAM_CHUNK_ROWS = 5000
+
+
+def stream_query(query: str, params=None, chunk_size: int = STREAM_CHUNK_ROWS):
+    """
+    큰 읽기 결과를 chunk_size 행씩 DataFrame으로 넘김 (서버 커서, 전체 결과를 메모리에 올리지 않음).
+    결과가 없으면 컬럼만 있는 빈 DataFrame 하나.
+    이미 넘긴 청크는 되돌릴 수 없어 재시도/화면 오류 표시 없이 예외를 그대로 올림 → 호출 쪽에서 처리.
+    """
+    if not db_retry.breaker.allow():
+        raise DatabaseUnavailable(db_retry.breaker.retry_after())
+    started = time.perf_counter()
+    rows, ok = 0, False
+    try:
+        with _get_engine().connect() as conn:
+            res = conn.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(
+                text(_adapt(query)), params or {}
+            )
+            columns = list(res.keys())
+            for part in res.partitions(chunk_size):
+                rows += len(part)
+                yield pd.DataFrame(part, columns=columns)
+            if rows == 0:
+                yield pd.DataFrame(columns=columns)
+        ok = True
+    finally:
+        query_log.record(query, (time.perf_counter() - started) * 1000, rows, ok)
+
+
+@functools.lru_cache(maxsize=4)
+def _admin_password_hash(password: str, stored_hash: str) -> str:
+    """
+    총무 부트스트랩용 해시. 저장된 해시가 현재 비밀번호/해시 설정과 맞으면 그대로 재사용
+    → 솔트가 매번 달라도 UPDATE/perm_version 증가가 일어나지 않고, KDF 연산은 프로세스당 1회.
+    """
+    if stored_hash and verify_password(password, stored_hash) and not needs_rehash(stored_hash):
+        return stored_hash
+    return hash_password(password)
 
 
 # ─────────────────────────────────────────────
@@ -113,6 +342,9 @@ def init_db():
     앱 시작 시 1회 호출 추천.
     security.py가 기대하는 테이블을 전부 생성/보정한다.
     """
+    # DB가 일시 중지 상태면 여기서 백오프 재시도로 깨움 (실패 시 예외 → app에서 안내)
+    _execute_with_retry(_statement(text("SELECT 1"), None, fetch=True), idempotent=True)
+
     engine = _get_engine()
     with engine.begin() as s:
         s.execute(text("SELECT 1"))
@@ -145,6 +377,11 @@ def init_db():
                 created_at DATETIME DEFAULT GETDATE()
             )
         """))
+        # 역할/권한/상태가 바뀔 때마다 올리는 버전 (세션 재검증용, PK 조회로 확인)
+        s.execute(text("""
+            IF COL_LENGTH('approved_users', 'perm_version') IS NULL
+            ALTER TABLE approved_users ADD perm_version INT NOT NULL DEFAULT 1
+        """))
 
         # projects
         s.execute(text("""
@@ -231,6 +468,56 @@ def init_db():
                 uploaded_at DATETIME DEFAULT GETDATE()
             )
         """))
+        s.execute(text("""
+            IF COL_LENGTH('receipt_images', 'content_hash') IS NULL
+            ALTER TABLE receipt_images ADD content_hash NVARCHAR(64)
+        """))
+        s.execute(text("""
+            IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name='ix_receipt_images_content_hash')
+            CREATE INDEX ix_receipt_images_content_hash ON receipt_images (content_hash)
+        """))
+        # 갤러리 keyset 페이지네이션용 (project_id, uploaded_at, id)
+        s.execute(text("""
+            IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name='ix_receipt_images_gallery')
+            CREATE INDEX ix_receipt_images_gallery
+            ON receipt_images (project_id, uploaded_at DESC, id DESC)
+            INCLUDE (expense_id, uploaded_by)
+        """))
+        # 통합 검색(search.py) 증분 색인용: 설명 수정 시각
+        s.execute(text("""
+            IF COL_LENGTH('receipt_images', 'updated_at') IS NULL
+            ALTER TABLE receipt_images ADD updated_at DATETIME NOT NULL DEFAULT GETDATE()
+        """))
+
+        # receipt_blobs (content-addressed 영수증 저장소, 해시당 1개)
+        s.execute(text("""
+            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='receipt_blobs' AND xtype='U')
+            CREATE TABLE receipt_blobs (
+                content_hash NVARCHAR(64) PRIMARY KEY,
+                backend NVARCHAR(50) NOT NULL,
+                locator NVARCHAR(MAX) NOT NULL,
+                size_bytes BIGINT DEFAULT 0,
+                ref_count INT DEFAULT 0,
+                created_at DATETIME DEFAULT GETDATE()
+            )
+        """))
+        # GC 유예 기준: 마지막으로 참조(업로드)된 시각
+        s.execute(text("""
+            IF COL_LENGTH('receipt_blobs', 'last_referenced_at') IS NULL
+            ALTER TABLE receipt_blobs ADD last_referenced_at DATETIME NULL
+        """))
+
+        # receipt_parse_cache (영수증 파싱 결과, 이미지 해시 기준)
+        s.execute(text("""
+            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='receipt_parse_cache' AND xtype='U')
+            CREATE TABLE receipt_parse_cache (
+                content_hash NVARCHAR(64) NOT NULL,
+                backend NVARCHAR(50) NOT NULL,
+                result NVARCHAR(MAX),
+                created_at DATETIME DEFAULT GETDATE(),
+                PRIMARY KEY (content_hash, backend)
+            )
+        """))
 
         # accounts
         s.execute(text("""
@@ -270,6 +557,171 @@ def init_db():
             )
         """))
 
+        # 분개 라인 무결성: 라인 단위는 CHECK, 전표 단위 차대 균형은 트리거 (CHECK는 행 하나만 볼 수 있음)
+        # 기존 데이터는 WITH NOCHECK로 건너뜀 → accounting.integrity 스캐너가 보고
+        s.execute(text("""
+            IF NOT EXISTS (SELECT * FROM sys.check_constraints WHERE name='ck_journal_lines_one_sided')
+            ALTER TABLE journal_lines WITH NOCHECK ADD CONSTRAINT ck_journal_lines_one_sided
+            CHECK (debit >= 0 AND credit >= 0 AND (debit = 0 OR credit = 0))
+        """))
+        s.execute(text("""
+            IF OBJECT_ID('trg_journal_lines_balanced', 'TR') IS NULL
+            EXEC(N'
+            CREATE TRIGGER trg_journal_lines_balanced ON journal_lines
+            AFTER INSERT, UPDATE, DELETE
+            AS
+            BEGIN
+                SET NOCOUNT ON;
+                IF EXISTS (
+                    SELECT 1
+                    FROM journal_lines jl
+                    WHERE jl.journal_entry_id IN (SELECT journal_entry_id FROM inserted
+                                                  UNION SELECT journal_entry_id FROM deleted)
+                    GROUP BY jl.journal_entry_id
+                    HAVING SUM(jl.debit) <> SUM(jl.credit)
+                )
+                    THROW 51000, ''journal entry is not balanced (debit <> credit)'', 1;
+            END')
+        """))
+
+        # 운영 행 ↔ 전표 연결 + 역분개 (accounting.service) / 변경 시각 (accounting.reconcile 워터마크)
+        s.execute(text("""
+            IF COL_LENGTH('journal_entries', 'source_table') IS NULL
+            ALTER TABLE journal_entries ADD
+                source_table NVARCHAR(50) NULL,
+                source_id INT NULL,
+                reverses_entry_id INT NULL,
+                reversed_by_entry_id INT NULL
+        """))
+        for table in ("budget_entries", "members", "expenses"):
+            s.execute(text(f"""
+                IF COL_LENGTH('{table}', 'journal_entry_id') IS NULL
+                ALTER TABLE {table} ADD journal_entry_id INT NULL
+            """))
+            # 기존 행은 마이그레이션 시각으로 채워짐 → 첫 대사에서 모두 검사
+            s.execute(text(f"""
+                IF COL_LENGTH('{table}', 'updated_at') IS NULL
+                ALTER TABLE {table} ADD updated_at DATETIME NOT NULL DEFAULT GETDATE()
+            """))
+            s.execute(text(f"""
+                IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name='ix_{table}_updated_at')
+                CREATE INDEX ix_{table}_updated_at ON {table} (updated_at)
+            """))
+            # 프로젝트 스냅샷 캐시(project_cache.py) 버전 확인: 행 수/MAX(id)/MAX(updated_at)를 인덱스로
+            s.execute(text(f"""
+                IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name='ix_{table}_project')
+                CREATE INDEX ix_{table}_project ON {table} (project_id, id) INCLUDE (updated_at)
+            """))
+            # 중복 등록 방지 (idempotency.py): 폼 제출 토큰 + 내용 지문, NULL 제외 유니크
+            for column in ("submission_token", "fingerprint"):
+                s.execute(text(f"""
+                    IF COL_LENGTH('{table}', '{column}') IS NULL
+                    ALTER TABLE {table} ADD {column} NVARCHAR(64) NULL
+                """))
+                s.execute(text(f"""
+                    IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name='ux_{table}_{column}')
+                    CREATE UNIQUE INDEX ux_{table}_{column} ON {table} ({column}) WHERE {column} IS NOT NULL
+                """))
+        # row_tombstones: 운영 행 삭제 피드 (프로젝트 삭제 CASCADE 포함, project_cache 증분 갱신용)
+        s.execute(text("""
+            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='row_tombstones' AND xtype='U')
+            CREATE TABLE row_tombstones (
+                id BIGINT IDENTITY(1,1) PRIMARY KEY,
+                table_name NVARCHAR(50) NOT NULL,
+                row_id INT NOT NULL,
+                project_id INT NULL,
+                deleted_at DATETIME NOT NULL DEFAULT GETDATE()
+            )
+        """))
+        s.execute(text("""
+            IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name='ix_row_tombstones_feed')
+            CREATE INDEX ix_row_tombstones_feed ON row_tombstones (table_name, project_id, id) INCLUDE (row_id)
+        """))
+        for table in ("budget_entries", "members", "expenses"):
+            s.execute(text(f"""
+                IF OBJECT_ID('trg_{table}_tombstone', 'TR') IS NULL
+                EXEC(N'
+                CREATE TRIGGER trg_{table}_tombstone ON {table}
+                AFTER DELETE
+                AS
+                BEGIN
+                    SET NOCOUNT ON;
+                    INSERT INTO row_tombstones (table_name, row_id, project_id)
+                    SELECT N''{table}'', id, project_id FROM deleted;
+                END')
+            """))
+        s.execute(text("""
+            IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name='ix_journal_entries_source')
+            CREATE INDEX ix_journal_entries_source ON journal_entries (source_table, source_id)
+        """))
+
+        # reconcile_watermarks (증분 대사 진행 위치)
+        s.execute(text("""
+            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='reconcile_watermarks' AND xtype='U')
+            CREATE TABLE reconcile_watermarks (
+                name NVARCHAR(50) PRIMARY KEY,
+                changed_since DATETIME NULL,
+                last_journal_id INT NOT NULL DEFAULT 0,
+                checked_rows INT NOT NULL DEFAULT 0,
+                issues INT NOT NULL DEFAULT 0,
+                ran_at DATETIME DEFAULT GETDATE()
+            )
+        """))
+        # reconcile_issues: 아직 해결 안 된 대사 불일치 (다음 실행마다 다시 검사, 워터마크와 무관하게 유지)
+        s.execute(text("""
+            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='reconcile_issues' AND xtype='U')
+            CREATE TABLE reconcile_issues (
+                id INT IDENTITY(1,1) PRIMARY KEY,
+                kind NVARCHAR(20) NOT NULL,
+                table_name NVARCHAR(50) NOT NULL,
+                row_id INT NULL,
+                journal_entry_id INT NULL,
+                project_id INT NULL,
+                detail NVARCHAR(400) NULL,
+                found_at DATETIME NOT NULL DEFAULT GETDATE()
+            )
+        """))
+
+        # 기간 마감 (accounting.periods): 마감 목록 + 마감 시점 프로젝트 × 계정 누적 잔액
+        s.execute(text("""
+            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='period_closes' AND xtype='U')
+            CREATE TABLE period_closes (
+                id INT IDENTITY(1,1) PRIMARY KEY,
+                label NVARCHAR(100) NOT NULL,
+                end_date NVARCHAR(10) NOT NULL UNIQUE,
+                closed_by NVARCHAR(100),
+                closed_at DATETIME DEFAULT GETDATE()
+            )
+        """))
+        s.execute(text("""
+            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='closing_balances' AND xtype='U')
+            CREATE TABLE closing_balances (
+                close_id INT NOT NULL REFERENCES period_closes(id) ON DELETE CASCADE,
+                project_id INT NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+                account_id INT NOT NULL REFERENCES accounts(id),
+                debit BIGINT NOT NULL DEFAULT 0,
+                credit BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (close_id, project_id, account_id)
+            )
+        """))
+        # 기준일 잔액의 "스냅샷 이후 전표" 구간 조회용
+        s.execute(text("""
+            IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name='ix_journal_entries_tx_date')
+            CREATE INDEX ix_journal_entries_tx_date ON journal_entries (tx_date) INCLUDE (project_id)
+        """))
+
+        # 보고서 집계(accounting.reports)용: 프로젝트 → 전표 → 분개 라인
+        s.execute(text("""
+            IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name='ix_journal_entries_project')
+            CREATE INDEX ix_journal_entries_project ON journal_entries (project_id, id)
+        """))
+        s.execute(text("""
+            IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name='ix_journal_lines_entry')
+            CREATE INDEX ix_journal_lines_entry
+            ON journal_lines (journal_entry_id)
+            INCLUDE (account_id, debit, credit)
+        """))
+
         # audit_logs
         s.execute(text("""
             IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='audit_logs' AND xtype='U')
@@ -307,7 +759,14 @@ def init_db():
 
     # ── 총무 계정 부트스트랩 (APPROVED + 권한 세팅)
     admin_sid, admin_name, admin_password = get_admin_bootstrap()
-    admin_pw_hash = _hash_password(admin_password) if admin_password else None
+    admin_pw_hash = None
+    if admin_password:
+        existing = run_query(
+            "SELECT password_hash FROM approved_users WHERE student_id = :sid",
+            {"sid": admin_sid}, fetch=True,
+        )
+        stored = existing.iloc[0]["password_hash"] if existing is not None and not existing.empty else None
+        admin_pw_hash = _admin_password_hash(admin_password, stored or "")
     admin_permissions = json.dumps([
         "can_view", "can_edit", "can_manage_members",
         "can_export", "can_archive", "can_delete_project", "can_upload_receipt"
@@ -320,8 +779,12 @@ def init_db():
                 role = 'treasurer',
                 status = 'APPROVED',
                 password_hash = :pw,
-                permissions = :perm
+                permissions = :perm,
+                perm_version = perm_version + 1
             WHERE student_id = :sid
+              -- 매 rerun마다 버전이 올라가지 않도록 실제 변경이 있을 때만 갱신
+              AND (name <> :name OR role <> 'treasurer' OR status <> 'APPROVED'
+                   OR ISNULL(permissions, '') <> :perm OR ISNULL(password_hash, '') <> ISNULL(:pw, ''))
         ELSE
             INSERT INTO approved_users (student_id, name, role, status, password_hash, permissions)
             VALUES (:sid, :name, 'treasurer', 'APPROVED', :pw, :perm)
@@ -0,0 +1,90 @@
+# db_metrics.py
+"""
+DB 커넥션 풀 / 쿼리 지연시간 지표 (프로세스 단위)
+- checkout 대기시간, 쿼리 실행시간 히스토그램 (고정 버킷, ms)
+- 풀 크기 조정 근거로 쓰기 위해 재시작 전까지 누적
+"""
+
+import bisect
+import threading
+from dataclasses import dataclass, field
+
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+@dataclass
+class Histogram:
+    name: str
+    bounds: tuple = BUCKETS_MS
+    counts: list = field(default_factory=list)
+    total: int = 0
+    sum_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def __post_init__(self):
+        self.counts = [0] * (len(self.bounds) + 1)   # 마지막 칸은 상한 초과
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+            self.total += 1
+            self.sum_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        """버킷 상한 기준 근사값 (q: 0~1)."""
+        with self._lock:
+            if not self.total:
+                return 0.0
+            rank = q * self.total
+            seen = 0
+            for i, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank:
+                    return float(self.bounds[i]) if i < len(self.bounds) else self.max_ms
+            return self.max_ms
+
+    def rows(self) -> list:
+        labels = [f"≤{b}ms" for b in self.bounds] + [f">{self.bounds[-1]}ms"]
+        with self._lock:
+            return [{"구간": label, self.name: count} for label, count in zip(labels, self.counts)]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.total,
+            "avg_ms": round(self.sum_ms / self.total, 1) if self.total else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_ms, 1),
+        }
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.bounds) + 1)
+            self.total, self.sum_ms, self.max_ms = 0, 0.0, 0.0
+
+
+checkout_wait = Histogram("checkout")
+query_latency = Histogram("query")
+
+_counters = {"disconnect_retries": 0, "transient_retries": 0, "checkout_timeouts": 0}
+_counter_lock = threading.Lock()
+
+
+def incr(name: str):
+    with _counter_lock:
+        _counters[name] = _counters.get(name, 0) + 1
+
+
+def counters() -> dict:
+    with _counter_lock:
+        return dict(_counters)
+
+
+def reset_metrics():
+    checkout_wait.reset()
+    query_latency.reset()
+    with _counter_lock:
+        for key in _counters:
+            _counters[key] = 0
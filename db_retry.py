@@ -0,0 +1,168 @@
+# db_retry.py
+"""
+Azure SQL 일시 오류 대응 (run_query에서 사용)
+- 오류 분류: 재시도 안전(실행 안 됨) / 애매함(실행됐을 수도 있음) / 일시 오류 아님
+- 지터 포함 지수 백오프 (full jitter)
+- 서킷 브레이커: DB가 깨어나는 중(40613 등)이면 연속 실패 후 일정 시간 즉시 실패
+"""
+
+import random
+import re
+import threading
+import time
+
+# 코드 → (재시도 안전 여부, DB 장애로 볼지 여부)
+# 재시도 안전: 서버가 요청을 거절/롤백해서 문장이 커밋되지 않았음이 보장되는 경우
+TRANSIENT_ERRORS = {
+    40613: (True, True),    # Database not currently available (일시 중지/재시작)
+    40501: (True, True),    # Service is currently busy
+    40540: (True, True),    # Service has encountered an error processing your request
+    40197: (False, True),   # 장애 조치 중 처리 오류 — 커밋 여부 불명
+    40143: (True, True),    # Service has encountered an error processing your request
+    49918: (True, True),    # Cannot process request. Not enough resources
+    49919: (True, True),    # Too many create/update operations
+    49920: (True, True),    # Too many operations in progress
+    10928: (True, False),   # Resource ID 한도 (요청/세션 수)
+    10929: (True, False),   # Resource ID 최소 보장 초과
+    4060:  (True, True),    # Cannot open database (재시작 직후)
+    4221:  (True, False),   # 읽기 복제본 로그인 실패 (HADR)
+    1205:  (True, False),   # Deadlock victim — 트랜잭션 롤백됨
+    20009: (True, True),    # DB-Lib: Unable to connect
+    20006: (False, True),   # DB-Lib: Write to the server failed — 실행 여부 불명
+    20047: (False, True),   # DB-Lib: Dead or not enabled
+    10053: (False, True),   # 연결 중단
+    10054: (False, True),   # 연결 재설정
+    10060: (True, True),    # 연결 시간 초과
+}
+
+_CODE_PATTERN = re.compile(r"\b(\d{4,5})\b")
+
+SAFE = "safe"
+AMBIGUOUS = "ambiguous"
+
+BASE_DELAY_SECONDS = 0.5
+MAX_DELAY_SECONDS = 8.0
+MAX_ATTEMPTS = 5
+RETRY_BUDGET_SECONDS = 20.0
+
+
+class NotExecuted(Exception):
+    """연결 획득 단계 또는 끊긴 풀 연결에서 실패 → 문장이 서버에 전달되지 않음."""
+
+    def __init__(self, cause: Exception, stale: bool = False):
+        super().__init__(str(cause))
+        self.cause = cause
+        self.stale = stale
+
+
+def _error_chain(exc: Exception):
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc = getattr(exc, "orig", None) or getattr(exc, "cause", None) or exc.__cause__
+
+
+def _error_codes(exc: Exception) -> set:
+    codes = set()
+    for err in _error_chain(exc):
+        if getattr(err, "orig", None) is not None or isinstance(err, NotExecuted):
+            # SQLAlchemy 래퍼 메시지에는 SQL/파라미터가 섞여 있어 숫자 오탐 → 원본 DBAPI 오류만 검사
+            continue
+        for arg in getattr(err, "args", ()):
+            if isinstance(arg, int):
+                codes.add(arg)
+            elif isinstance(arg, (str, bytes)):
+                text = arg.decode("utf-8", "replace") if isinstance(arg, bytes) else arg
+                codes.update(int(c) for c in _CODE_PATTERN.findall(text))
+    return codes & TRANSIENT_ERRORS.keys()
+
+
+def classify(exc: Exception):
+    """
+    (종류, 장애 여부) 반환. 종류는 SAFE / AMBIGUOUS / None(일시 오류 아님).
+    """
+    if isinstance(exc, NotExecuted) and exc.stale:
+        return SAFE, False
+    codes = _error_codes(exc)
+    if not codes:
+        return None, False
+    safe = isinstance(exc, NotExecuted) or all(TRANSIENT_ERRORS[c][0] for c in codes)
+    outage = any(TRANSIENT_ERRORS[c][1] for c in codes)
+    return (SAFE if safe else AMBIGUOUS), outage
+
+
+def backoff_delay(attempt: int) -> float:
+    """full jitter: 0 ~ min(cap, base * 2^attempt) 사이 무작위."""
+    return random.uniform(0, min(MAX_DELAY_SECONDS, BASE_DELAY_SECONDS * (2 ** attempt)))
+
+
+_WRITE_KEYWORDS = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|CREATE|ALTER|DROP|TRUNCATE|EXEC|EXECUTE)\b", re.IGNORECASE)
+
+def is_read_only(query: str) -> bool:
+    return not _WRITE_KEYWORDS.search(query)
+
+
+# ─────────────────────────────────────────────
+# 서킷 브레이커
+# ─────────────────────────────────────────────
+class CircuitBreaker:
+    """
+    closed → (연속 장애 failure_threshold회) → open (cooldown 동안 즉시 실패)
+    → half_open (한 요청만 시험) → 성공 시 closed / 실패 시 cooldown 2배로 다시 open
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 15.0, max_cooldown: float = 120.0):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._cooldown = cooldown
+        self._open_until = 0.0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state != "closed" and time.monotonic() >= self._open_until:
+                return "half_open"
+            return self._state
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return max(0.0, self._open_until - time.monotonic()) if self._state == "open" else 0.0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == "closed":
+                return True
+            now = time.monotonic()
+            if now >= self._open_until:
+                # 이 호출이 시험 요청. 시험이 응답 없이 멈춰도 cooldown 뒤 다음 시험 허용
+                self._state = "half_open"
+                self._open_until = now + self._cooldown
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._cooldown = self.base_cooldown
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == "half_open":
+                self._cooldown = min(self.max_cooldown, self._cooldown * 2)
+                self._trip()
+            elif self._failures >= self.failure_threshold:
+                self._trip()
+
+    def _trip(self):
+        self._state = "open"
+        self._open_until = time.monotonic() + self._cooldown
+
+
+breaker = CircuitBreaker()
@@ -0,0 +1,169 @@
+# idempotency.py
+"""
+지출/수입 중복 등록 방지 (등록 시점, DB 유니크 인덱스로 O(1) 판정)
+- 제출 토큰: 폼마다 세션에 발급, 등록 성공 후에만 교체
+    더블클릭/네트워크 지연 후 rerun으로 같은 토큰이 다시 오면 '이미 등록됨' (아무것도 안 씀)
+- 내용 지문: sha256(프로젝트 | 날짜 | 금액 | 정규화한 내역) → 같은 내용은 한 번 경고 후 거절
+    같은 값으로 한 번 더 제출하면 의도한 중복으로 보고 지문 없이 등록 (이상 징후 탐지에는 그대로 잡힘)
+- INSERT ... SELECT ... WHERE NOT EXISTS(토큰/지문) → 유니크 인덱스(ux_<table>_*)는 동시 제출 대비
+    토큰이 있으면 재실행해도 안전하므로 run_query(idempotent=True)로 애매한 오류도 재시도
+- submit_once(post=...): 등록과 전표 처리를 한 트랜잭션으로 (전표가 실패하면 행도 롤백)
+- 수정 시에는 지문을 다시 계산 (다른 행과 겹치면 NULL)
+"""
+
+import hashlib
+import re
+import unicodedata
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+import streamlit as st
+
+from db import Transaction, run_query, run_transaction
+
+SUBMISSION_TABLES = ("expenses", "budget_entries", "members")
+
+INSERTED = "inserted"
+RESUBMITTED = "resubmitted"     # 같은 토큰 재전송 → 이미 처리됨
+DUPLICATE = "duplicate"         # 다른 제출이지만 같은 내용이 이미 있음
+FAILED = "failed"               # DB 오류 (run_query가 화면에 표시)
+
+_SPACES = re.compile(r"\s+")
+
+
+@dataclass(frozen=True)
+class InsertOutcome:
+    status: str
+    row_id: Optional[int] = None
+
+    @property
+    def inserted(self) -> bool:
+        return self.status == INSERTED
+
+
+def normalize(text) -> str:
+    return _SPACES.sub(" ", unicodedata.normalize("NFKC", str(text or "")).strip().lower())
+
+
+def fingerprint(project_id: int, tx_date: str, amount: int, *parts) -> str:
+    key = "|".join([str(int(project_id)), str(tx_date)[:10], str(int(amount)), *(normalize(p) for p in parts)])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _token_key(scope: str) -> str:
+    return f"submission_token_{scope}"
+
+
+def form_token(scope: str) -> str:
+    """폼 단위 제출 토큰. 등록이 성공해 rotate_token()을 부를 때까지 같은 값."""
+    key = _token_key(scope)
+    if key not in st.session_state:
+        st.session_state[key] = uuid.uuid4().hex
+    return st.session_state[key]
+
+
+def rotate_token(scope: str):
+    st.session_state[_token_key(scope)] = uuid.uuid4().hex
+    st.session_state.pop(f"duplicate_ok_{scope}", None)
+
+
+def allow_duplicate_once(scope: str, fp: str) -> bool:
+    """
+    직전에 DUPLICATE로 거절된 같은 지문을 다시 제출하면 True (의도한 중복).
+    처음이면 지문을 기억하고 False.
+    """
+    key = f"duplicate_ok_{scope}"
+    if st.session_state.get(key) == fp:
+        return True
+    st.session_state[key] = fp
+    return False
+
+
+def insert_once(table: str, values: dict, token: str, fp: Optional[str], tx: Transaction = None) -> InsertOutcome:
+    """
+    values를 한 번만 INSERT. fp=None이면 지문 검사 없이 토큰만 확인.
+    반환 status: inserted / resubmitted(row_id = 기존 행) / duplicate(row_id = 같은 내용의 기존 행) / failed
+    tx를 주면 그 트랜잭션 안에서 실행 (DB 오류는 예외로 올라감).
+    """
+    if table not in SUBMISSION_TABLES:
+        raise ValueError(f"unsupported table: {table}")
+    columns = ", ".join(values)
+    placeholders = ", ".join(f":{name}" for name in values)
+    params = {**values, "submission_token": token, "fingerprint": fp}
+    insert_kwargs = {"fetch": True} if tx is not None else {"fetch": True, "idempotent": True}
+    query = tx.query if tx is not None else run_query
+    df = query(
+        f"""
+        INSERT INTO {table} ({columns}, submission_token, fingerprint)
+        OUTPUT INSERTED.id
+        SELECT {placeholders}, :submission_token, :fingerprint
+        WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE submission_token = :submission_token)
+          AND NOT EXISTS (SELECT 1 FROM {table} WHERE fingerprint = :fingerprint)
+        """,
+        params, **insert_kwargs,
+    )
+    if df is not None and not df.empty:
+        if tx is None:
+            st.cache_data.clear()  # fetch=True 쓰기는 run_query가 캐시를 비우지 않음 (트랜잭션은 커밋 후 비움)
+        return InsertOutcome(INSERTED, int(df.iloc[0]["id"]))
+
+    existing = query(
+        f"""
+        SELECT TOP (1) id, CASE WHEN submission_token = :submission_token THEN 1 ELSE 0 END AS same_token
+        FROM {table}
+        WHERE submission_token = :submission_token OR fingerprint = :fingerprint
+        ORDER BY CASE WHEN submission_token = :submission_token THEN 0 ELSE 1 END
+        """,
+        {"submission_token": token, "fingerprint": fp}, fetch=True,
+    )
+    if existing is None or existing.empty:
+        return InsertOutcome(FAILED)
+    row = existing.iloc[0]
+    return InsertOutcome(RESUBMITTED if int(row["same_token"]) else DUPLICATE, int(row["id"]))
+
+
+def submit_once(scope: str, table: str, values: dict, fp: str, post=None) -> InsertOutcome:
+    """
+    폼 제출 1회 처리: 토큰 + 지문 검사, 같은 내용 재제출이면 의도한 중복으로 등록.
+    post(tx, row_id)를 주면 등록과 같은 트랜잭션에서 실행 (전표 처리 등) → 예외가 나면 행도 남지 않고
+    예외는 그대로 올라감 (PeriodClosedError 등). 등록되면 토큰 교체.
+    """
+    token = form_token(scope)
+    duplicate_ok = st.session_state.get(f"duplicate_ok_{scope}") == fp
+
+    def work(tx):
+        outcome = insert_once(table, values, token, fp, tx=tx)
+        if outcome.status == DUPLICATE and duplicate_ok:
+            outcome = insert_once(table, values, token, None, tx=tx)
+        if outcome.inserted and post is not None:
+            post(tx, outcome.row_id)
+        return outcome
+
+    # 토큰 검사가 문장 안에 있어 재실행해도 안전 → 애매한 오류도 재시도
+    outcome = run_transaction(work, idempotent=True)
+    if outcome is None:
+        return InsertOutcome(FAILED)
+    if outcome.status == DUPLICATE:
+        allow_duplicate_once(scope, fp)  # 다음에 같은 내용으로 다시 내면 의도한 중복
+    if outcome.inserted:
+        rotate_token(scope)
+    return outcome
+
+
+def show_rejection(outcome: InsertOutcome, submit_label: str):
+    """등록되지 않은 이유 안내. 등록됐거나 DB 오류면 아무것도 안 함."""
+    if outcome.status == RESUBMITTED:
+        st.info(f"이미 처리된 제출이에요 (ID {outcome.row_id}). 중복 클릭/새로고침으로 다시 들어온 요청은 무시했어요.")
+    elif outcome.status == DUPLICATE:
+        st.warning(
+            f"⚠️ 같은 날짜·금액·내용이 이미 등록되어 있어요 (ID {outcome.row_id}). "
+            f"정말 한 번 더 등록하려면 같은 내용으로 '{submit_label}'을 다시 눌러주세요."
+        )
+
+
+def fingerprint_assignment(table: str) -> str:
+    """UPDATE SET 절 조각: 수정된 내용의 지문(:fingerprint), 다른 행과 겹치면 NULL. :id 필요."""
+    return f"""fingerprint = CASE WHEN EXISTS (
+                   SELECT 1 FROM {table} d WHERE d.fingerprint = :fingerprint AND d.id <> :id
+               ) THEN NULL ELSE :fingerprint END"""
@@ -0,0 +1,170 @@
+# password_hashing.py
+"""
+비밀번호 해시 (KDF)
+- 저장 형식에 알고리즘/비용/솔트를 함께 기록
+    pbkdf2_sha256$<iterations>$<salt_b64>$<hash_b64>
+    scrypt$<n>$<r>$<p>$<salt_b64>$<hash_b64>
+- 구버전 형식(솔트 없는 SHA-256 hex)도 검증 가능 → 로그인 성공 시 needs_rehash()로 재해시
+- 비용은 Secrets/환경변수로 조정하고, calibrate()로 서버에서 목표 로그인 지연시간에 맞춤
+    python password_hashing.py --target-ms 250
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import time
+
+from config import _secret_get
+
+PBKDF2 = "pbkdf2_sha256"
+SCRYPT = "scrypt"
+
+DEFAULT_SCHEME = PBKDF2
+DEFAULT_PBKDF2_ITERATIONS = 600_000
+DEFAULT_SCRYPT_N = 2 ** 15
+DEFAULT_SCRYPT_R = 8
+DEFAULT_SCRYPT_P = 1
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii").rstrip("=")
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+def _int_setting(key: str, default: int) -> int:
+    try:
+        return int(_secret_get(key, default=default))
+    except (TypeError, ValueError):
+        return default
+
+def current_params() -> dict:
+    """Secrets/환경변수 기준 현재 해시 설정."""
+    scheme = _secret_get("PASSWORD_HASH_SCHEME", default=DEFAULT_SCHEME)
+    if scheme == SCRYPT:
+        return {
+            "scheme": SCRYPT,
+            "n": _int_setting("SCRYPT_N", DEFAULT_SCRYPT_N),
+            "r": _int_setting("SCRYPT_R", DEFAULT_SCRYPT_R),
+            "p": _int_setting("SCRYPT_P", DEFAULT_SCRYPT_P),
+        }
+    return {"scheme": PBKDF2, "iterations": _int_setting("PBKDF2_ITERATIONS", DEFAULT_PBKDF2_ITERATIONS)}
+
+
+def _scrypt(password: bytes, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # scrypt 메모리 사용량 ≈ 128 * n * r 바이트 → 여유 있게 maxmem 지정
+    return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p, dklen=HASH_BYTES, maxmem=256 * n * r + 1024 * 1024)
+
+def _derive(password: str, salt: bytes, params: dict) -> bytes:
+    pw = password.encode("utf-8")
+    if params["scheme"] == SCRYPT:
+        return _scrypt(pw, salt, params["n"], params["r"], params["p"])
+    return hashlib.pbkdf2_hmac("sha256", pw, salt, params["iterations"], dklen=HASH_BYTES)
+
+
+def hash_password(password: str, params: dict = None) -> str:
+    params = params or current_params()
+    salt = os.urandom(SALT_BYTES)
+    digest = _derive(password, salt, params)
+    if params["scheme"] == SCRYPT:
+        return f"{SCRYPT}${params['n']}${params['r']}${params['p']}${_b64(salt)}${_b64(digest)}"
+    return f"{PBKDF2}${params['iterations']}${_b64(salt)}${_b64(digest)}"
+
+
+def _parse(stored: str):
+    """저장된 해시 → (params, salt, digest). 구버전 SHA-256이면 params['scheme']='sha256'."""
+    parts = stored.split("$")
+    if parts[0] == PBKDF2 and len(parts) == 4:
+        return {"scheme": PBKDF2, "iterations": int(parts[1])}, _unb64(parts[2]), _unb64(parts[3])
+    if parts[0] == SCRYPT and len(parts) == 6:
+        params = {"scheme": SCRYPT, "n": int(parts[1]), "r": int(parts[2]), "p": int(parts[3])}
+        return params, _unb64(parts[4]), _unb64(parts[5])
+    return {"scheme": "sha256"}, b"", stored
+
+
+def verify_password(password: str, stored: str) -> bool:
+    if not stored:
+        return False
+    try:
+        params, salt, digest = _parse(stored)
+    except (ValueError, TypeError):
+        return False
+    if params["scheme"] == "sha256":
+        legacy = hashlib.sha256(password.encode("utf-8")).hexdigest()
+        return hmac.compare_digest(legacy, digest)
+    return hmac.compare_digest(_derive(password, salt, params), digest)
+
+
+def needs_rehash(stored: str) -> bool:
+    """구버전 형식이거나 현재 설정과 알고리즘/비용이 다르면 True."""
+    if not stored:
+        return False
+    try:
+        params, _, _ = _parse(stored)
+    except (ValueError, TypeError):
+        return True
+    return params != current_params()
+
+
+# ─────────────────────────────────────────────
+# 비용 보정 (benchmark harness)
+# ─────────────────────────────────────────────
+def _time_once(params: dict, repeat: int = 3) -> float:
+    salt = os.urandom(SALT_BYTES)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _derive("calibration-password", salt, params)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def calibrate(scheme: str = DEFAULT_SCHEME, target_ms: float = 250.0) -> tuple[dict, float]:
+    """
+    이 서버에서 1회 해시가 target_ms를 넘지 않는 가장 큰 비용을 찾는다.
+    (params, 측정 ms) 반환. PBKDF2는 반복 횟수를 선형 보정, scrypt는 n을 2배씩 올림.
+    """
+    if scheme == SCRYPT:
+        params = {"scheme": SCRYPT, "n": 2 ** 12, "r": DEFAULT_SCRYPT_R, "p": DEFAULT_SCRYPT_P}
+        elapsed = _time_once(params)
+        while True:
+            bigger = dict(params, n=params["n"] * 2)
+            bigger_ms = _time_once(bigger)
+            if bigger_ms > target_ms:
+                return params, elapsed
+            params, elapsed = bigger, bigger_ms
+
+    probe = {"scheme": PBKDF2, "iterations": 100_000}
+    per_iter_ms = _time_once(probe) / probe["iterations"]
+    iterations = max(100_000, int(target_ms / per_iter_ms) // 10_000 * 10_000)
+    params = {"scheme": PBKDF2, "iterations": iterations}
+    elapsed = _time_once(params)
+    if elapsed > target_ms and iterations > 100_000:
+        # 큰 반복 횟수에서 선형 추정이 약간 넘치는 경우 한 번 더 보정
+        params["iterations"] = max(100_000, int(iterations * target_ms / elapsed) // 10_000 * 10_000)
+        elapsed = _time_once(params)
+    return params, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="비밀번호 해시 비용 보정")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="로그인 1회당 허용할 해시 시간(ms)")
+    parser.add_argument("--scheme", choices=[PBKDF2, SCRYPT], default=DEFAULT_SCHEME)
+    args = parser.parse_args()
+
+    params, elapsed = calibrate(args.scheme, args.target_ms)
+    print(f"측정: {elapsed:.1f}ms (목표 {args.target_ms:.0f}ms)")
+    print("Secrets 설정 예시:")
+    print(f'PASSWORD_HASH_SCHEME = "{params["scheme"]}"')
+    if params["scheme"] == SCRYPT:
+        print(f'SCRYPT_N = {params["n"]}\nSCRYPT_R = {params["r"]}\nSCRYPT_P = {params["p"]}')
+    else:
+        print(f'PBKDF2_ITERATIONS = {params["iterations"]}')
+
+
+if __name__ == "__main__":
+    main()
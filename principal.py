@@ -0,0 +1,146 @@
+# principal.py
+"""
+세션 단위 인증 주체(principal) 캐시
+- 로그인 시 역할/권한을 frozenset으로 고정하고 approved_users.perm_version을 함께 저장
+- N초마다 PK 조회 한 번(perm_version, status)으로 재검증
+  → 정지/거절은 빠르게 반영되고, 버전이 바뀐 경우에만 전체 사용자 정보를 다시 읽음
+- 권한 판단은 has_permission() 하나로 통일
+"""
+
+import time
+from dataclasses import dataclass, replace
+
+import streamlit as st
+
+from db import run_query
+from security import PRIVILEGED_ROLES, _normalize_role, _parse_permissions
+from system_config import get_system_config
+
+DEFAULT_REVALIDATE_SECONDS = 30
+
+
+@dataclass(frozen=True)
+class Principal:
+    student_id: str
+    name: str
+    role: str
+    status: str
+    permissions: frozenset
+    version: int
+    checked_at: float
+
+    def to_user(self) -> dict:
+        return {
+            "name": self.name,
+            "student_id": self.student_id,
+            "role": self.role,
+            "permissions": self.permissions,
+            "perm_version": self.version,
+        }
+
+
+def _is_active(role: str, status: str) -> bool:
+    # authenticate_user와 같은 규칙: 총무는 PENDING이어도 로그인 허용
+    return status == "APPROVED" or (role == "treasurer" and status == "PENDING")
+
+
+def has_permission(current_user: dict, permission: str) -> bool:
+    if not current_user:
+        return False
+    return permission in current_user.get("permissions", ()) or current_user.get("role") in PRIVILEGED_ROLES
+
+
+def sign_in(user: dict) -> dict:
+    principal = Principal(
+        student_id=user.get("student_id"),
+        name=user.get("name"),
+        role=_normalize_role(user.get("role")),
+        status=user.get("status", "APPROVED"),
+        permissions=frozenset(user.get("permissions") or ()),
+        version=int(user.get("perm_version") or 0),
+        checked_at=time.monotonic(),
+    )
+    return _store(principal)
+
+
+def sign_out():
+    st.session_state.pop("principal", None)
+    st.session_state.pop("current_user", None)
+
+
+def _store(principal: Principal) -> dict:
+    st.session_state["principal"] = principal
+    st.session_state["current_user"] = principal.to_user()
+    return st.session_state["current_user"]
+
+
+def _reload(principal: Principal):
+    df = run_query(
+        "SELECT name, role, status, permissions, perm_version FROM approved_users WHERE student_id = :sid",
+        {"sid": principal.student_id},
+        fetch=True,
+    )
+    if df is None or df.empty:
+        return None
+    row = df.iloc[0]
+    role = _normalize_role(row["role"])
+    return replace(
+        principal,
+        name=row["name"],
+        role=role,
+        status=row["status"],
+        permissions=frozenset(_parse_permissions(row["permissions"], role)),
+        version=int(row["perm_version"] or 0),
+        checked_at=time.monotonic(),
+    )
+
+
+def revalidate_current_user():
+    """
+    로그인된 사용자를 주기적으로 재검증. 세션이 무효화되면 None 반환.
+    재검증 주기는 system_config의 principal_revalidate_seconds (기본 30초).
+    """
+    user = st.session_state.get("current_user")
+    if not user:
+        return None
+
+    principal = st.session_state.get("principal")
+    if principal is None:
+        principal = Principal(
+            student_id=user.get("student_id"), name=user.get("name"),
+            role=_normalize_role(user.get("role")), status="APPROVED",
+            permissions=frozenset(user.get("permissions") or ()),
+            version=int(user.get("perm_version") or 0), checked_at=0.0,
+        )
+
+    interval = get_system_config().get_int("principal_revalidate_seconds", DEFAULT_REVALIDATE_SECONDS)
+    if time.monotonic() - principal.checked_at < interval:
+        return user
+
+    df = run_query(
+        "SELECT perm_version, status FROM approved_users WHERE student_id = :sid",
+        {"sid": principal.student_id},
+        fetch=True,
+    )
+    if df is None:
+        # DB 오류 시에는 기존 세션 유지 (다음 rerun에 다시 확인)
+        return user
+    if df.empty:
+        sign_out()
+        return None
+
+    version = int(df.iloc[0]["perm_version"] or 0)
+    status = df.iloc[0]["status"]
+    if not _is_active(principal.role, status):
+        sign_out()
+        return None
+
+    if version != principal.version:
+        principal = _reload(principal)
+        if principal is None or not _is_active(principal.role, principal.status):
+            sign_out()
+            return None
+    else:
+        principal = replace(principal, status=status, checked_at=time.monotonic())
+
+    return _store(principal)
@@ -0,0 +1,213 @@
+# profiler.py
+"""
+rerun 단위 프로파일러 (opt-in)
+- 켜는 법: ?profile=1 (총무 로그인 상태) 또는 Secrets PROFILE_MODE
+    값: wall(기본) / cpu (cProfile) / mem (tracemalloc), 쉼표로 조합 가능 (예: cpu,mem)
+- section("이름")으로 감싼 구간의 wall-clock(+메모리) 시간을 중첩 트리로 기록
+- 프로세스 단위로 rerun 간 누적 → 화면 하단 flame 스타일 표 / pstats 파일 덤프
+- 꺼져 있으면 section()은 아무 것도 하지 않음
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from config import _secret_get
+
+PROFILE_DIR = "profiles"
+TOP_FUNCTIONS = 25
+PRIVILEGED_ROLES = {"treasurer", "admin"}
+
+_local = threading.local()
+_lock = threading.Lock()
+_totals = {}                  # path -> {"calls", "total_ms", "self_ms", "max_ms", "mem_kb"}
+_cpu_stats = {"stats": None, "reruns": 0}
+
+
+def _requested_modes() -> set:
+    raw = _secret_get("PROFILE_MODE", default="")
+    if not raw:
+        user = st.session_state.get("current_user") or {}
+        if user.get("role") not in PRIVILEGED_ROLES:
+            return set()
+        raw = st.query_params.get("profile", "")
+    modes = {m.strip().lower() for m in str(raw).split(",") if m.strip()}
+    if not modes or modes & {"0", "false", "off"}:
+        return set()
+    return ({"wall"} | modes) & {"wall", "cpu", "mem"}
+
+
+class _Run:
+    def __init__(self, modes: set):
+        self.modes = modes
+        self.stack = []           # [(path, started, child_ms, mem_start)]
+        self.spans = []           # [(path, total_ms, self_ms, mem_kb)] 이번 rerun
+        self.profile = cProfile.Profile() if "cpu" in modes else None
+
+
+@contextmanager
+def session():
+    """rerun 전체를 감쌈. 프로파일링이 꺼져 있으면 바로 통과."""
+    modes = _requested_modes()
+    if not modes:
+        yield
+        return
+
+    run = _Run(modes)
+    _local.run = run
+    started_tracing = False
+    if "mem" in modes and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        started_tracing = True
+    if run.profile:
+        try:
+            run.profile.enable()
+        except ValueError:
+            # 다른 세션이 이미 프로파일러를 쓰는 중 (Python 3.12+는 프로세스당 하나)
+            run.profile = None
+    try:
+        with section("main"):
+            yield
+    finally:
+        if run.profile:
+            run.profile.disable()
+        if started_tracing:
+            tracemalloc.stop()
+        _local.run = None
+        _merge(run)
+
+
+@contextmanager
+def section(name: str):
+    run = getattr(_local, "run", None)
+    if run is None:
+        yield
+        return
+
+    parent = run.stack[-1][0] if run.stack else ""
+    path = f"{parent}/{name}" if parent else name
+    mem_start = tracemalloc.get_traced_memory()[0] if "mem" in run.modes and tracemalloc.is_tracing() else None
+    run.stack.append([path, time.perf_counter(), 0.0, mem_start])
+    try:
+        yield
+    finally:
+        path, started, child_ms, mem_start = run.stack.pop()
+        total_ms = (time.perf_counter() - started) * 1000
+        mem_kb = None
+        if mem_start is not None and tracemalloc.is_tracing():
+            mem_kb = (tracemalloc.get_traced_memory()[0] - mem_start) / 1024
+        run.spans.append((path, total_ms, total_ms - child_ms, mem_kb))
+        if run.stack:
+            run.stack[-1][2] += total_ms
+
+
+def _merge(run: _Run):
+    with _lock:
+        for path, total_ms, self_ms, mem_kb in run.spans:
+            entry = _totals.setdefault(path, {"calls": 0, "total_ms": 0.0, "self_ms": 0.0, "max_ms": 0.0, "mem_kb": 0.0})
+            entry["calls"] += 1
+            entry["total_ms"] += total_ms
+            entry["self_ms"] += self_ms
+            entry["max_ms"] = max(entry["max_ms"], total_ms)
+            if mem_kb is not None:
+                entry["mem_kb"] += mem_kb
+        if run.profile:
+            stats = pstats.Stats(run.profile)
+            if _cpu_stats["stats"] is None:
+                _cpu_stats["stats"] = stats
+            else:
+                _cpu_stats["stats"].add(stats)
+            _cpu_stats["reruns"] += 1
+    _local.last_modes = run.modes
+
+
+def breakdown() -> pd.DataFrame:
+    """누적 구간 트리 (부모 → 자식 순서, 평균은 호출당)."""
+    with _lock:
+        items = sorted(_totals.items())
+    if not items:
+        return pd.DataFrame()
+    root_ms = max(e["total_ms"] / e["calls"] for p, e in items if "/" not in p) or 1.0
+    rows = []
+    for path, e in items:
+        depth = path.count("/")
+        avg_ms = e["total_ms"] / e["calls"]
+        rows.append({
+            "구간": "　" * depth + path.rsplit("/", 1)[-1],
+            "호출": e["calls"],
+            "평균 ms": round(avg_ms, 1),
+            "self ms": round(e["self_ms"] / e["calls"], 1),
+            "최대 ms": round(e["max_ms"], 1),
+            "메모리 KB": round(e["mem_kb"] / e["calls"], 1),
+            "비중": min(1.0, avg_ms / root_ms),
+        })
+    return pd.DataFrame(rows)
+
+
+def cpu_top(limit: int = TOP_FUNCTIONS) -> str:
+    with _lock:
+        stats = _cpu_stats["stats"]
+        if stats is None:
+            return ""
+        buffer = io.StringIO()
+        stats.stream = buffer
+        stats.sort_stats("cumulative").print_stats(limit)
+    return buffer.getvalue()
+
+
+def dump_pstats() -> str:
+    """누적 cProfile 결과를 profiles/*.prof로 저장 (snakeviz 등으로 분석)."""
+    with _lock:
+        stats = _cpu_stats["stats"]
+        if stats is None:
+            return None
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"rerun_{datetime.now():%Y%m%d_%H%M%S}.prof")
+        stats.dump_stats(path)
+    return path
+
+
+def reset():
+    with _lock:
+        _totals.clear()
+        _cpu_stats["stats"] = None
+        _cpu_stats["reruns"] = 0
+
+
+def render_report():
+    """프로파일링 중인 rerun에서만 화면 하단에 누적 결과 표시."""
+    modes = getattr(_local, "last_modes", None)
+    _local.last_modes = None
+    if not modes:
+        return
+
+    with st.expander(f"🔬 프로파일 ({', '.join(sorted(modes))})", expanded=True):
+        df = breakdown()
+        if df.empty:
+            st.info("기록된 구간이 없습니다.")
+        else:
+            if "mem" not in modes:
+                df = df.drop(columns=["메모리 KB"])
+            st.dataframe(
+                df, hide_index=True, use_container_width=True,
+                column_config={"비중": st.column_config.ProgressColumn("비중", min_value=0.0, max_value=1.0, format="%.2f")},
+            )
+
+        if "cpu" in modes:
+            st.caption(f"cProfile 누적 {_cpu_stats['reruns']}회 rerun (cumulative 상위 {TOP_FUNCTIONS})")
+            st.code(cpu_top(), language="text")
+            if st.button("pstats 저장", key="profile_dump"):
+                st.success(f"저장됨: {dump_pstats()}")
+
+        if st.button("누적 초기화", key="profile_reset"):
+            reset()
+            st.rerun()
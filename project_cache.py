@@ -0,0 +1,240 @@
+# project_cache.py
+"""
+프로젝트별 원본 테이블 스냅샷 디스크 캐시 (Arrow/Feather, 증분 갱신)
+- 파일: SNAPSHOT_CACHE_DIR/<DB별 해시>/<project_id>/<table>.arrow (비압축 Feather → memory_map으로 읽기)
+    워터마크(행 수, MAX(id), MAX(updated_at), 마지막 삭제 기록 id)는 파일 스키마 메타데이터에 같이 저장
+- 읽을 때마다 버전 쿼리 1회 (project_id 인덱스 범위 집계, 행은 안 가져옴)
+    같으면 디스크에서 바로 읽음 / 다르면 id > MAX(id) 또는 updated_at >= 마지막 변경 시각인 행만 조회
+    삭제는 row_tombstones(AFTER DELETE 트리거가 채움)에서 마지막 id 이후만 읽어 제거
+    합친 결과 행 수가 DB와 다르면 전체 다시 읽음 (트리거 생기기 전 삭제 등)
+- 지출의 영수증 표시는 receipt_images 버전이 바뀌었을 때만 다시 계산
+- pyarrow가 없거나 SNAPSHOT_CACHE_DIR="" 이면 매번 전체 조회 (이전 동작)
+    로컬 SQLite(벤치마크/개발)는 SNAPSHOT_CACHE_DIR를 지정했을 때만 사용
+- Parquet 대신 Feather: 압축을 안 하면 mmap으로 바로 열 수 있고 쓰기도 빠름
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import defaultdict
+
+import pandas as pd
+
+from config import _secret_get
+from db import _get_engine, run_query, watermark_param
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # 선택 의존성
+    pa = feather = None
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "snapshots")
+META_KEY = b"project_cache"
+FORMAT_VERSION = 1      # 쿼리/컬럼이 바뀌면 올림 → 기존 파일은 전체 다시 읽음
+
+# 테이블별 조회 쿼리 (별칭 t, {delta}에 증분 조건 삽입), 컬럼, 정렬
+TABLES = {
+    "budget_entries": {
+        "sql": """
+            SELECT t.id, t.entry_date, t.source_type, t.contributor_name, t.amount, t.note,
+                   COALESCE(t.extra_label,'') AS extra_label, t.created_at
+            FROM budget_entries t
+            WHERE t.project_id = :pid {delta}
+        """,
+        "columns": ["id", "entry_date", "source_type", "contributor_name", "amount", "note", "extra_label", "created_at"],
+        "order": ["entry_date", "id"],
+    },
+    "members": {
+        "sql": """
+            SELECT t.id, t.paid_date, t.name, t.student_id, t.deposit_amount, t.note
+            FROM members t
+            WHERE t.project_id = :pid {delta}
+        """,
+        "columns": ["id", "paid_date", "name", "student_id", "deposit_amount", "note"],
+        "order": ["paid_date", "id"],
+    },
+    "expenses": {
+        "sql": """
+            SELECT t.id, t.date, t.category, t.item, t.amount, t.created_at,
+                   CASE WHEN EXISTS (SELECT 1 FROM receipt_images r WHERE r.expense_id = t.id)
+                        THEN '🧾' ELSE '' END AS 영수증
+            FROM expenses t
+            WHERE t.project_id = :pid {delta}
+        """,
+        "columns": ["id", "date", "category", "item", "amount", "created_at", "영수증"],
+        "order": ["date", "id"],
+        "receipts": True,
+    },
+}
+
+_VERSION_SQL = """
+    SELECT COUNT(*) AS n, ISNULL(MAX(t.id), 0) AS max_id, MAX(t.updated_at) AS changed_at,
+           (SELECT ISNULL(MAX(d.id), 0) FROM row_tombstones d
+            WHERE d.table_name = :tbl AND d.project_id = :pid) AS tomb_id
+           {receipts}
+    FROM {table} t
+    WHERE t.project_id = :pid
+"""
+_RECEIPT_VERSION = """,
+           (SELECT COUNT(*) FROM receipt_images r WHERE r.project_id = :pid) AS receipt_n,
+           (SELECT MAX(r.updated_at) FROM receipt_images r WHERE r.project_id = :pid) AS receipt_t"""
+
+_locks = defaultdict(threading.Lock)
+
+
+def enabled() -> bool:
+    return pa is not None and bool(_cache_root())
+
+
+def _cache_root() -> str:
+    configured = _secret_get("SNAPSHOT_CACHE_DIR")
+    if configured is None:
+        # 로컬 SQLite 대체 DB는 네트워크 왕복이 없어 디스크 캐시가 오히려 느림 → 명시했을 때만 사용
+        return "" if _get_engine().dialect.name == "sqlite" else DEFAULT_CACHE_DIR
+    return str(configured)
+
+
+def _path(project_id: int, table: str) -> str:
+    # 같은 디렉터리를 여러 DB(운영/벤치마크)가 써도 섞이지 않게 접속 URL별로 분리
+    url = _get_engine().url.render_as_string(hide_password=True)
+    db_key = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(_cache_root(), db_key, str(int(project_id)), f"{table}.arrow")
+
+
+def _query(table: str, project_id: int, delta: str = "", params: dict = None) -> pd.DataFrame:
+    spec = TABLES[table]
+    df = run_query(spec["sql"].format(delta=delta), {"pid": project_id, **(params or {})}, fetch=True)
+    if df is None:
+        return None
+    return df.reindex(columns=spec["columns"])
+
+
+def _sorted(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    order = TABLES[table]["order"]
+    return df.sort_values(order, ascending=False, kind="stable").reset_index(drop=True)
+
+
+def _version(table: str, project_id: int) -> dict:
+    receipts = _RECEIPT_VERSION if TABLES[table].get("receipts") else ""
+    df = run_query(
+        _VERSION_SQL.format(table=table, receipts=receipts),
+        {"pid": project_id, "tbl": table}, fetch=True,
+    )
+    if df is None or df.empty:
+        return None
+    row = df.iloc[0]
+    return {
+        "format": FORMAT_VERSION,
+        "n": int(row["n"]),
+        "max_id": int(row["max_id"]),
+        "changed_at": watermark_param(row["changed_at"]),
+        "tomb_id": int(row["tomb_id"]),
+        "receipts": f"{int(row['receipt_n'])}|{watermark_param(row['receipt_t'])}" if receipts else None,
+    }
+
+
+# ── 디스크 읽기/쓰기 ────────────────────────────────────────────────────────
+def _read(path: str):
+    """(프레임, 워터마크). 파일이 없거나 깨졌으면 (None, None)."""
+    try:
+        arrow = feather.read_table(path, memory_map=True)
+        meta = json.loads((arrow.schema.metadata or {})[META_KEY])
+        return arrow.to_pandas(), meta
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        return None, None
+
+
+def _write(path: str, df: pd.DataFrame, meta: dict):
+    """임시 파일에 쓰고 교체 (읽는 쪽은 항상 완성된 파일만 봄)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    arrow = pa.Table.from_pandas(df, preserve_index=False)
+    schema_meta = dict(arrow.schema.metadata or {})
+    schema_meta[META_KEY] = json.dumps(meta).encode("utf-8")
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        feather.write_feather(arrow.replace_schema_metadata(schema_meta), tmp, compression="uncompressed")
+        os.replace(tmp, path)
+    except OSError:
+        # 캐시 디렉터리에 못 쓰면 다음에 다시 조회하면 됨
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+# ── 증분 갱신 ──────────────────────────────────────────────────────────────
+def _apply_delta(table: str, project_id: int, cached: pd.DataFrame, meta: dict, version: dict):
+    """캐시 + (새 행/수정 행 - 삭제 행). 행 수가 DB와 안 맞으면 None."""
+    conditions, params = ["t.id > :max_id"], {"max_id": meta["max_id"]}
+    if meta["changed_at"] is not None:
+        conditions.append("t.updated_at >= :changed_at")   # 같은 시각에 바뀐 행도 다시 읽음
+        params["changed_at"] = meta["changed_at"]
+    changed = _query(table, project_id, f"AND ({' OR '.join(conditions)})", params)
+    if changed is None:
+        return None
+
+    drop_ids = set(changed["id"].astype("int64"))
+    if version["tomb_id"] > meta["tomb_id"]:
+        tombstones = run_query(
+            """
+            SELECT row_id FROM row_tombstones
+            WHERE table_name = :tbl AND project_id = :pid AND id > :tomb_id
+            """,
+            {"tbl": table, "pid": project_id, "tomb_id": meta["tomb_id"]}, fetch=True,
+        )
+        if tombstones is None:
+            return None
+        drop_ids.update(int(i) for i in tombstones["row_id"])
+
+    kept = cached[~cached["id"].isin(drop_ids)]
+    frames = [df for df in (kept, changed) if not df.empty]
+    merged = pd.concat(frames, ignore_index=True) if frames else cached.iloc[0:0]
+    if len(merged) != version["n"]:
+        return None
+    if TABLES[table].get("receipts") and version["receipts"] != meta.get("receipts"):
+        merged = _with_receipt_flags(merged, project_id)
+    return merged
+
+
+def _with_receipt_flags(df: pd.DataFrame, project_id: int):
+    """영수증 연결/삭제만 바뀐 경우: 영수증 있는 지출 id만 다시 조회."""
+    linked = run_query(
+        "SELECT DISTINCT expense_id FROM receipt_images WHERE project_id = :pid AND expense_id IS NOT NULL",
+        {"pid": project_id}, fetch=True,
+    )
+    if linked is None:
+        return None
+    ids = set(int(i) for i in linked["expense_id"])
+    return df.assign(영수증=["🧾" if int(i) in ids else "" for i in df["id"]])
+
+
+def load(project_id: int, table: str) -> pd.DataFrame:
+    """
+    프로젝트의 table 행 전체 (최신순). 조회 실패 시 None (run_query가 오류 표시).
+    디스크 캐시가 최신이면 버전 쿼리 1회만 나감.
+    """
+    if not enabled():
+        df = _query(table, project_id)
+        return None if df is None else _sorted(df, table)
+
+    path = _path(project_id, table)
+    with _locks[path]:
+        version = _version(table, project_id)
+        if version is None:
+            return None
+        cached, meta = _read(path)
+        if cached is not None and meta.get("format") == FORMAT_VERSION:
+            if meta == version:
+                return cached
+            merged = _apply_delta(table, project_id, cached, meta, version)
+            if merged is not None:
+                merged = _sorted(merged, table)
+                _write(path, merged, version)
+                return merged
+
+        df = _query(table, project_id)
+        if df is None:
+            return None
+        df = _sorted(df, table)
+        _write(path, df, version)
+        return df
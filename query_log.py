@@ -0,0 +1,171 @@
+# query_log.py
+"""
+run_query 계측 (slow-query log)
+- 모든 호출을 링 버퍼에 기록: SQL 지문(fingerprint), 소요시간, 행 수, 호출 위치
+- rerun 단위 집계: 쿼리 예산 초과 / 같은 지문 반복(N+1 의심) 표시
+- 총무용 "성능" 패널에서 지문별 누적 시간 상위 목록 + CSV 내보내기
+"""
+
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+
+import pandas as pd
+
+RING_SIZE = 5000
+QUERY_BUDGET_PER_RERUN = 25      # rerun당 쿼리 수 상한 (초과 시 경고)
+N_PLUS_ONE_THRESHOLD = 5         # 한 rerun에서 같은 지문이 이 횟수 이상이면 N+1 의심
+SLOW_QUERY_MS = 500
+
+# 호출 위치를 찾을 때 건너뛸 모듈 (DB 계층 자체)
+_INTERNAL_FILES = {"db.py", "db_retry.py", "db_metrics.py", "query_log.py"}
+
+
+@dataclass
+class QueryRecord:
+    ts: float
+    fingerprint: str
+    sql: str
+    duration_ms: float
+    rows: int
+    caller: str
+    ok: bool
+    rerun: int
+
+
+@dataclass
+class RerunStats:
+    rerun: int
+    started: float = field(default_factory=time.perf_counter)
+    records: list = field(default_factory=list)
+
+
+_ring = deque(maxlen=RING_SIZE)
+_ring_lock = threading.Lock()
+_local = threading.local()       # Streamlit은 세션의 rerun을 스크립트 스레드 하나에서 실행
+_rerun_seq = iter(range(1, sys.maxsize))
+
+
+_WS = re.compile(r"\s+")
+_COMMENT = re.compile(r"--[^\n]*")
+_STRING = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r":\w+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> tuple:
+    """(지문 해시, 정규화 SQL). 리터럴/파라미터는 ?로, IN 목록은 (?...)로 접음."""
+    normalized = _COMMENT.sub(" ", sql)
+    normalized = _STRING.sub("?", normalized)
+    normalized = _PARAM.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _IN_LIST.sub("(?...)", normalized)
+    normalized = _WS.sub(" ", normalized).strip()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:10], normalized
+
+
+def _caller() -> str:
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.basename(frame.f_code.co_filename)
+        if filename not in _INTERNAL_FILES:
+            module = frame.f_globals.get("__name__", filename)
+            return f"{module}.{frame.f_code.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+    return "?"
+
+
+def record(sql: str, duration_ms: float, rows: int, ok: bool = True):
+    fp, normalized = fingerprint(sql)
+    current = getattr(_local, "rerun", None)
+    rec = QueryRecord(
+        ts=time.time(), fingerprint=fp, sql=normalized, duration_ms=round(duration_ms, 2),
+        rows=rows, caller=_caller(), ok=ok, rerun=current.rerun if current else 0,
+    )
+    with _ring_lock:
+        _ring.append(rec)
+    if current is not None:
+        current.records.append(rec)
+
+
+# ─────────────────────────────────────────────
+# rerun 단위 집계
+# ─────────────────────────────────────────────
+def begin_rerun():
+    _local.rerun = RerunStats(rerun=next(_rerun_seq))
+
+
+def end_rerun() -> dict:
+    """현재 rerun 리포트를 만들고 추적 종료. rerun 밖이면 None."""
+    current = getattr(_local, "rerun", None)
+    _local.rerun = None
+    if current is None:
+        return None
+    return rerun_report(current)
+
+
+def rerun_report(stats: RerunStats) -> dict:
+    by_fp = {}
+    for rec in stats.records:
+        entry = by_fp.setdefault(rec.fingerprint, {"sql": rec.sql, "count": 0, "ms": 0.0, "callers": set()})
+        entry["count"] += 1
+        entry["ms"] += rec.duration_ms
+        entry["callers"].add(rec.caller)
+
+    suspects = [
+        {"fingerprint": fp, "count": e["count"], "total_ms": round(e["ms"], 1),
+         "sql": e["sql"][:200], "callers": ", ".join(sorted(e["callers"]))}
+        for fp, e in by_fp.items() if e["count"] >= N_PLUS_ONE_THRESHOLD
+    ]
+    return {
+        "rerun": stats.rerun,
+        "queries": len(stats.records),
+        "db_ms": round(sum(r.duration_ms for r in stats.records), 1),
+        "wall_ms": round((time.perf_counter() - stats.started) * 1000, 1),
+        "over_budget": len(stats.records) > QUERY_BUDGET_PER_RERUN,
+        "n_plus_one": sorted(suspects, key=lambda s: -s["count"]),
+        "slow": [asdict(r) for r in stats.records if r.duration_ms >= SLOW_QUERY_MS],
+    }
+
+
+# ─────────────────────────────────────────────
+# 조회 / 내보내기
+# ─────────────────────────────────────────────
+def records_frame() -> pd.DataFrame:
+    with _ring_lock:
+        rows = [asdict(r) for r in _ring]
+    columns = list(QueryRecord.__dataclass_fields__)
+    return pd.DataFrame(rows, columns=columns)
+
+
+def top_queries(limit: int = 20) -> pd.DataFrame:
+    """지문별 누적 시간 상위."""
+    df = records_frame()
+    if df.empty:
+        return pd.DataFrame(columns=["fingerprint", "sql", "calls", "total_ms", "avg_ms", "p95_ms", "avg_rows", "errors"])
+    grouped = df.groupby("fingerprint").agg(
+        sql=("sql", "first"),
+        calls=("duration_ms", "size"),
+        total_ms=("duration_ms", "sum"),
+        avg_ms=("duration_ms", "mean"),
+        p95_ms=("duration_ms", lambda s: s.quantile(0.95)),
+        avg_rows=("rows", "mean"),
+        errors=("ok", lambda s: int((~s).sum())),
+    )
+    return grouped.sort_values("total_ms", ascending=False).head(limit).round(1).reset_index()
+
+
+def export_csv() -> bytes:
+    return records_frame().to_csv(index=False).encode("utf-8-sig")
+
+
+def clear():
+    with _ring_lock:
+        _ring.clear()
@@ -0,0 +1,212 @@
+# rate_limit.py
+"""
+로그인/비밀번호 찾기 시도 제한 (토큰 버킷)
+- IP별 + 학번별 버킷 → 둘 다 토큰이 있어야 시도 허용 (all-or-nothing 차감)
+- 거절된 시도는 DB 조회 없이 바로 응답
+- 기본 저장소는 프로세스 메모리 (LRU로 키 개수 제한)
+- RATE_LIMIT_BACKEND 로 공유 저장소 선택 가능 (redis, 미설치/접속 실패 시 local로 대체)
+- 클라이언트 IP는 X-Forwarded-For에서 신뢰하는 프록시가 붙인 값 (앞단 프록시가 헤더에 접속 IP를 덧붙인다고 가정)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+
+from audit import get_user_info
+from config import _secret_get
+
+try:
+    import redis
+except ImportError:  # 선택 의존성
+    redis = None
+
+UNKNOWN_IP = "Unknown IP"
+MAX_TRACKED_KEYS = 10_000
+DEFAULT_TRUSTED_HOPS = 1
+
+
+@dataclass(frozen=True)
+class Limit:
+    capacity: int        # 순간 허용 횟수 (버스트)
+    per_seconds: float   # capacity 만큼 다시 채워지는 시간
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.per_seconds
+
+
+# 학번 버킷은 특정 계정 대입 공격, IP 버킷은 여러 학번을 훑는 스크립트를 막음
+LIMITS = {
+    "login":  {"ip": Limit(20, 60), "sid": Limit(5, 60)},
+    "reset":  {"ip": Limit(10, 300), "sid": Limit(3, 300)},
+}
+
+
+# ─────────────────────────────────────────────
+# 저장소
+# ─────────────────────────────────────────────
+class LocalBucketStore:
+    """프로세스 메모리 버킷. 오래 안 쓴 키부터 제거해 메모리 상한 유지."""
+
+    name = "local"
+
+    def __init__(self, max_keys: int = MAX_TRACKED_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()   # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def _level(self, key, limit: Limit, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (limit.capacity, now))
+        return min(limit.capacity, tokens + (now - updated) * limit.refill_rate)
+
+    def take(self, requests: list) -> float:
+        """
+        requests: [(key, Limit), ...]. 모두 토큰이 있으면 1개씩 차감하고 0 반환,
+        아니면 차감 없이 재시도까지 남은 초 반환.
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = [(key, limit, self._level(key, limit, now)) for key, limit in requests]
+            wait = max(((1 - level) / limit.refill_rate for _, limit, level in levels if level < 1), default=0.0)
+            if wait > 0:
+                return wait
+            for key, _, level in levels:
+                self._buckets[key] = (level - 1, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return 0.0
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+class RedisBucketStore:
+    """여러 앱 인스턴스가 버킷을 공유할 때. 차감은 Lua 스크립트로 원자 처리."""
+
+    name = "redis"
+
+    _SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local wait = 0
+    local levels = {}
+    for i, key in ipairs(KEYS) do
+        local capacity = tonumber(ARGV[i * 2])
+        local rate = tonumber(ARGV[i * 2 + 1])
+        local state = redis.call('HMGET', key, 'tokens', 'updated')
+        local tokens = tonumber(state[1]) or capacity
+        local updated = tonumber(state[2]) or now
+        local level = math.min(capacity, tokens + (now - updated) * rate)
+        levels[i] = level
+        if level < 1 then wait = math.max(wait, (1 - level) / rate) end
+    end
+    if wait > 0 then return tostring(wait) end
+    for i, key in ipairs(KEYS) do
+        local capacity = tonumber(ARGV[i * 2])
+        local rate = tonumber(ARGV[i * 2 + 1])
+        redis.call('HSET', key, 'tokens', levels[i] - 1, 'updated', now)
+        redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+    end
+    return '0'
+    """
+
+    def __init__(self, url: str):
+        self._client = redis.Redis.from_url(url, socket_timeout=1)
+        self._take = self._client.register_script(self._SCRIPT)
+
+    def take(self, requests: list) -> float:
+        keys = [f"ratelimit:{key[0]}:{key[1]}:{key[2]}" for key, _ in requests]
+        args = [time.time()]
+        for _, limit in requests:
+            args += [limit.capacity, limit.refill_rate]
+        return float(self._take(keys=keys, args=args))
+
+    def reset(self, key):
+        self._client.delete(f"ratelimit:{key[0]}:{key[1]}:{key[2]}")
+
+
+def _make_redis_store():
+    url = _secret_get("RATE_LIMIT_REDIS_URL")
+    if redis is None or not url:
+        raise ValueError("redis 패키지 또는 RATE_LIMIT_REDIS_URL 없음")
+    return RedisBucketStore(url)
+
+
+_STORES = {
+    "local": LocalBucketStore,
+    "redis": _make_redis_store,
+}
+
+
+def register_store(name: str, factory):
+    """공유 저장소 추가 (factory는 take/reset을 가진 객체를 반환)."""
+    _STORES[name] = factory
+    get_store.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def get_store(name: str = None):
+    name = name or _secret_get("RATE_LIMIT_BACKEND", default="local")
+    try:
+        return _STORES[name]()
+    except Exception:
+        # 공유 저장소를 못 쓰면 프로세스 메모리로 대체 (제한은 인스턴스별로 적용)
+        return LocalBucketStore()
+
+
+# ─────────────────────────────────────────────
+# 공개 API
+# ─────────────────────────────────────────────
+def _trusted_hops() -> int:
+    try:
+        return max(1, int(_secret_get("RATE_LIMIT_TRUSTED_HOPS", default=DEFAULT_TRUSTED_HOPS)))
+    except (TypeError, ValueError):
+        return DEFAULT_TRUSTED_HOPS
+
+
+def _client_ip() -> str:
+    """
+    X-Forwarded-For: "<클라이언트가 보낸 값...>, <프록시가 본 접속 IP>, <다음 프록시>..."
+    왼쪽 값은 클라이언트가 마음대로 넣을 수 있어 IP 버킷 우회가 가능 →
+    신뢰하는 프록시 N단(RATE_LIMIT_TRUSTED_HOPS, 기본 1 = 앞단 프록시 하나)이 붙인 오른쪽에서 N번째 값을 씀.
+    """
+    ip, _ = get_user_info()
+    hops = [part.strip() for part in (ip or "").split(",") if part.strip()]
+    if not hops or hops == [UNKNOWN_IP]:
+        return UNKNOWN_IP
+    return hops[-min(_trusted_hops(), len(hops))]
+
+
+def _bucket_requests(action: str, student_id: str) -> list:
+    limits = LIMITS[action]
+    requests = []
+    ip = _client_ip()
+    if ip != UNKNOWN_IP:
+        # IP를 모르면 모든 사용자가 한 버킷을 나눠 쓰게 되므로 학번 버킷만 적용
+        requests.append(((action, "ip", ip), limits["ip"]))
+    if student_id:
+        requests.append(((action, "sid", str(student_id).strip()), limits["sid"]))
+    return requests
+
+
+def check_rate_limit(action: str, student_id: str = None) -> float:
+    """시도 1회 차감. 허용이면 0, 제한이면 재시도까지 남은 초."""
+    requests = _bucket_requests(action, student_id)
+    if not requests:
+        return 0.0
+    try:
+        return get_store().take(requests)
+    except Exception:
+        # 저장소 장애로 로그인이 막히지 않도록 허용
+        return 0.0
+
+
+def reset_rate_limit(action: str, student_id: str):
+    """성공한 경우 해당 학번의 실패 누적을 비움 (IP 버킷은 유지)."""
+    try:
+        get_store().reset((action, "sid", str(student_id).strip()))
+    except Exception:
+        pass
@@ -0,0 +1,96 @@
+# receipts/gallery.py
+"""
+영수증 갤러리 페이지 조회 (keyset pagination)
+- (uploaded_at, id) 내림차순 기준 커서로 다음 페이지 조회 → OFFSET 없이 항상 인덱스 범위 스캔
+- 날짜 / 업로더 / 지출 연결 여부 필터
+"""
+
+import datetime
+
+import pandas as pd
+import streamlit as st
+
+from db import run_query
+
+PAGE_SIZE = 12
+
+LINK_FILTERS = {
+    "all":      "전체",
+    "linked":   "지출 연결됨",
+    "unlinked": "미연결",
+}
+
+
+def fetch_gallery_page(
+    project_id: int,
+    cursor: tuple = None,
+    page_size: int = PAGE_SIZE,
+    date_from: datetime.date = None,
+    date_to: datetime.date = None,
+    uploader: str = None,
+    link_status: str = "all",
+) -> tuple[pd.DataFrame, tuple]:
+    """
+    cursor = 직전 페이지 마지막 행의 (uploaded_at, id). None이면 첫 페이지.
+    (페이지 DataFrame, 다음 페이지 커서 또는 None) 반환.
+    """
+    conds = ["r.project_id = :pid"]
+    params = {"pid": project_id, "limit": page_size + 1}
+
+    if cursor is not None:
+        conds.append("(r.uploaded_at < :cur_at OR (r.uploaded_at = :cur_at AND r.id < :cur_id))")
+        params["cur_at"], params["cur_id"] = cursor
+    if date_from:
+        conds.append("r.uploaded_at >= :date_from")
+        params["date_from"] = datetime.datetime.combine(date_from, datetime.time.min)
+    if date_to:
+        conds.append("r.uploaded_at < :date_to")
+        params["date_to"] = datetime.datetime.combine(date_to + datetime.timedelta(days=1), datetime.time.min)
+    if uploader:
+        conds.append("r.uploaded_by = :uploader")
+        params["uploader"] = uploader
+    if link_status == "linked":
+        conds.append("r.expense_id IS NOT NULL")
+    elif link_status == "unlinked":
+        conds.append("r.expense_id IS NULL")
+
+    df = run_query(
+        f"""
+        SELECT TOP (:limit)
+               r.id, r.filename, r.filepath, r.description,
+               r.uploaded_by, r.uploaded_at, e.item, e.amount, e.date
+        FROM receipt_images r
+        LEFT JOIN expenses e ON e.id = r.expense_id
+        WHERE {" AND ".join(conds)}
+        ORDER BY r.uploaded_at DESC, r.id DESC
+        """,
+        params,
+        fetch=True,
+    )
+    if df is None or df.empty:
+        return pd.DataFrame(), None
+
+    if len(df) <= page_size:
+        return df.reset_index(drop=True), None
+
+    page = df.iloc[:page_size].reset_index(drop=True)
+    last = page.iloc[-1]
+    uploaded_at = pd.Timestamp(last["uploaded_at"]).to_pydatetime()
+    return page, (uploaded_at, int(last["id"]))
+
+
+@st.cache_data(show_spinner=False)
+def list_uploaders(project_id: int) -> list[str]:
+    df = run_query(
+        """
+        SELECT DISTINCT uploaded_by
+        FROM receipt_images
+        WHERE project_id = :pid AND uploaded_by IS NOT NULL
+        ORDER BY uploaded_by
+        """,
+        {"pid": project_id},
+        fetch=True,
+    )
+    if df is None or df.empty:
+        return []
+    return df["uploaded_by"].tolist()
@@ -0,0 +1,309 @@
+# receipts/parser.py
+"""
+영수증 파싱 엔진 (오프라인 우선)
+- local: Tesseract OCR(kor+eng) → 정규식/휴리스틱으로 날짜·합계·상호 추출
+- llm:   OCR 텍스트를 Groq LLM에 넘겨 JSON으로 정리 (실패 시 local 결과 사용)
+- 결과는 이미지 SHA-256 기준으로 캐시 → 같은 영수증 재업로드 시 즉시 반환
+- parse_receipts_batch: 여러 장 중 캐시에 없는 것만 프로세스 풀에서 동시에 OCR (같은 캐시 사용)
+"""
+
+import datetime
+import functools
+import hashlib
+import io
+import json
+import multiprocessing
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from config import _secret_get
+from db import run_query
+
+try:
+    import pytesseract
+    from PIL import Image, ImageOps
+except ImportError:  # OCR 미설치 환경에서는 수동 입력으로 대체
+    pytesseract = None
+
+OCR_LANG = "kor+eng"
+LLM_MODEL = "llama-3.3-70b-versatile"
+MANUAL_INPUT_MESSAGE = "영수증 자동 인식을 사용할 수 없습니다. 수동 입력해 주세요."
+
+_MEMO_MAX = 256
+_memo: "OrderedDict[tuple, dict]" = OrderedDict()
+_memo_lock = threading.Lock()
+
+CATEGORY_KEYWORDS = {
+    "식비/간식": ["카페", "커피", "편의점", "GS25", "CU", "세븐일레븐", "이마트24", "베이커리", "제과", "스타벅스", "음료", "분식"],
+    "회식비":   ["호프", "주점", "포차", "치킨", "고기", "삼겹", "갈비", "식당", "횟집", "노래"],
+    "장소대관": ["대관", "스터디룸", "스터디카페", "펜션", "파티룸", "강의실"],
+    "물품구매": ["다이소", "문구", "마트", "쿠팡", "오피스", "철물", "생활용품"],
+    "홍보비":   ["인쇄", "현수막", "출력", "프린트", "광고", "스티커"],
+    "교통비":   ["택시", "버스", "KTX", "코레일", "SRT", "주유", "카카오T", "고속"],
+}
+
+_TOTAL_KEYWORDS = [
+    "받을금액", "결제금액", "승인금액", "합계금액", "총결제", "총금액", "총액", "합계", "판매금액", "TOTAL",
+]
+_MERCHANT_KEYWORDS = ["상호명", "가맹점명", "가맹점", "매장명", "상호", "점포명"]
+# "상 호 : OO마트" 처럼 글자 사이 공백이 들어가도 매칭
+_MERCHANT_LINE = re.compile(
+    r"^\s*(?:" + "|".join(r"\s*".join(k) for k in _MERCHANT_KEYWORDS) + r")\s*[:：]?\s*(.+)$"
+)
+_SKIP_LINE = re.compile(r"영수증|receipt|사업자|대표|전화|TEL|주소|카드|승인|일시|\d{3}-\d{2}-\d{5}", re.IGNORECASE)
+
+_DATE_PATTERNS = [
+    re.compile(r"(20\d{2})\s*[.\-/년]\s*(\d{1,2})\s*[.\-/월]\s*(\d{1,2})"),
+    re.compile(r"(?<!\d)(\d{2})[.\-/](\d{2})[.\-/](\d{2})(?!\d)"),
+]
+_AMOUNT = re.compile(r"(\d{1,3}(?:,\d{3})+|\d{3,})(?:\s*원)?")
+
+
+# ─────────────────────────────────────────────
+# 텍스트 → 필드 추출 (순수 함수, 프로세스 풀에서도 사용)
+# ─────────────────────────────────────────────
+def _to_amount(token: str) -> int:
+    try:
+        return int(token.replace(",", ""))
+    except ValueError:
+        return 0
+
+def extract_date(text: str):
+    for pattern in _DATE_PATTERNS:
+        for m in pattern.finditer(text):
+            y, mo, d = m.groups()
+            year = int(y) if len(y) == 4 else 2000 + int(y)
+            try:
+                return datetime.date(year, int(mo), int(d)).isoformat()
+            except ValueError:
+                continue
+    return None
+
+def extract_total(text: str) -> int:
+    lines = [ln.replace(" ", "") for ln in text.splitlines()]
+    # 키워드 우선순위대로, 해당 줄의 마지막 금액
+    for keyword in _TOTAL_KEYWORDS:
+        for line in lines:
+            if keyword.lower() in line.lower():
+                amounts = [_to_amount(a) for a in _AMOUNT.findall(line)]
+                amounts = [a for a in amounts if a > 0]
+                if amounts:
+                    return amounts[-1]
+    # 키워드가 없으면 콤마/원 표기가 붙은 금액 중 최댓값
+    candidates = [_to_amount(a) for a in re.findall(r"\d{1,3}(?:,\d{3})+|\d+(?=\s*원)", text)]
+    return max(candidates, default=0)
+
+def extract_merchant(text: str) -> str:
+    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    for line in lines:
+        m = _MERCHANT_LINE.match(line)
+        if m:
+            return m.group(1).strip()[:100]
+    # 상호 표기가 없으면 상단에서 글자가 충분한 첫 줄
+    for line in lines[:8]:
+        if _SKIP_LINE.search(line):
+            continue
+        letters = re.findall(r"[가-힣A-Za-z]", line)
+        if len(letters) >= 2 and not _AMOUNT.fullmatch(line):
+            return line[:100]
+    return ""
+
+def guess_category(text: str) -> str:
+    upper = text.upper()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        if any(k.upper() in upper for k in keywords):
+            return category
+    return "기타"
+
+def extract_fields(text: str) -> dict:
+    return {
+        "date": extract_date(text),
+        "item": extract_merchant(text),
+        "amount": extract_total(text),
+        "category": guess_category(text),
+        "raw_text": text,
+    }
+
+
+# ─────────────────────────────────────────────
+# 백엔드
+# ─────────────────────────────────────────────
+@functools.lru_cache(maxsize=1)
+def ocr_available() -> bool:
+    if pytesseract is None:
+        return False
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+def ocr_image(image_bytes: bytes) -> str:
+    img = Image.open(io.BytesIO(image_bytes))
+    img = ImageOps.exif_transpose(img).convert("L")
+    # 작은 사진은 키워야 한글 인식률이 올라감
+    if img.width < 1000:
+        scale = 1000 / img.width
+        img = img.resize((1000, int(img.height * scale)))
+    img = ImageOps.autocontrast(img)
+    return pytesseract.image_to_string(img, lang=OCR_LANG)
+
+def _local_parse(image_bytes: bytes) -> dict:
+    """프로세스 풀 워커. streamlit/DB에 의존하지 않음."""
+    return extract_fields(ocr_image(image_bytes))
+
+def _llm_refine(client, local_result: dict) -> dict:
+    prompt = f"""
+다음은 영수증 OCR 결과입니다. 아래 JSON 형식으로만 답하세요.
+{{"date": "YYYY-MM-DD 또는 null", "item": "상호명", "amount": 정수 총결제금액, "category": "{'/'.join(CATEGORY_KEYWORDS)}/기타 중 하나"}}
+
+OCR 텍스트:
+{local_result["raw_text"][:3000]}
+"""
+    response = client.chat.completions.create(
+        model=LLM_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0,
+        max_tokens=200,
+        response_format={"type": "json_object"},
+    )
+    data = json.loads(response.choices[0].message.content)
+    refined = dict(local_result)
+    if data.get("date") and extract_date(str(data["date"])):
+        refined["date"] = extract_date(str(data["date"]))
+    if data.get("item"):
+        refined["item"] = str(data["item"])[:100]
+    if str(data.get("amount", "")).replace(",", "").isdigit():
+        refined["amount"] = int(str(data["amount"]).replace(",", ""))
+    if data.get("category") in CATEGORY_KEYWORDS or data.get("category") == "기타":
+        refined["category"] = data["category"]
+    return refined
+
+def _backend_name(client) -> str:
+    configured = _secret_get("RECEIPT_PARSER_BACKEND", default="local")
+    if configured == "llm" and client is not None:
+        return "llm"
+    return "local"
+
+# ─────────────────────────────────────────────
+# 캐시 (프로세스 메모리 LRU → DB)
+# ─────────────────────────────────────────────
+def _memo_get(key):
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return dict(_memo[key])
+    return None
+
+def _memo_put(key, result: dict):
+    with _memo_lock:
+        _memo[key] = dict(result)
+        _memo.move_to_end(key)
+        while len(_memo) > _MEMO_MAX:
+            _memo.popitem(last=False)
+
+def _cache_get(digest: str, backend: str):
+    hit = _memo_get((digest, backend))
+    if hit is not None:
+        return hit
+    df = run_query(
+        "SELECT result FROM receipt_parse_cache WHERE content_hash = :h AND backend = :b",
+        {"h": digest, "b": backend},
+        fetch=True,
+    )
+    if df is None or df.empty:
+        return None
+    result = json.loads(df.iloc[0]["result"])
+    _memo_put((digest, backend), result)
+    return result
+
+def _cache_put(digest: str, backend: str, result: dict):
+    _memo_put((digest, backend), result)
+    run_query(
+        """
+        INSERT INTO receipt_parse_cache (content_hash, backend, result)
+        SELECT :h, :b, :r
+        WHERE NOT EXISTS (SELECT 1 FROM receipt_parse_cache WHERE content_hash = :h AND backend = :b)
+        """,
+        {"h": digest, "b": backend, "r": json.dumps(result, ensure_ascii=False)},
+    )
+
+
+# ─────────────────────────────────────────────
+# 공개 API
+# ─────────────────────────────────────────────
+def _manual_result() -> dict:
+    return {"date": None, "item": "", "amount": 0, "category": "기타", "raw_text": MANUAL_INPUT_MESSAGE}
+
+def parse_receipt(image_bytes: bytes, client=None) -> dict:
+    if not ocr_available():
+        return _manual_result()
+
+    backend = _backend_name(client)
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    cached = _cache_get(digest, backend)
+    if cached is not None:
+        return cached
+
+    return _finish(digest, backend, client, _local_parse(image_bytes))
+
+def _finish(digest: str, backend: str, client, result: dict) -> dict:
+    """OCR 결과에 (llm이면) LLM 정리를 얹어 캐시에 저장."""
+    if backend == "llm":
+        try:
+            result = _llm_refine(client, result)
+        except Exception:
+            backend = "local"  # LLM 실패 시 로컬 결과만 캐시
+
+    _cache_put(digest, backend, result)
+    return result
+
+def _ocr_all(pending: dict, max_workers: int = None) -> dict:
+    """{해시: 이미지} → {해시: 결과 또는 예외}. 한 장뿐이면 풀을 띄우지 않음."""
+    if len(pending) <= 1:
+        out = {}
+        for digest, image_bytes in pending.items():
+            try:
+                out[digest] = _local_parse(image_bytes)
+            except Exception as e:
+                out[digest] = e
+        return out
+
+    workers = min(len(pending), max_workers or multiprocessing.cpu_count())
+    # Streamlit 서버는 스레드가 많아 fork하면 잠금이 걸린 채 복제될 수 있음 → spawn
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {digest: pool.submit(_local_parse, image_bytes) for digest, image_bytes in pending.items()}
+        out = {}
+        for digest, future in futures.items():
+            try:
+                out[digest] = future.result()
+            except Exception as e:
+                out[digest] = e
+        return out
+
+def parse_receipts_batch(images: list, client=None, max_workers: int = None) -> list:
+    """
+    여러 영수증을 한 번에 파싱. parse_receipt와 같은 해시 캐시/백엔드 사용.
+    캐시에 있는 건 바로 쓰고, 나머지만 프로세스 풀에서 병렬 OCR (같은 이미지는 한 번만).
+    입력 순서대로 결과 리스트 반환. 한 장이 실패해도 나머지는 그대로 (실패한 장은 수동 입력).
+    """
+    if not ocr_available():
+        return [_manual_result() for _ in images]
+
+    backend = _backend_name(client)
+    digests = [hashlib.sha256(b).hexdigest() for b in images]
+    results = {}
+    for digest in digests:
+        if digest not in results and (cached := _cache_get(digest, backend)) is not None:
+            results[digest] = cached
+    pending = {d: b for d, b in zip(digests, images) if d not in results}
+
+    for digest, parsed in _ocr_all(pending, max_workers).items():
+        if isinstance(parsed, Exception):
+            results[digest] = {**_manual_result(), "raw_text": f"영수증 인식 실패: {parsed}"}  # 캐시 안 함
+        else:
+            results[digest] = _finish(digest, backend, client, parsed)
+
+    return [dict(results[d]) for d in digests]
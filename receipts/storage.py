@@ -0,0 +1,255 @@
+# receipts/storage.py
+"""
+영수증 이미지 content-addressed 저장소
+- SHA-256 해시를 키로 blob 저장 → 같은 영수증은 한 번만 저장됨
+- receipt_blobs.ref_count로 참조 수 관리, 참조 0인 blob은 GC가 정리
+- 업로드는 청크 단위로 스트리밍 저장 (getbuffer() 통째 쓰기 X)
+- 백엔드 교체 가능: local(파일시스템) / objectstore(오브젝트 스토리지 로컬 대역)
+"""
+
+import hashlib
+import os
+import tempfile
+
+from config import _secret_get
+from db import run_query, run_transaction
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+UPLOAD_ROOT = "uploads"
+
+# 마지막 참조(업로드) 후 receipt_images 등록 전까지의 유예 시간 (GC가 방금 올린 blob을 지우지 않도록)
+# 오래된 blob을 다시 올린 경우도 last_referenced_at 기준이라 보호됨
+GC_GRACE_MINUTES = 10
+
+
+# ─────────────────────────────────────────────
+# 백엔드
+# ─────────────────────────────────────────────
+class LocalBlobBackend:
+    """uploads/blobs/ab/abcdef... 형태로 해시 앞 2글자 기준 샤딩 저장."""
+
+    name = "local"
+
+    def __init__(self, root: str = os.path.join(UPLOAD_ROOT, "blobs")):
+        self.root = root
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def spool_dir(self) -> str:
+        # os.replace가 원자적으로 동작하도록 같은 파일시스템 안에 임시 폴더를 둔다
+        path = os.path.join(self.root, "_spool")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def locator(self, digest: str) -> str:
+        return self._path(digest)
+
+    def digest_from_locator(self, locator: str) -> str:
+        return os.path.basename(locator)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self._path(digest))
+
+    def put_file(self, digest: str, tmp_path: str):
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+    def read(self, digest: str):
+        path = self._path(digest)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def delete(self, digest: str):
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+
+class LocalObjectStoreBackend(LocalBlobBackend):
+    """
+    오브젝트 스토리지(S3/Azure Blob) 대역.
+    bucket/key 구조와 objectstore:// 로케이터만 흉내내고 실제 저장은 로컬 디렉터리에 한다.
+    실제 스토리지 클라이언트로 바꿀 때는 exists/put_file/read/delete만 교체하면 된다.
+    """
+
+    name = "objectstore"
+    key_prefix = "receipts"
+
+    def __init__(self, bucket: str = "receipts"):
+        self.bucket = bucket
+        super().__init__(root=os.path.join(UPLOAD_ROOT, "objectstore", bucket))
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, self.key_prefix, digest)
+
+    def locator(self, digest: str) -> str:
+        return f"objectstore://{self.bucket}/{self.key_prefix}/{digest}"
+
+    def digest_from_locator(self, locator: str) -> str:
+        return locator.rsplit("/", 1)[-1]
+
+
+_BACKENDS = {
+    LocalBlobBackend.name: LocalBlobBackend,
+    LocalObjectStoreBackend.name: LocalObjectStoreBackend,
+}
+
+
+def get_backend(name: str = None):
+    name = name or _secret_get("RECEIPT_STORAGE_BACKEND", default="local")
+    backend_cls = _BACKENDS.get(name)
+    if backend_cls is None:
+        raise ValueError(f"Unknown receipt storage backend: {name}")
+    return backend_cls()
+
+
+def _backend_for_locator(locator: str):
+    if locator.startswith("objectstore://"):
+        bucket = locator[len("objectstore://"):].split("/", 1)[0]
+        return LocalObjectStoreBackend(bucket=bucket)
+    return LocalBlobBackend()
+
+
+# ─────────────────────────────────────────────
+# 저장 / 조회
+# ─────────────────────────────────────────────
+def _spool_upload(file, spool_dir: str) -> tuple[str, int, str]:
+    """업로드 파일을 청크 단위로 임시 파일에 쓰면서 SHA-256 계산."""
+    sha = hashlib.sha256()
+    size = 0
+    file.seek(0)
+    fd, tmp_path = tempfile.mkstemp(dir=spool_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                sha.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    finally:
+        file.seek(0)
+    return sha.hexdigest(), size, tmp_path
+
+
+def store_receipt(file) -> tuple[str, str]:
+    """
+    업로드 파일을 blob 저장소에 넣고 (content_hash, locator)를 반환.
+    이미 같은 해시의 blob이 있으면 파일은 버리고 ref_count만 올린다.
+    행(last_referenced_at 갱신)을 먼저 남기고 파일을 확인 → 동시에 돈 GC가 이 blob을 지우지 않음.
+    GC가 같은 해시를 지우는 중이면 MERGE(HOLDLOCK)가 그 트랜잭션(파일 삭제 포함)이 끝날 때까지 기다리고,
+    이어지는 exists 확인에서 파일을 다시 쓴다.
+    """
+    backend = get_backend()
+    digest, size, tmp_path = _spool_upload(file, backend.spool_dir())
+
+    locator = backend.locator(digest)
+    run_query(
+        """
+        MERGE receipt_blobs WITH (HOLDLOCK) AS t
+        USING (SELECT :h AS content_hash) AS s
+        ON t.content_hash = s.content_hash
+        WHEN MATCHED THEN
+            UPDATE SET ref_count = t.ref_count + 1, last_referenced_at = GETDATE()
+        WHEN NOT MATCHED THEN
+            INSERT (content_hash, backend, locator, size_bytes, ref_count, last_referenced_at)
+            VALUES (:h, :backend, :loc, :size, 1, GETDATE());
+        """,
+        {"h": digest, "backend": backend.name, "loc": locator, "size": size},
+    )
+
+    if backend.exists(digest):
+        os.remove(tmp_path)
+    else:
+        backend.put_file(digest, tmp_path)
+    return digest, locator
+
+
+def read_receipt(locator: str):
+    """로케이터(또는 구버전 filepath)로 이미지 바이트를 읽는다. 없으면 None."""
+    if not locator:
+        return None
+    backend = _backend_for_locator(locator)
+    if isinstance(backend, LocalObjectStoreBackend):
+        return backend.read(backend.digest_from_locator(locator))
+    # 로컬 백엔드 + content-addressed 이전에 저장된 파일 모두 경로 그대로 읽기
+    if not os.path.exists(locator):
+        return None
+    with open(locator, "rb") as f:
+        return f.read()
+
+
+# ─────────────────────────────────────────────
+# GC
+# ─────────────────────────────────────────────
+def collect_orphan_blobs() -> int:
+    """
+    receipt_images 기준으로 ref_count를 다시 계산하고, 참조 0인 blob을 삭제.
+    지출/프로젝트 삭제 시 receipt_images는 CASCADE로 지워지므로 카운트는 여기서 맞춘다.
+    최근에 참조된(업로드 직후 아직 receipt_images 등록 전인) blob은 유예 시간 동안 남긴다.
+    삭제한 blob 개수를 반환.
+    """
+    run_query(
+        """
+        UPDATE b
+        SET ref_count = (
+            SELECT COUNT(*) FROM receipt_images r WHERE r.content_hash = b.content_hash
+        )
+        FROM receipt_blobs b
+        """
+    )
+    df_orphans = run_query(
+        """
+        SELECT content_hash FROM receipt_blobs
+        WHERE ref_count = 0
+          AND ISNULL(last_referenced_at, created_at) < DATEADD(minute, -:grace, GETDATE())
+        """,
+        {"grace": GC_GRACE_MINUTES},
+        fetch=True,
+    )
+    if df_orphans is None or df_orphans.empty:
+        return 0
+
+    deleted = 0
+    for digest in df_orphans["content_hash"]:
+        try:
+            if run_transaction(lambda tx: _delete_orphan(tx, digest)):
+                deleted += 1
+        except OSError:
+            continue  # 파일을 못 지우면 행도 롤백 → 다음 GC에서 다시 시도
+    return deleted
+
+
+def _delete_orphan(tx, digest: str) -> bool:
+    """
+    조건을 다시 확인하며 행 삭제 → 같은 트랜잭션에서 파일 삭제.
+    커밋 전까지 행 잠금이 유지되므로 같은 해시를 올리는 store_receipt의 MERGE(HOLDLOCK)는
+    파일 삭제가 끝난 뒤에 진행되고, 그 다음 exists 확인에서 파일을 다시 쓴다.
+    """
+    df = tx.query(
+        """
+        DELETE FROM receipt_blobs
+        OUTPUT DELETED.locator
+        WHERE content_hash = :h
+          AND ref_count = 0
+          AND ISNULL(last_referenced_at, created_at) < DATEADD(minute, -:grace, GETDATE())
+        """,
+        {"h": digest, "grace": GC_GRACE_MINUTES},
+        fetch=True,
+    )
+    if df.empty:
+        return False  # 그 사이 다시 참조됨
+    # 저장 당시 버킷/경로 기준으로 삭제 (현재 설정된 백엔드가 아니라 로케이터를 따름, read_receipt와 동일)
+    locator = df.iloc[0]["locator"]
+    backend = _backend_for_locator(locator)
+    backend.delete(backend.digest_from_locator(locator))
+    return True
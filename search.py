@@ -0,0 +1,231 @@
+# search.py
+"""
+전체 행사 통합 검색 (프로세스 내 역색인)
+- 대상: 지출(항목/분류), 예산 수입(입금자/비고/추가 항목), 학생회비(이름/비고), 영수증 설명
+- 토큰: 소문자 + 글자 bigram (한국어는 형태소 분석 없이도 부분 일치가 잘 됨, 한 글자 단어는 그대로)
+- 점수: BM25 + 질의 토큰 커버리지 하한 + 원문 그대로 포함 시 가산
+- 갱신: 검색할 때마다 원본별 (행 수, MAX(updated_at))만 확인
+    바뀐 행만 다시 읽어 색인 갱신, 행 수가 안 맞으면(삭제) 남은 id와 비교해 빠진 문서 제거
+- SQL Server 전문 검색(Full-Text)은 한국어 부분 일치/로컬 SQLite 대체 DB와 동작이 달라 쓰지 않음
+"""
+
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+import pandas as pd
+import streamlit as st
+
+from db import run_query, watermark_param
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+MIN_COVERAGE = 0.6       # 질의 토큰 중 최소 이 비율은 문서에 있어야 결과로 인정
+PHRASE_BOOST = 1.5
+DEFAULT_LIMIT = 50
+
+SOURCE_LABELS = {"expense": "💸 지출", "budget": "💰 예산 수입", "member": "🧑‍🎓 학생회비", "receipt": "🧾 영수증"}
+
+# 원본별 문서 쿼리: (row_id, project_id, 행사, 날짜, 금액, 본문). updated_at 조건은 {since}에 삽입
+SOURCE_SQL = {
+    "expense": """
+        SELECT e.id AS row_id, e.project_id, p.name AS project_name, e.date AS tx_date, e.amount,
+               CONCAT(e.item, ' ', ISNULL(e.category, '')) AS body
+        FROM expenses e JOIN projects p ON p.id = e.project_id
+        WHERE 1 = 1 {since}
+    """,
+    "budget": """
+        SELECT b.id AS row_id, b.project_id, p.name AS project_name, b.entry_date AS tx_date, b.amount,
+               CONCAT(ISNULL(b.contributor_name, ''), ' ', ISNULL(b.note, ''), ' ', ISNULL(b.extra_label, '')) AS body
+        FROM budget_entries b JOIN projects p ON p.id = b.project_id
+        WHERE 1 = 1 {since}
+    """,
+    "member": """
+        SELECT m.id AS row_id, m.project_id, p.name AS project_name, m.paid_date AS tx_date,
+               m.deposit_amount AS amount, CONCAT(m.name, ' ', ISNULL(m.note, '')) AS body
+        FROM members m JOIN projects p ON p.id = m.project_id
+        WHERE 1 = 1 {since}
+    """,
+    "receipt": """
+        SELECT r.id AS row_id, r.project_id, p.name AS project_name,
+               r.uploaded_at AS tx_date, NULL AS amount,
+               CONCAT(ISNULL(r.description, ''), ' ', ISNULL(r.filename, '')) AS body
+        FROM receipt_images r JOIN projects p ON p.id = r.project_id
+        WHERE 1 = 1 {since}
+    """,
+}
+SOURCE_TABLES = {"expense": "expenses", "budget": "budget_entries", "member": "members", "receipt": "receipt_images"}
+SINCE_ALIAS = {"expense": "e", "budget": "b", "member": "m", "receipt": "r"}
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> list:
+    tokens = []
+    for word in _WORD.findall((text or "").lower()):
+        if len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+@dataclass(frozen=True)
+class Doc:
+    source: str
+    row_id: int
+    project_id: int
+    project_name: str
+    tx_date: str
+    amount: object
+    body: str
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.docs = {}                         # (source, row_id) -> Doc
+        self.lengths = {}                      # key -> 토큰 수
+        self.postings = defaultdict(dict)      # token -> {key: tf}
+        self.seen = {}                         # source -> (행 수, MAX(updated_at))
+        self.total_length = 0
+        self.last_refresh_ms = 0.0
+
+    # ── 색인 유지 ────────────────────────────────────────────────────────────
+    def _remove(self, key):
+        doc = self.docs.pop(key, None)
+        if doc is None:
+            return
+        for token in set(tokenize(doc.body)):
+            bucket = self.postings.get(token)
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del self.postings[token]
+        self.total_length -= self.lengths.pop(key, 0)
+
+    def _add(self, doc: Doc):
+        key = (doc.source, doc.row_id)
+        self._remove(key)
+        counts = Counter(tokenize(doc.body))
+        self.docs[key] = doc
+        self.lengths[key] = sum(counts.values())
+        self.total_length += self.lengths[key]
+        for token, tf in counts.items():
+            self.postings[token][key] = tf
+
+    def _load(self, source: str, since=None) -> bool:
+        """원본 행을 (since 이후만) 색인. 조회 실패 시 False (색인은 그대로)."""
+        where = f"AND {SINCE_ALIAS[source]}.updated_at >= :since" if since is not None else ""
+        df = run_query(SOURCE_SQL[source].format(since=where), {"since": since} if since is not None else None, fetch=True)
+        if df is None:
+            return False
+        if since is None:
+            for key in [k for k in self.docs if k[0] == source]:
+                self._remove(key)
+        for row in df.itertuples(index=False):
+            self._add(Doc(source, int(row.row_id), int(row.project_id), row.project_name,
+                          str(row.tx_date or "")[:10], row.amount, str(row.body or "").strip()))
+        return True
+
+    def _prune(self, source: str) -> bool:
+        df = run_query(f"SELECT id FROM {SOURCE_TABLES[source]}", fetch=True)
+        if df is None:
+            return False
+        alive = set(int(i) for i in df["id"])
+        for key in [k for k in self.docs if k[0] == source and k[1] not in alive]:
+            self._remove(key)
+        return True
+
+    def refresh(self):
+        """원본별 (행 수, 최종 변경 시각)을 보고 바뀐 부분만 다시 색인."""
+        started = time.perf_counter()
+        version = _source_versions()
+        with self._lock:
+            for source, (count, changed_at) in version.items():
+                seen = self.seen.get(source)
+                if seen == (count, changed_at):
+                    continue
+                if seen is None or seen[1] is None or changed_at is None:
+                    ok = self._load(source)
+                else:
+                    ok = changed_at == seen[1] or self._load(source, since=seen[1])
+                    if ok and sum(1 for k in self.docs if k[0] == source) != count:
+                        ok = self._prune(source)     # 삭제가 있었음 → 남은 id만 확인
+                # 조회가 실패했으면 워터마크를 그대로 둬서 다음 검색 때 다시 시도
+                if ok:
+                    self.seen[source] = (count, changed_at)
+        self.last_refresh_ms = (time.perf_counter() - started) * 1000
+
+    # ── 검색 ────────────────────────────────────────────────────────────────
+    def search(self, query: str, project_id: int = None, limit: int = DEFAULT_LIMIT) -> list:
+        q_tokens = set(tokenize(query))
+        if not q_tokens:
+            return []
+        phrase = query.strip().lower()
+        with self._lock:
+            n_docs = len(self.docs) or 1
+            avg_len = (self.total_length / n_docs) or 1.0
+            scores, matched = defaultdict(float), defaultdict(int)
+            for token in q_tokens:
+                bucket = self.postings.get(token)
+                if not bucket:
+                    continue
+                idf = math.log(1 + (n_docs - len(bucket) + 0.5) / (len(bucket) + 0.5))
+                for key, tf in bucket.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[key] / avg_len)
+                    scores[key] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+                    matched[key] += 1
+
+            hits = []
+            for key, score in scores.items():
+                coverage = matched[key] / len(q_tokens)
+                doc = self.docs[key]
+                if coverage < MIN_COVERAGE or (project_id is not None and doc.project_id != project_id):
+                    continue
+                if phrase in doc.body.lower():
+                    score *= PHRASE_BOOST
+                hits.append((score * coverage, doc))
+        hits.sort(key=lambda h: h[0], reverse=True)
+        return hits[:limit]
+
+    def stats(self) -> dict:
+        return {"docs": len(self.docs), "tokens": len(self.postings), "refresh_ms": round(self.last_refresh_ms, 1)}
+
+
+def _source_versions() -> dict:
+    """한 번의 쿼리로 원본별 (행 수, MAX(updated_at))."""
+    parts = ", ".join(
+        f"(SELECT COUNT(*) FROM {table}) AS {source}_n, (SELECT MAX(updated_at) FROM {table}) AS {source}_t"
+        for source, table in SOURCE_TABLES.items()
+    )
+    df = run_query(f"SELECT {parts}", fetch=True)
+    if df is None or df.empty:
+        return {}
+    row = df.iloc[0]
+    return {
+        source: (int(row[f"{source}_n"]), watermark_param(row[f"{source}_t"]))
+        for source in SOURCE_TABLES
+    }
+
+
+@st.cache_resource(show_spinner=False)
+def get_index() -> SearchIndex:
+    return SearchIndex()
+
+
+def search(query: str, project_id: int = None, limit: int = DEFAULT_LIMIT) -> pd.DataFrame:
+    index = get_index()
+    index.refresh()
+    rows = [
+        {
+            "점수": round(score, 2), "행사": doc.project_name, "구분": SOURCE_LABELS[doc.source],
+            "내용": doc.body, "날짜": doc.tx_date, "금액": doc.amount,
+            "project_id": doc.project_id, "source": doc.source, "row_id": doc.row_id,
+        }
+        for score, doc in index.search(query, project_id, limit)
+    ]
+    return pd.DataFrame(rows, columns=["점수", "행사", "구분", "내용", "날짜", "금액", "project_id", "source", "row_id"])
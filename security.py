@@ -12,8 +12,11 @@ import datetime
 import pandas as pd
 import streamlit as st
 
+import password_hashing
 from audit import log_action
 from db import run_query
+from rate_limit import check_rate_limit, reset_rate_limit
+from system_config import get_system_config, set_system_config
 
 
 ROLE_LABELS = {
@@ -65,12 +68,18 @@ SECURITY_QUESTIONS = [
 
 # ── 유틸 ─────────────────────────────────────────────────────────────────────
 def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+    return password_hashing.hash_password(password)
 
 def verify_password(password: str, password_hash: str) -> bool:
-    if not password_hash:
-        return False
-    return hmac.compare_digest(hash_password(password), password_hash)
+    return password_hashing.verify_password(password, password_hash)
+
+def _rehash_if_needed(student_id: str, password: str, password_hash: str):
+    # 구버전 SHA-256이거나 비용 설정이 바뀐 해시 → 로그인 성공 시점에 새 형식으로 교체
+    if password_hashing.needs_rehash(password_hash):
+        run_query(
+            "UPDATE approved_users SET password_hash = :ph WHERE student_id = :sid AND password_hash = :old",
+            {"ph": hash_password(password), "sid": student_id, "old": password_hash},
+        )
 
 def _hash_answer(answer: str) -> str:
     return hashlib.sha256(answer.strip().lower().encode("utf-8")).hexdigest()
@@ -80,20 +89,22 @@ def _normalize_role(role: str) -> str:
         return "treasurer"
     return role or "member"
 
+def _in_clause(values, params: dict, prefix: str = "s") -> str:
+    placeholders = []
+    for i, value in enumerate(values):
+        key = f"{prefix}{i}"
+        placeholders.append(f":{key}")
+        params[key] = value
+    return ", ".join(placeholders)
+
 def _is_quota_full(role: str, statuses=("PENDING", "APPROVED")) -> bool:
     role = _normalize_role(role)
     limit = ROLE_LIMITS.get(role)
     if limit is None:
         return False
     
-    # PostgreSQL 파라미터 생성 로직
     params = {"role": role}
-    status_conds = []
-    for i, s in enumerate(statuses):
-        k = f"s{i}"
-        status_conds.append(f":{k}")
-        params[k] = s
-    placeholders = ", ".join(status_conds)
+    placeholders = _in_clause(statuses, params)
     
     df = run_query(
         f"SELECT COUNT(*) AS cnt FROM approved_users WHERE role = :role AND status IN ({placeholders})",
@@ -118,8 +129,12 @@ def _gen_temp_password(length: int = 8) -> str:
 
 # ── 인증 ─────────────────────────────────────────────────────────────────────
 def authenticate_user(name, student_id, password=""):
+    # 제한에 걸린 시도는 DB 조회 없이 거절
+    if check_rate_limit("login", student_id):
+        return None, "rate_limited"
+
     df = run_query(
-        "SELECT role, status, password_hash, permissions FROM approved_users WHERE name = :name AND student_id = :sid",
+        "SELECT role, status, password_hash, permissions, perm_version FROM approved_users WHERE name = :name AND student_id = :sid",
         {"name": name, "sid": student_id},
         fetch=True,
     )
@@ -131,19 +146,26 @@ def authenticate_user(name, student_id, password=""):
     
     role        = _normalize_role(role)
     permissions = _parse_permissions(permissions_json, role)
+    user = {
+        "name": name, "student_id": student_id, "role": role, "status": status,
+        "permissions": permissions, "perm_version": int(row["perm_version"] or 0),
+    }
 
     if role in PRIVILEGED_ROLES:
         if not password_hash:
             return None, "admin_password_not_set"
         if not password or not verify_password(password, password_hash):
             return None, "bad_password"
+        _rehash_if_needed(student_id, password, password_hash)
         if role == "treasurer" and status in {"PENDING", "APPROVED"}:
-            return {"name": name, "student_id": student_id, "role": role, "permissions": permissions}, None
+            reset_rate_limit("login", student_id)
+            return user, None
 
     if status != "APPROVED":
         return None, "not_approved"
 
-    return {"name": name, "student_id": student_id, "role": role, "permissions": permissions}, None
+    reset_rate_limit("login", student_id)
+    return user, None
 
 
 def is_user_approved(name, student_id):
@@ -200,6 +222,8 @@ def render_password_reset_ui():
         if st.button("보안 질문 확인", key="reset_step1_btn"):
             if not r_name or not r_sid:
                 st.error("이름과 학번을 입력해주세요.")
+            elif (retry_after := check_rate_limit("reset", r_sid)):
+                st.error(f"⏳ 시도가 너무 많습니다. {int(retry_after) + 1}초 후 다시 시도해주세요.")
             else:
                 df = run_query(
                     """
@@ -231,6 +255,8 @@ def render_password_reset_ui():
         if col1.button("확인", key="reset_step2_btn"):
             if not r_answer:
                 st.error("답변을 입력해주세요.")
+            elif (retry_after := check_rate_limit("reset", st.session_state.get("reset_target_sid"))):
+                st.error(f"⏳ 시도가 너무 많습니다. {int(retry_after) + 1}초 후 다시 시도해주세요.")
             else:
                 if hmac.compare_digest(
                     _hash_answer(r_answer),
@@ -280,13 +306,145 @@ def render_password_reset_ui():
             st.rerun()
 
 
+# ── 총무: 일괄 승인/거절/비활성화 (집합 단위 쿼리) ────────────────────────────
+# 저장된 역할 별칭(admin/총무)을 정규화한 역할 — UPDATE의 SET 절은 갱신 전 값을 참조
+_NORMALIZED_ROLE_SQL = "CASE WHEN role IN ('admin', N'총무') THEN 'treasurer' ELSE ISNULL(role, 'member') END"
+
+def _default_permissions_case(params: dict) -> str:
+    whens = []
+    for i, (role, perms) in enumerate(DEFAULT_PERMISSIONS.items()):
+        params[f"r{i}"] = role
+        params[f"p{i}"] = json.dumps(perms)
+        whens.append(f"WHEN :r{i} THEN :p{i}")
+    params["p_default"] = json.dumps(["can_view"])
+    return f"CASE {_NORMALIZED_ROLE_SQL} {' '.join(whens)} ELSE :p_default END"
+
+def _quota_overflow_sql(in_clause: str, role_sql: str, params: dict) -> str:
+    """
+    승인 후 정원을 넘는 역할을 돌려주는 SELECT (없으면 빈 결과).
+    현재 APPROVED + 대상 중 아직 PENDING인 행만 센다. 잠금 힌트로 동시 승인과 직렬화.
+    이번에 승인하는 역할만 본다 (다른 역할이 이미 정원을 넘어 있어도 막지 않음).
+    """
+    whens = []
+    for i, (r, limit) in enumerate(ROLE_LIMITS.items()):
+        if limit is not None:
+            params[f"lr{i}"], params[f"ll{i}"] = r, limit
+            whens.append(f"WHEN :lr{i} THEN :ll{i}")
+    if not whens:
+        return "SELECT NULL AS role WHERE 1 = 0"
+    return f"""
+        SELECT c.role
+        FROM (
+            SELECT {_NORMALIZED_ROLE_SQL} AS role
+            FROM approved_users WITH (UPDLOCK, HOLDLOCK)
+            WHERE status = 'APPROVED'
+            UNION ALL
+            SELECT {role_sql} AS role
+            FROM approved_users WITH (UPDLOCK, HOLDLOCK)
+            WHERE status = 'PENDING' AND student_id IN ({in_clause})
+        ) c
+        WHERE c.role IN (
+            SELECT {role_sql} FROM approved_users
+            WHERE status = 'PENDING' AND student_id IN ({in_clause})
+        )
+        GROUP BY c.role
+        HAVING COUNT(*) > CASE c.role {' '.join(whens)} END
+    """
+
+def _summarize_targets(df) -> str:
+    return ", ".join(f"{name}({sid})" for sid, name in zip(df["student_id"], df["name"]))
+
+def bulk_approve_users(df_targets, role: str = None):
+    """
+    선택한 PENDING 사용자 일괄 승인. role을 주면 모두 그 역할로, 없으면 신청 역할 유지.
+    권한은 역할별 기본값. 반환: (승인된 사용자 DataFrame | None, 오류 메시지 | None)
+    """
+    params = {}
+    in_clause = _in_clause(df_targets["student_id"].tolist(), params)
+    if role:
+        params["role"] = role
+        params["perms"] = json.dumps(DEFAULT_PERMISSIONS.get(role, ["can_view"]))
+        role_sql, perms_sql = ":role", ":perms"
+    else:
+        role_sql, perms_sql = _NORMALIZED_ROLE_SQL, _default_permissions_case(params)
+    overflow_sql = _quota_overflow_sql(in_clause, role_sql, params)
+
+    # 정원 확인과 승인을 한 문장으로: 하나라도 넘치면 아무도 승인 안 됨
+    df_done = run_query(
+        f"""
+        UPDATE approved_users
+        SET status = 'APPROVED', role = {role_sql}, permissions = {perms_sql},
+            perm_version = perm_version + 1
+        OUTPUT INSERTED.student_id, INSERTED.name, INSERTED.role
+        WHERE status = 'PENDING' AND student_id IN ({in_clause})
+          AND NOT EXISTS ({overflow_sql})
+        """,
+        params, fetch=True,
+    )
+    if df_done is None:
+        return None, "DB 오류로 승인하지 못했습니다."
+    if df_done.empty:
+        # 대상이 이미 처리됐거나 정원 초과 → 어느 쪽인지만 다시 확인 (안내 문구용)
+        df_full = run_query(overflow_sql, params, fetch=True)
+        if df_full is not None and not df_full.empty:
+            return None, f"정원 초과: {', '.join(ROLE_LABELS.get(r, r) for r in df_full['role'])}"
+    st.cache_data.clear()  # fetch=True 쓰기는 run_query가 캐시를 비우지 않음
+    if not df_done.empty:
+        by_role = df_done["role"].value_counts().to_dict()
+        roles = ", ".join(f"{ROLE_LABELS.get(r, r)} {n}명" for r, n in by_role.items())
+        log_action("사용자 일괄 승인", f"{len(df_done)}명 승인 ({roles}) / 대상: {_summarize_targets(df_done)}")
+    return df_done, None
+
+def bulk_reject_users(student_ids):
+    params = {}
+    in_clause = _in_clause(student_ids, params)
+    df_done = run_query(
+        f"""
+        DELETE FROM approved_users
+        OUTPUT DELETED.student_id, DELETED.name
+        WHERE status = 'PENDING' AND student_id IN ({in_clause})
+        """,
+        params, fetch=True,
+    )
+    if df_done is None:
+        return None
+    st.cache_data.clear()
+    if not df_done.empty:
+        log_action("사용자 일괄 거절", f"{len(df_done)}명 승인 거절 / 대상: {_summarize_targets(df_done)}")
+    return df_done
+
+def bulk_suspend_users(student_ids):
+    params = {}
+    in_clause = _in_clause(student_ids, params)
+    df_done = run_query(
+        f"""
+        UPDATE approved_users
+        SET status = 'SUSPENDED', perm_version = perm_version + 1
+        OUTPUT INSERTED.student_id, INSERTED.name
+        WHERE status = 'APPROVED' AND student_id IN ({in_clause})
+        """,
+        params, fetch=True,
+    )
+    if df_done is None:
+        return None
+    st.cache_data.clear()
+    if not df_done.empty:
+        log_action("계정 일괄 비활성화", f"{len(df_done)}명 비활성화 / 대상: {_summarize_targets(df_done)}")
+    return df_done
+
+
 # ── 총무: 사용자 승인 + 권한 설정 ─────────────────────────────────────────────
+def _reset_bulk_selection():
+    # 처리된 학번이 multiselect 상태에 남지 않도록 선택 초기화
+    for key in ("bulk_select_all", "bulk_targets_True", "bulk_targets_False", "bulk_suspend_targets"):
+        st.session_state.pop(key, None)
+
 def _render_user_approval_manager():
     st.sidebar.markdown("---")
     st.sidebar.header("👤 사용자 승인 관리")
 
     df_pending = run_query(
-        "SELECT student_id, name, role FROM approved_users WHERE status = 'PENDING'",
+        "SELECT student_id, name, role FROM approved_users WHERE status = 'PENDING' ORDER BY name",
         fetch=True,
     )
 
@@ -294,49 +452,91 @@ def _render_user_approval_manager():
         st.sidebar.info("대기 중인 요청이 없습니다.")
         return
 
-    for _, row in df_pending.iterrows():
-        sid, name, role = row["student_id"], row["name"], row["role"]
-        normalized  = _normalize_role(role)
-        pretty_role = ROLE_LABELS.get(normalized, role)
-
-        with st.sidebar.expander(f"📝 {name} ({sid}) — {pretty_role}"):
-            role_options  = list(ROLE_LABELS.keys())
-            selected_role = st.selectbox(
-                "역할 설정",
-                role_options,
-                index=role_options.index(normalized) if normalized in role_options else 4,
-                format_func=lambda r: ROLE_LABELS.get(r, r),
-                key=f"role_sel_{sid}",
-            )
+    labels = {
+        sid: f"{name} ({sid}) — {ROLE_LABELS.get(_normalize_role(role), role)}"
+        for sid, name, role in zip(df_pending["student_id"], df_pending["name"], df_pending["role"])
+    }
+    st.sidebar.caption(f"대기 {len(df_pending)}명")
+
+    with st.sidebar.expander("📋 일괄 처리", expanded=True):
+        select_all = st.checkbox("전체 선택", key="bulk_select_all")
+        selected = st.multiselect(
+            "대상 선택",
+            list(labels),
+            default=list(labels) if select_all else [],
+            format_func=labels.get,
+            key=f"bulk_targets_{select_all}",
+        )
+        role_options = [None] + list(ROLE_LABELS.keys())
+        bulk_role = st.selectbox(
+            "역할",
+            role_options,
+            format_func=lambda r: "신청한 역할 유지" if r is None else ROLE_LABELS.get(r, r),
+            key="bulk_role",
+        )
+        st.caption("권한은 역할별 기본값으로 설정됩니다. 세부 조정은 아래 개별 설정에서.")
 
-            default_perms = DEFAULT_PERMISSIONS.get(selected_role, ["can_view"])
-            st.write("**권한 설정:**")
-            selected_perms = []
-            for perm_key, perm_label in ALL_PERMISSIONS:
-                if st.checkbox(
-                    perm_label,
-                    value=(perm_key in default_perms),
-                    key=f"perm_{sid}_{perm_key}",
-                ):
-                    selected_perms.append(perm_key)
+        col1, col2 = st.columns(2)
+        if col1.button(f"✅ 승인 ({len(selected)})", key="bulk_approve", disabled=not selected):
+            df_targets = df_pending[df_pending["student_id"].isin(selected)]
+            df_done, error = bulk_approve_users(df_targets, role=bulk_role)
+            if error:
+                st.error(error)
+            else:
+                _reset_bulk_selection()
+                st.rerun()
+        if col2.button(f"❌ 거절 ({len(selected)})", key="bulk_reject", disabled=not selected):
+            bulk_reject_users(selected)
+            _reset_bulk_selection()
+            st.rerun()
 
-            col1, col2 = st.columns(2)
-            if col1.button("✅ 승인", key=f"app_{sid}"):
-                if _is_quota_full(selected_role, statuses=("APPROVED",)):
-                    st.error(f"'{ROLE_LABELS.get(selected_role)}' 정원이 가득 찼습니다.")
-                else:
-                    run_query(
-                        "UPDATE approved_users SET status='APPROVED', role=:role, permissions=:perms WHERE student_id=:sid",
-                        {"role": selected_role, "perms": json.dumps(selected_perms), "sid": sid},
-                    )
-                    log_action("사용자 승인", f"{name}({sid}) 승인 / 역할: {selected_role} / 권한: {selected_perms}")
-                    st.rerun()
+    # 개별 권한 설정: 선택한 한 명만 렌더링
+    with st.sidebar.expander("🔧 개별 설정"):
+        sid = st.selectbox("사용자", list(labels), format_func=labels.get, key="single_target")
+        row = df_pending[df_pending["student_id"] == sid].iloc[0]
+        name, normalized = row["name"], _normalize_role(row["role"])
+
+        role_options  = list(ROLE_LABELS.keys())
+        selected_role = st.selectbox(
+            "역할 설정",
+            role_options,
+            index=role_options.index(normalized) if normalized in role_options else 4,
+            format_func=lambda r: ROLE_LABELS.get(r, r),
+            key=f"role_sel_{sid}",
+        )
+
+        default_perms = DEFAULT_PERMISSIONS.get(selected_role, ["can_view"])
+        st.write("**권한 설정:**")
+        selected_perms = []
+        for perm_key, perm_label in ALL_PERMISSIONS:
+            if st.checkbox(
+                perm_label,
+                value=(perm_key in default_perms),
+                key=f"perm_{sid}_{perm_key}",
+            ):
+                selected_perms.append(perm_key)
 
-            if col2.button("❌ 거절", key=f"rej_{sid}"):
-                run_query("DELETE FROM approved_users WHERE student_id = :sid", {"sid": sid})
-                log_action("사용자 거절", f"{name}({sid}) 승인 거절")
+        col1, col2 = st.columns(2)
+        if col1.button("✅ 승인", key=f"app_{sid}"):
+            if _is_quota_full(selected_role, statuses=("APPROVED",)):
+                st.error(f"'{ROLE_LABELS.get(selected_role)}' 정원이 가득 찼습니다.")
+            else:
+                run_query(
+                    """
+                    UPDATE approved_users
+                    SET status='APPROVED', role=:role, permissions=:perms, perm_version = perm_version + 1
+                    WHERE student_id=:sid
+                    """,
+                    {"role": selected_role, "perms": json.dumps(selected_perms), "sid": sid},
+                )
+                log_action("사용자 승인", f"{name}({sid}) 승인 / 역할: {selected_role} / 권한: {selected_perms}")
                 st.rerun()
 
+        if col2.button("❌ 거절", key=f"rej_{sid}"):
+            run_query("DELETE FROM approved_users WHERE student_id = :sid", {"sid": sid})
+            log_action("사용자 거절", f"{name}({sid}) 승인 거절")
+            st.rerun()
+
 
 # ── 총무: 승인된 사용자 관리 + 알림 ──────────────────────────────────────────
 def _render_user_management_panel():
@@ -367,6 +567,20 @@ def _render_user_management_panel():
             st.info("승인된 사용자가 없습니다.")
             return
 
+        my_sid = st.session_state.get("current_user", {}).get("student_id")
+        suspendable = {
+            sid: f"{name} ({sid})"
+            for sid, name, status in zip(df_approved["student_id"], df_approved["name"], df_approved["status"])
+            if status == "APPROVED" and sid != my_sid
+        }
+        if suspendable:
+            to_suspend = st.multiselect("일괄 비활성화 대상", list(suspendable), format_func=suspendable.get, key="bulk_suspend_targets")
+            if st.button(f"🚫 일괄 비활성화 ({len(to_suspend)})", key="bulk_suspend", disabled=not to_suspend):
+                bulk_suspend_users(to_suspend)
+                _reset_bulk_selection()
+                st.rerun()
+            st.markdown("---")
+
         for _, row in df_approved.iterrows():
             sid, name, role, status = row["student_id"], row["name"], row["role"], row["status"]
             pretty_role  = ROLE_LABELS.get(_normalize_role(role), role)
@@ -398,12 +612,18 @@ def _render_user_management_panel():
 
             if status == "APPROVED":
                 if col2.button("🚫 비활성화", key=f"suspend_{sid}"):
-                    run_query("UPDATE approved_users SET status='SUSPENDED' WHERE student_id=:sid", {"sid": sid})
+                    run_query(
+                        "UPDATE approved_users SET status='SUSPENDED', perm_version = perm_version + 1 WHERE student_id=:sid",
+                        {"sid": sid},
+                    )
                     log_action("계정 비활성화", f"{name}({sid}) 계정 비활성화")
                     st.rerun()
             else:
                 if col2.button("✅ 재활성화", key=f"activate_{sid}"):
-                    run_query("UPDATE approved_users SET status='APPROVED' WHERE student_id=:sid", {"sid": sid})
+                    run_query(
+                        "UPDATE approved_users SET status='APPROVED', perm_version = perm_version + 1 WHERE student_id=:sid",
+                        {"sid": sid},
+                    )
                     log_action("계정 재활성화", f"{name}({sid}) 계정 재활성화")
                     st.rerun()
 
@@ -475,16 +695,14 @@ def _render_rubicon_admin_controls():
                 caption="운명 결정.",
             )
             time.sleep(4)
-            run_query("UPDATE system_config SET [value] = 'LOCKED' WHERE [key] = 'status'")
+            set_system_config("status", "LOCKED")
             log_action("보안 잠금", "루비콘 강을 건넜습니다 (시스템 폐쇄)")
             st.rerun()
 
 
 def check_rubicon_security(current_user=None):
-    df_status = run_query("SELECT [value] FROM system_config WHERE [key] = 'status'", fetch=True)
-    status = df_status.iloc[0]["value"] if (df_status is not None and not df_status.empty) else "NORMAL"
-
-    if status == "LOCKED":
+    # 캐시된 설정 사용 (TTL 내에는 DB 조회 없음, 잠금/해제 시 즉시 무효화)
+    if get_system_config().is_locked:
         st.markdown(
             "<style>.stApp { background-color: #2c0000; color: white; }</style>",
             unsafe_allow_html=True,
@@ -495,7 +713,7 @@ def check_rubicon_security(current_user=None):
         if unlock_code == "10 legio":
             with st.spinner("10군단 도착..."):
                 time.sleep(2)
-            run_query("UPDATE system_config SET [value] = 'NORMAL' WHERE [key] = 'status'")
+            set_system_config("status", "NORMAL")
             log_action("보안 해제", "시스템 잠금 해제됨 (10 legio)")
             st.rerun()
         st.stop()
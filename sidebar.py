@@ -6,11 +6,17 @@ import zipfile
 import pandas as pd
 import streamlit as st
 
+import db_metrics
+import profiler
+import query_log
+from accounting import integrity, periods
+from accounting.reconcile import ISSUE_LABELS, load_open_issues, load_watermark, repair_open_issues, run_reconciliation
 from audit import log_action
-from db import run_query
+from db import pool_settings, pool_status, run_query
 from export_excel import create_settlement_excel
 from archive.archive_service import archive_project, delete_archived_project_data
 
+from principal import has_permission, revalidate_current_user, sign_in, sign_out
 from security import (
     PRIVILEGED_ROLES,
     ROLE_LABELS,
@@ -27,16 +33,10 @@ ROLE_OPTIONS = ["treasurer", "deputy", "president", "vice_president", "member"]
 
 # ── 권한 헬퍼 ─────────────────────────────────────────────────────────────────
 def _can_archive(current_user: dict) -> bool:
-    permissions = current_user.get("permissions", [])
-    if isinstance(permissions, list) and "can_archive" in permissions:
-        return True
-    return current_user.get("role") in PRIVILEGED_ROLES
+    return has_permission(current_user, "can_archive")
 
 def _can_delete_project(current_user: dict) -> bool:
-    permissions = current_user.get("permissions", [])
-    if isinstance(permissions, list) and "can_delete_project" in permissions:
-        return True
-    return current_user.get("role") in PRIVILEGED_ROLES
+    return has_permission(current_user, "can_delete_project")
 
 # ── session_state 키 헬퍼 ─────────────────────────────────────────────────────
 def _archive_key(suffix, project_id): return f"archive_{suffix}_{project_id}"
@@ -85,8 +85,8 @@ def _render_admin_archive_ui(current_user, project_id):
                 st.error("아카이브 사유를 입력해야 합니다.")
             else:
                 try:
-                    filename, archive_json = archive_project(project_id, current_user, archive_reason.strip())
-                    st.session_state[_archive_key("payload", project_id)]        = archive_json
+                    filename, archive_zip = archive_project(project_id, current_user, archive_reason.strip())
+                    st.session_state[_archive_key("payload", project_id)]        = archive_zip
                     st.session_state[_archive_key("filename", project_id)]       = filename
                     st.session_state[_archive_key("archived_by", project_id)]    = current_user.get("name","unknown")
                     st.session_state[_archive_key("archive_reason", project_id)] = archive_reason.strip()
@@ -99,10 +99,10 @@ def _render_admin_archive_ui(current_user, project_id):
     st.success("✅ 아카이브 파일 준비 완료.")
     st.warning("⚠️ 다운로드 후 아래 '삭제 확인' 버튼을 눌러야 DB에서 삭제됩니다.")
     st.download_button(
-        "📥 아카이브 JSON 다운로드",
+        "📥 아카이브 파일(zip) 다운로드",
         data=st.session_state[_archive_key("payload", project_id)],
         file_name=st.session_state[_archive_key("filename", project_id)],
-        mime="application/json",
+        mime="application/zip",
         key=f"download_archive_{project_id}",
     )
     st.error("🗑️ 다운로드를 완료했다면 아래 버튼으로 DB 데이터를 삭제하세요.")
@@ -154,6 +154,153 @@ def _render_project_delete_ui(current_user, project_id, project_name):
             _clear_delete_state(project_id)
             st.rerun()
 
+# ── 총무: DB 커넥션 풀 상태 ───────────────────────────────────────────────────
+def _render_db_pool_panel():
+    with st.sidebar.expander("🔌 DB 커넥션 풀"):
+        settings = pool_settings()
+        status = pool_status()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("풀 크기", f"{status['size']} (+{settings['max_overflow']})")
+        col2.metric("사용 중", status["checkedout"])
+        col3.metric("유휴", status["checkedin"])
+        st.caption(
+            f"timeout {settings['pool_timeout']}s · recycle {settings['pool_recycle']}s · "
+            f"pre-ping {'ON' if settings['pool_pre_ping'] else 'OFF'}"
+        )
+
+        checkout = db_metrics.checkout_wait.summary()
+        latency = db_metrics.query_latency.summary()
+        st.dataframe(
+            pd.DataFrame([{"지표": "checkout 대기", **checkout}, {"지표": "쿼리 실행", **latency}]),
+            hide_index=True, use_container_width=True,
+        )
+        hist = pd.DataFrame(db_metrics.checkout_wait.rows()).merge(
+            pd.DataFrame(db_metrics.query_latency.rows()), on="구간"
+        )
+        st.bar_chart(hist.set_index("구간"))
+
+        counters = db_metrics.counters()
+        st.caption(f"끊긴 연결 재시도 {counters['disconnect_retries']}회 · 풀 대기 초과 {counters['checkout_timeouts']}회")
+        if st.button("지표 초기화", key="reset_db_metrics"):
+            db_metrics.reset_metrics()
+            st.rerun()
+
+# ── 총무: 성능 (쿼리 계측) ─────────────────────────────────────────────────────
+def _render_performance_panel():
+    with st.sidebar.expander("⏱️ 성능"):
+        report = st.session_state.get("last_query_report")
+        if report:
+            col1, col2 = st.columns(2)
+            col1.metric("직전 rerun 쿼리", report["queries"], help=f"예산 {query_log.QUERY_BUDGET_PER_RERUN}회")
+            col2.metric("DB 시간", f"{report['db_ms']:.0f}ms", help=f"전체 {report['wall_ms']:.0f}ms")
+            if report["over_budget"]:
+                st.warning(f"쿼리 예산({query_log.QUERY_BUDGET_PER_RERUN}회) 초과")
+            for suspect in report["n_plus_one"]:
+                st.error(f"N+1 의심: {suspect['count']}회 반복 — {suspect['callers']}")
+                st.code(suspect["sql"], language="sql")
+
+        st.write("**누적 시간 상위 쿼리**")
+        st.dataframe(query_log.top_queries(), hide_index=True, use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        col1.download_button(
+            "📥 CSV", data=query_log.export_csv(),
+            file_name="query_log.csv", mime="text/csv", key="query_log_csv",
+        )
+        if col2.button("기록 비우기", key="query_log_clear"):
+            query_log.clear()
+            st.rerun()
+
+# ── 총무: 장부 대사 ────────────────────────────────────────────────────────────
+def _render_reconcile_panel(current_user):
+    with st.sidebar.expander("🧮 장부 대사"):
+        mark = load_watermark()
+        if mark["ran_at"] is not None:
+            st.caption(f"마지막 실행 {mark['ran_at']} · 검사 {mark['checked_rows']}행 · 미해결 {mark['issues']}건")
+        else:
+            st.caption("아직 실행한 적 없음 (첫 실행은 전체 검사)")
+
+        col1, col2 = st.columns(2)
+        full = col2.checkbox("전체 검사", key="reconcile_full")
+        if col1.button("대사 실행", key="reconcile_run"):
+            result = run_reconciliation(full=full)
+            st.caption(f"행 {result.checked_rows}건 / 새 전표 {result.checked_entries}건 검사")
+
+        # 미해결 목록은 DB에 남아 있으므로 새 세션에서도 그대로 보이고 복구 가능
+        open_issues = load_open_issues()
+        if open_issues.empty:
+            if mark["ran_at"] is not None:
+                st.success("미해결 불일치 없음")
+            return
+        st.warning(f"미해결 불일치 {len(open_issues)}건")
+        st.dataframe(open_issues.assign(kind=open_issues["kind"].map(ISSUE_LABELS)),
+                     hide_index=True, use_container_width=True)
+        if st.button("역분개/재분개로 복구", key="reconcile_repair"):
+            actor = current_user.get("name", "treasurer")
+            repaired, remaining = repair_open_issues(actor)
+            log_action("장부 대사 복구", f"{repaired}건 (불일치 {len(open_issues)}건, 남은 {len(remaining)}건)")
+            st.rerun()
+
+# ── 총무: 장부 무결성 ──────────────────────────────────────────────────────────
+def _render_integrity_panel():
+    with st.sidebar.expander("🧾 장부 무결성"):
+        mark = load_watermark(integrity.WATERMARK_NAME)
+        st.caption(f"검사 완료 전표 #{mark['last_journal_id']}까지 · 마지막 {mark['ran_at'] or '-'}")
+        col1, col2 = st.columns(2)
+        full = col2.checkbox("처음부터", key="integrity_full")
+        if col1.button("무결성 검사", key="integrity_scan"):
+            st.session_state["integrity_report"] = integrity.scan(full=full)
+
+        report = st.session_state.get("integrity_report")
+        if report is None:
+            return
+        if report.problems.empty:
+            st.success(f"문제 없음 (전표 {report.scanned}건 검사)")
+            return
+        problems = report.problems.assign(problems=report.problems["problems"].map(
+            lambda codes: ", ".join(integrity.PROBLEM_LABELS[c] for c in codes.split(","))
+        ))
+        st.error(f"문제 전표 {len(problems)}건 (전표 {report.scanned}건 검사)")
+        st.dataframe(problems, hide_index=True, use_container_width=True)
+        empty_ids = integrity.empty_entry_ids(report)
+        if empty_ids and st.button(f"빈 전표 {len(empty_ids)}건 삭제", key="integrity_fix_empty"):
+            removed = integrity.remove_empty_entries(empty_ids)
+            log_action("장부 무결성 정리", f"빈 전표 {removed}건 삭제")
+            st.session_state.pop("integrity_report", None)
+            st.rerun()
+
+# ── 총무: 기간 마감 ────────────────────────────────────────────────────────────
+def _render_period_close_panel(current_user):
+    with st.sidebar.expander("📅 기간 마감"):
+        df_periods = periods.list_periods()
+        if df_periods.empty:
+            st.caption("마감된 기간 없음")
+        else:
+            st.dataframe(
+                df_periods[["label", "end_date", "closed_by"]].rename(
+                    columns={"label": "기간", "end_date": "종료일", "closed_by": "마감자"}
+                ),
+                hide_index=True, use_container_width=True,
+            )
+
+        label = st.text_input("기간 이름", placeholder="예: 2026-1학기 / 2026년 3월", key="period_label")
+        end_date = st.date_input("종료일 (이 날짜까지 잠금)", key="period_end_date")
+        if st.button("마감", key="period_close_btn"):
+            try:
+                close_id = periods.close_period(label.strip() or str(end_date), str(end_date), current_user.get("name", "treasurer"))
+            except ValueError as e:
+                st.error(f"마감 실패: {e}")
+            else:
+                if close_id is not None:
+                    log_action("기간 마감", f"{label} / {end_date}까지")
+                    st.rerun()
+
+        if not df_periods.empty and st.button("마지막 마감 취소", key="period_reopen_btn"):
+            reopened = periods.reopen_latest_period()
+            if reopened:
+                log_action("기간 마감 취소", f"{reopened}까지 마감 취소")
+            st.rerun()
+
 # ── Excel / ZIP 빌더 ──────────────────────────────────────────────────────────
 def _build_project_excel(project_id, project_name):
     df_budget = run_query(
@@ -219,8 +366,8 @@ def _render_login_center():
         if login_submit:
             current_user, auth_error = authenticate_user(input_name, input_sid, input_password)
             if current_user:
-                st.session_state["current_user"]          = current_user
-                st.session_state["operator_name_input"]   = current_user.get("name","익명")
+                current_user = sign_in(current_user)
+                st.session_state["operator_name_input"] = current_user.get("name","익명")
                 st.success("로그인 성공! 사이드바를 활성화합니다.")
                 st.rerun()
             elif auth_error in {"bad_password","admin_password_not_set"}:
@@ -229,6 +376,8 @@ def _render_login_center():
                 st.error("❌ 등록되지 않은 계정입니다. '접속 승인 요청' 탭에서 신청해주세요.")
             elif auth_error == "not_approved":
                 st.error("❌ 승인 대기 중입니다. 총무 승인 후 로그인 가능합니다.")
+            elif auth_error == "rate_limited":
+                st.error("⏳ 로그인 시도가 너무 많습니다. 잠시 후 다시 시도해주세요.")
             else:
                 st.error("❌ 로그인 실패")
 
@@ -274,7 +423,8 @@ def _render_login_center():
 
 # ── 메인 사이드바 ─────────────────────────────────────────────────────────────
 def render_sidebar(ai_available: bool):
-    current_user = st.session_state.get("current_user")
+    # 세션에 캐시된 권한을 주기적으로 재검증 (정지/권한 변경 반영)
+    current_user = revalidate_current_user()
     if not current_user:
         st.markdown("""
             <style>[data-testid="stSidebar"] {display: none;}</style>
@@ -287,7 +437,7 @@ def render_sidebar(ai_available: bool):
         st.success(f"✅ 로그인: {current_user.get('name')} ({current_user.get('student_id')})")
 
         if st.button("로그아웃"):
-            st.session_state.pop("current_user", None)
+            sign_out()
             st.rerun()
 
         if current_user.get("role") in PRIVILEGED_ROLES:
@@ -295,6 +445,11 @@ def render_sidebar(ai_available: bool):
             _render_user_approval_manager()
             _render_user_management_panel()
             _render_audit_log_sidebar()
+            _render_db_pool_panel()
+            _render_performance_panel()
+            _render_reconcile_panel(current_user)
+            _render_integrity_panel()
+            _render_period_close_panel(current_user)
 
         st.markdown("---")
         st.subheader("🏷️ 프로젝트 생성")
@@ -323,7 +478,12 @@ def render_sidebar(ai_available: bool):
         # 데이터프레임을 리스트 튜플로 변환
         project_list = list(df_projects.itertuples(index=False, name=None))
         project_dict = {name: pid for pid, name in project_list}
-        selected_project_name = st.selectbox("현재 관리 중인 행사", list(project_dict.keys()))
+        # 통합 검색 결과에서 행사로 이동할 때 key로 선택을 바꿈 (삭제된 행사면 초기화)
+        if st.session_state.get("current_project_name") not in project_dict:
+            st.session_state.pop("current_project_name", None)
+        selected_project_name = st.selectbox(
+            "현재 관리 중인 행사", list(project_dict.keys()), key="current_project_name"
+        )
         current_project_id    = project_dict[selected_project_name]
 
         _render_admin_archive_ui(current_user, current_project_id)
@@ -332,7 +492,8 @@ def render_sidebar(ai_available: bool):
         st.markdown("---")
         st.subheader("🧾 프로젝트 추출")
 
-        single_bytes = _build_project_excel(current_project_id, selected_project_name)
+        with profiler.section("export_excel"):
+            single_bytes = _build_project_excel(current_project_id, selected_project_name)
         st.download_button(
             "📥 단일 프로젝트 추출 (Excel)",
             data=single_bytes,
@@ -340,7 +501,8 @@ def render_sidebar(ai_available: bool):
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         )
 
-        all_zip = _build_all_projects_zip(project_list)
+        with profiler.section("export_zip"):
+            all_zip = _build_all_projects_zip(project_list)
         st.download_button(
             "📦 전체 프로젝트 추출 (ZIP)",
             data=all_zip,
@@ -0,0 +1,91 @@
+# sql_compat.py
+"""
+T-SQL → SQLite 변환 (로컬 대체 DB용)
+- 운영은 Azure SQL 그대로. SQLite URL로 붙었을 때만 run_query가 변환해서 실행
+- 벤치마크/로컬 개발에서 쓰는 조회·기록 경로만 대상 (init_db의 DDL 배치는 대상 아님)
+    ISNULL → IFNULL, GETDATE() → CURRENT_TIMESTAMP, N'...' → '...'
+    CONCAT(a, b) → (IFNULL(a,'') || IFNULL(b,''))   (SQLite 3.44 미만 대비)
+    SELECT TOP (n) ... → SELECT ... LIMIT n
+    OUTPUT INSERTED.x / DELETED.x → RETURNING x
+    sys.objects + OBJECT_ID 테이블 존재 확인 → sqlite_master
+    WITH (UPDLOCK, HOLDLOCK) 같은 테이블 잠금 힌트 → 제거 (SQLite는 쓰기가 DB 단위로 직렬화)
+"""
+
+import re
+from functools import lru_cache
+
+_ISNULL = re.compile(r"\bISNULL\s*\(", re.IGNORECASE)
+_GETDATE = re.compile(r"\bGETDATE\s*\(\s*\)", re.IGNORECASE)
+_NATIONAL = re.compile(r"(?<![\w'])N'")
+_TOP = re.compile(r"\bSELECT\s+TOP\s*\(\s*([:\w]+)\s*\)", re.IGNORECASE)
+_OUTPUT = re.compile(
+    r"\s+OUTPUT\s+((?:INSERTED|DELETED)\.\w+(?:\s*,\s*(?:INSERTED|DELETED)\.\w+)*)",
+    re.IGNORECASE,
+)
+_OUTPUT_PREFIX = re.compile(r"\b(?:INSERTED|DELETED)\.", re.IGNORECASE)
+_TABLE_EXISTS = re.compile(
+    r"FROM\s+sys\.objects\s+WHERE\s+object_id\s*=\s*OBJECT_ID\(\s*(:\w+)\s*\)\s+AND\s+type\s*=\s*'U'",
+    re.IGNORECASE,
+)
+_CONCAT = re.compile(r"\bCONCAT\s*\(", re.IGNORECASE)
+_LOCK_HINT = re.compile(
+    r"\s+WITH\s*\(\s*(?:UPDLOCK|HOLDLOCK|ROWLOCK|NOLOCK|READPAST)(?:\s*,\s*(?:UPDLOCK|HOLDLOCK|ROWLOCK|NOLOCK|READPAST))*\s*\)",
+    re.IGNORECASE,
+)
+
+
+def _split_args(body: str) -> list:
+    """괄호/문자열 안의 쉼표는 무시하고 최상위 인자만 분리."""
+    args, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(body):
+        if ch == "'":
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            args.append(body[start:i].strip())
+            start = i + 1
+    args.append(body[start:].strip())
+    return args
+
+
+def _rewrite_concat(sql: str) -> str:
+    while (match := _CONCAT.search(sql)):
+        depth, end, quoted = 1, match.end(), False
+        while depth:
+            ch = sql[end]
+            if ch == "'":
+                quoted = not quoted
+            elif not quoted:
+                depth += {"(": 1, ")": -1}.get(ch, 0)
+            end += 1
+        args = _split_args(sql[match.end():end - 1])
+        joined = " || ".join(arg if arg.startswith("'") else f"IFNULL({arg}, '')" for arg in args)
+        sql = f"{sql[:match.start()]}({joined}){sql[end:]}"
+    return sql
+
+
+@lru_cache(maxsize=512)
+def to_sqlite(sql: str) -> str:
+    out = _ISNULL.sub("IFNULL(", sql)
+    out = _GETDATE.sub("CURRENT_TIMESTAMP", out)
+    out = _NATIONAL.sub("'", out)
+    out = _LOCK_HINT.sub("", out)
+    out = _TABLE_EXISTS.sub(r"FROM sqlite_master WHERE type = 'table' AND name = \1", out)
+    out = _rewrite_concat(out)
+
+    suffix = []
+    if (output := _OUTPUT.search(out)):
+        out = out[:output.start()] + out[output.end():]
+        suffix.append("RETURNING " + _OUTPUT_PREFIX.sub("", output.group(1)))
+    if (top := _TOP.search(out)):
+        out = out[:top.start()] + "SELECT" + out[top.end():]
+        suffix.insert(0, f"LIMIT {top.group(1)}")
+
+    if suffix:
+        out = out.rstrip().rstrip(";") + "\n" + " ".join(suffix)
+    return out
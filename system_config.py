@@ -0,0 +1,97 @@
+# system_config.py
+"""
+system_config 테이블 캐시 서비스
+- 프로세스 단위 캐시 + 짧은 TTL → 일반적인 rerun에서는 설정 조회 쿼리 0회
+- 값 변경(set_system_config) 시 즉시 무효화
+- status(LOCKED/NORMAL) 외 전역 설정도 타입 변환 getter로 제공
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+
+from db import run_query
+
+CONFIG_TTL_SECONDS = 30
+
+_cache = {"config": None, "loaded_at": 0.0}
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class SystemConfig:
+    values: dict = field(default_factory=dict)
+
+    @property
+    def status(self) -> str:
+        return self.values.get("status") or "NORMAL"
+
+    @property
+    def is_locked(self) -> bool:
+        return self.status == "LOCKED"
+
+    def get(self, key: str, default=None):
+        value = self.values.get(key)
+        return default if value is None else value
+
+    def get_int(self, key: str, default: int = 0) -> int:
+        try:
+            return int(self.values[key])
+        except (KeyError, TypeError, ValueError):
+            return default
+
+    def get_float(self, key: str, default: float = 0.0) -> float:
+        try:
+            return float(self.values[key])
+        except (KeyError, TypeError, ValueError):
+            return default
+
+    def get_bool(self, key: str, default: bool = False) -> bool:
+        value = self.values.get(key)
+        if value is None:
+            return default
+        return str(value).strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _load() -> SystemConfig:
+    df = run_query("SELECT [key], [value] FROM system_config", fetch=True)
+    if df is None:
+        return None
+    return SystemConfig(dict(zip(df["key"], df["value"])))
+
+
+def get_system_config() -> SystemConfig:
+    now = time.monotonic()
+    with _lock:
+        config = _cache["config"]
+        if config is not None and now - _cache["loaded_at"] < CONFIG_TTL_SECONDS:
+            return config
+
+    loaded = _load()
+    if loaded is None:
+        # 조회 실패는 캐시하지 않음 (기존과 동일하게 NORMAL 취급)
+        return config or SystemConfig()
+
+    with _lock:
+        _cache["config"] = loaded
+        _cache["loaded_at"] = time.monotonic()
+    return loaded
+
+
+def invalidate_system_config():
+    with _lock:
+        _cache["config"] = None
+        _cache["loaded_at"] = 0.0
+
+
+def set_system_config(key: str, value: str):
+    run_query(
+        """
+        IF EXISTS (SELECT 1 FROM system_config WHERE [key] = :key)
+            UPDATE system_config SET [value] = :value WHERE [key] = :key
+        ELSE
+            INSERT INTO system_config ([key], [value]) VALUES (:key, :value)
+        """,
+        {"key": key, "value": value},
+    )
+    invalidate_system_config()
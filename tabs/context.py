@@ -0,0 +1,177 @@
+# tabs/context.py
+"""
+탭 렌더링 공용 컨텍스트
+- ProjectSnapshot: 한 번의 rerun 동안 공유하는 프로젝트 데이터 (예산/학생회비/지출, 접근 시 조회)
+                   원본 행은 project_cache의 디스크 스냅샷에서 (바뀐 행만 DB에서 조회)
+                   합계 KPI는 복식부기 장부 집계(accounting.reports)에서 가져옴 (전체 대사 통과 후)
+                   지출 이상 징후(anomaly.detect)는 프로젝트별 캐시
+- RenderContext:   프로젝트/사용자/AI 상태 + 스냅샷을 묶어 탭에 넘기는 단일 객체
+"""
+
+from dataclasses import dataclass
+from functools import cached_property
+
+import pandas as pd
+import streamlit as st
+
+import anomaly
+import project_cache
+from accounting.reconcile import journal_trusted
+from accounting.reports import project_kpis
+
+MEMBER_COLUMNS  = {"paid_date": "납부일", "name": "이름", "student_id": "학번", "deposit_amount": "납부액", "note": "비고"}
+EXPENSE_COLUMNS = {"date": "날짜", "category": "분류", "item": "내역", "amount": "금액"}
+
+
+def _frame(df, columns) -> pd.DataFrame:
+    if df is None or df.empty:
+        return pd.DataFrame(columns=columns)
+    return df
+
+
+@st.cache_data(show_spinner=False)
+def _fetch_budget_entries(project_id: int) -> pd.DataFrame:
+    # run_query 쓰기 시 st.cache_data가 비워지므로 항상 최신 (디스크 캐시는 project_cache가 증분 갱신)
+    return _frame(project_cache.load(project_id, "budget_entries"), project_cache.TABLES["budget_entries"]["columns"])
+
+
+@st.cache_data(show_spinner=False)
+def _fetch_members(project_id: int) -> pd.DataFrame:
+    return _frame(project_cache.load(project_id, "members"), project_cache.TABLES["members"]["columns"])
+
+
+@st.cache_data(show_spinner=False)
+def _fetch_expenses(project_id: int) -> pd.DataFrame:
+    return _frame(project_cache.load(project_id, "expenses"), project_cache.TABLES["expenses"]["columns"])
+
+
+@st.cache_data(show_spinner=False)
+def _detect_anomalies(project_id: int, settings: tuple) -> pd.DataFrame:
+    # _fetch_expenses와 같이 쓰기 시 비워짐. 기준 금액 설정이 바뀌면 키가 달라짐
+    thresholds, clock_offset_hours = settings
+    return anomaly.detect(_fetch_expenses(project_id), thresholds, clock_offset_hours)
+
+
+class ProjectSnapshot:
+    """
+    프레임은 처음 접근할 때 조회 (lazy).
+    선택된 화면이 쓰는 테이블만 불러오고, 같은 rerun 안에서는 재사용.
+    """
+
+    def __init__(self, project_id: int):
+        self.project_id = project_id
+
+    @cached_property
+    def budget_entries(self) -> pd.DataFrame:
+        return _fetch_budget_entries(self.project_id)
+
+    @cached_property
+    def members(self) -> pd.DataFrame:
+        return _fetch_members(self.project_id)
+
+    @cached_property
+    def expenses(self) -> pd.DataFrame:
+        return _fetch_expenses(self.project_id)
+
+    @cached_property
+    def financials(self):
+        """
+        장부(journal_lines) 기반 KPI. 전표가 없는 예전 프로젝트, 아직 전체 대사를 통과하지 않았거나
+        미해결 불일치가 있는 프로젝트는 None → 원본 테이블로 계산.
+        """
+        if not journal_trusted(self.project_id):
+            return None
+        return project_kpis(self.project_id)
+
+    @cached_property
+    def school_budget_total(self) -> int:
+        if self.financials is not None:
+            return self.financials.school_budget
+        df = self.budget_entries
+        return int(df.loc[df["source_type"] == "school_budget", "amount"].sum())
+
+    @cached_property
+    def reserve_total(self) -> int:
+        if self.financials is not None:
+            return self.financials.reserve
+        df = self.budget_entries
+        return int(df.loc[df["source_type"].isin(["reserve_fund", "reserve_recovery"]), "amount"].sum())
+
+    @cached_property
+    def total_student_dues(self) -> int:
+        if self.financials is not None:
+            return self.financials.student_dues
+        return int(self.members["deposit_amount"].sum())
+
+    @cached_property
+    def total_budget(self) -> int:
+        # 현금 계정(11xx) 유입 합계와 같음
+        return self.school_budget_total + self.reserve_total + self.total_student_dues
+
+    @cached_property
+    def total_expense(self) -> int:
+        if self.financials is not None:
+            return self.financials.cash_out
+        return int(self.expenses["amount"].sum())
+
+    @cached_property
+    def members_display(self) -> pd.DataFrame:
+        return self.members.rename(columns=MEMBER_COLUMNS)[list(MEMBER_COLUMNS.values())]
+
+    @cached_property
+    def expenses_display(self) -> pd.DataFrame:
+        return self.expenses.rename(columns=EXPENSE_COLUMNS)[list(EXPENSE_COLUMNS.values())]
+
+    @cached_property
+    def anomalies(self) -> pd.DataFrame:
+        return _detect_anomalies(self.project_id, anomaly.settings())
+
+    @cached_property
+    def ledger(self) -> pd.DataFrame:
+        """db.get_ledger와 같은 모양 (수입=budget_entries, 지출=expenses)."""
+        b = self.budget_entries
+        income = pd.DataFrame({
+            "transaction_date": b["entry_date"],
+            "recorded_at": b["created_at"],
+            "type": "수입",
+            "description": [
+                f"{name} 회비" if src == "student_dues" else f"{name or ''} {note or ''}"
+                for src, name, note in zip(b["source_type"], b["contributor_name"], b["note"])
+            ],
+            "amount": b["amount"],
+        })
+        e = self.expenses
+        expense = pd.DataFrame({
+            "transaction_date": e["date"],
+            "recorded_at": e["created_at"],
+            "type": "지출",
+            "description": [f"{item} ({cat or '기타'})" for item, cat in zip(e["item"], e["category"])],
+            "amount": -e["amount"],
+        })
+        frames = [df for df in (income, expense) if not df.empty]
+        if not frames:
+            return pd.DataFrame(columns=["transaction_date", "recorded_at", "type", "description", "amount"])
+        ledger = pd.concat(frames, ignore_index=True)
+        return ledger.sort_values(["transaction_date", "recorded_at"], kind="stable").reset_index(drop=True)
+
+
+def load_project_snapshot(project_id: int) -> ProjectSnapshot:
+    return ProjectSnapshot(project_id)
+
+
+@dataclass
+class RenderContext:
+    project_id: int
+    project_name: str
+    current_user: dict
+    snapshot: ProjectSnapshot
+    ai_client: object = None
+    ai_available: bool = False
+
+    @property
+    def user_role(self) -> str:
+        return self.current_user.get("role")
+
+    @property
+    def operator_name(self) -> str:
+        return self.current_user.get("name", st.session_state.get("operator_name_input", "익명"))
@@ -0,0 +1,47 @@
+# tabs/registry.py
+"""
+탭 플러그인 레지스트리
+- 각 탭 모듈이 @register_tab(...)으로 자신을 등록
+- 렌더 함수 시그니처는 항상 render(ctx: RenderContext) -> None
+"""
+
+from dataclasses import dataclass
+from importlib import import_module
+from typing import Callable
+
+from tabs.context import RenderContext
+
+TAB_MODULES = (
+    "tabs.tab_budget",
+    "tabs.tab_expense",
+    "tabs.tab_summary",
+    "tabs.tab_ledger",
+    "tabs.tab_overview",
+    "tabs.tab_search",
+)
+
+
+@dataclass(frozen=True)
+class TabSpec:
+    key: str
+    label: str
+    order: int
+    render: Callable[[RenderContext], None]
+
+
+_REGISTRY: dict[str, TabSpec] = {}
+
+
+def register_tab(key: str, label: str, order: int):
+    def decorator(fn: Callable[[RenderContext], None]):
+        if key in _REGISTRY and _REGISTRY[key].render is not fn:
+            raise ValueError(f"이미 등록된 탭 키입니다: {key}")
+        _REGISTRY[key] = TabSpec(key=key, label=label, order=order, render=fn)
+        return fn
+    return decorator
+
+
+def load_tabs() -> list[TabSpec]:
+    for module_name in TAB_MODULES:
+        import_module(module_name)
+    return sorted(_REGISTRY.values(), key=lambda spec: spec.order)
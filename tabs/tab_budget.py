@@ -1,10 +1,13 @@
 import datetime
-import pandas as pd
 import streamlit as st
 
+import idempotency
 from audit import log_action
-from db import run_query
-from accounting.service import record_income_entry
+from accounting.periods import PeriodClosedError, closed_write_message, locked_message
+from accounting.service import delete_row, record_income_entry, update_row
+from principal import has_permission
+from tabs.context import RenderContext
+from tabs.registry import register_tab
 
 INCOME_TYPE_LABELS = {
     "school_budget": "학교/학과 지원금",
@@ -18,6 +21,12 @@ def _to_int_amount(value) -> int:
     except Exception:
         return 0
 
+def _budget_fingerprint(project_id, tx_date, amount, source_type, name, extra_label) -> str:
+    return idempotency.fingerprint(project_id, tx_date, amount, source_type, name, extra_label)
+
+def _member_fingerprint(project_id, tx_date, amount, name, student_id) -> str:
+    return idempotency.fingerprint(project_id, tx_date, amount, name, student_id)
+
 def _compose_type_label(source_type: str, extra_label: str) -> str:
     base = INCOME_TYPE_LABELS.get(source_type, source_type)
     extra = (extra_label or "").strip()
@@ -26,12 +35,13 @@ def _compose_type_label(source_type: str, extra_label: str) -> str:
     return f"{base} - {extra}"
 
 def _can_edit(current_user: dict) -> bool:
-    perms = current_user.get("permissions", [])
-    return "can_edit" in perms or current_user.get("role") in {"treasurer", "admin"}
+    return has_permission(current_user, "can_edit")
 
-def render_budget_tab(current_project_id: int, current_user: dict = None, **kwargs):
-    current_user = current_user or {}
-    can_edit = _can_edit(current_user)
+@register_tab("budget", "💰 예산 조성 (수입)", order=10)
+def render_budget_tab(ctx: RenderContext):
+    current_project_id = ctx.project_id
+    snapshot = ctx.snapshot
+    can_edit = _can_edit(ctx.current_user)
 
     st.subheader("1️⃣ 예산/예비비 입력")
     col_budget_form, col_budget_table = st.columns([1, 2])
@@ -58,41 +68,40 @@ def render_budget_tab(current_project_id: int, current_user: dict = None, **kwar
                 st.warning("입금자/담당자 이름을 입력해주세요.")
             elif amount <= 0:
                 st.warning("금액은 0원보다 커야 합니다.")
+            elif (locked := locked_message(income_date)):
+                st.error(locked)
             else:
                 tx_date = income_date.strftime("%Y-%m-%d")
                 amount_i = _to_int_amount(amount)
-                run_query(
-                    """
-                    INSERT INTO budget_entries
-                    (project_id, entry_date, source_type, contributor_name, amount, note, extra_label)
-                    VALUES (:pid, :date, :type, :name, :amount, :note, :extra)
-                    """,
-                    {"pid": current_project_id, "date": tx_date, "type": income_type,
-                     "name": contributor_name.strip(), "amount": amount_i,
-                     "note": note.strip(), "extra": extra_label.strip()}
-                )
-                record_income_entry(
-                    project_id=current_project_id, tx_date=tx_date,
-                    source_type=income_type, actor_name=contributor_name.strip(),
-                    amount=amount_i, note=note.strip(), extra_label=extra_label.strip(),
-                )
-                log_action("예산 수입 등록", f"{income_date} / {_compose_type_label(income_type, extra_label)} / {contributor_name} / {int(amount):,}원")
-                st.success("예산/예비비 항목을 등록했어요.")
-                st.rerun()
+                try:
+                    # 행 등록과 전표를 한 트랜잭션으로 (전표가 실패하면 행도 남지 않음)
+                    outcome = idempotency.submit_once(
+                        f"budget_{current_project_id}", "budget_entries",
+                        {"project_id": current_project_id, "entry_date": tx_date, "source_type": income_type,
+                         "contributor_name": contributor_name.strip(), "amount": amount_i,
+                         "note": note.strip(), "extra_label": extra_label.strip()},
+                        _budget_fingerprint(current_project_id, tx_date, amount_i, income_type, contributor_name, extra_label),
+                        post=lambda tx, row_id: record_income_entry(
+                            project_id=current_project_id, tx_date=tx_date,
+                            source_type=income_type, actor_name=contributor_name.strip(),
+                            amount=amount_i, note=note.strip(), extra_label=extra_label.strip(),
+                            source_id=row_id, tx=tx,
+                        ),
+                    )
+                except PeriodClosedError:
+                    st.error(closed_write_message(income_date))
+                else:
+                    if not outcome.inserted:
+                        idempotency.show_rejection(outcome, "예산 항목 등록")
+                    else:
+                        log_action("예산 수입 등록", f"{income_date} / {_compose_type_label(income_type, extra_label)} / {contributor_name} / {int(amount):,}원")
+                        st.success("예산/예비비 항목을 등록했어요.")
+                        st.rerun()
 
     with col_budget_table:
-        df_budget_raw = run_query(
-            """
-            SELECT id, entry_date, source_type, contributor_name, amount, note,
-                   COALESCE(extra_label,'') AS extra_label
-            FROM budget_entries
-            WHERE project_id = :pid
-            ORDER BY entry_date DESC, id DESC
-            """,
-            {"pid": current_project_id}, fetch=True,
-        )
+        df_budget_raw = snapshot.budget_entries
 
-        if df_budget_raw is not None and not df_budget_raw.empty:
+        if not df_budget_raw.empty:
             df_budget = df_budget_raw.copy()
             df_budget["구분"] = df_budget.apply(
                 lambda r: _compose_type_label(str(r["source_type"]), str(r["extra_label"])), axis=1
@@ -112,6 +121,9 @@ def render_budget_tab(current_project_id: int, current_user: dict = None, **kwar
                     selected_idx = st.selectbox("수정할 항목 선택", range(len(labels)),
                                                 format_func=lambda i: labels[i], key="budget_edit_select")
                     sel = df_budget_raw.iloc[selected_idx]
+                    sel_locked = locked_message(sel["entry_date"])
+                    if sel_locked:
+                        st.info(sel_locked)
 
                     col_edit, col_del = st.columns([3, 1])
                     with col_edit:
@@ -128,43 +140,57 @@ def render_budget_tab(current_project_id: int, current_user: dict = None, **kwar
                             e_name = st.text_input("입금자", value=sel["contributor_name"])
                             e_amount = st.number_input("금액", min_value=0, step=1000, value=int(sel["amount"]))
                             e_note = st.text_input("비고", value=sel["note"] or "")
-                            save_btn = st.form_submit_button("💾 수정 저장")
+                            save_btn = st.form_submit_button("💾 수정 저장", disabled=bool(sel_locked))
 
-                        if save_btn:
-                            run_query(
-                                """
-                                UPDATE budget_entries
-                                SET entry_date=:date, source_type=:type, contributor_name=:name,
-                                    amount=:amount, note=:note, extra_label=:extra
-                                WHERE id=:id
-                                """,
-                                {"date": e_date.strftime("%Y-%m-%d"), "type": e_type,
-                                 "name": e_name.strip(), "amount": int(e_amount),
-                                 "note": e_note.strip(), "extra": e_extra.strip(), "id": int(sel["id"])}
-                            )
-                            log_action("예산 항목 수정", f"ID {sel['id']} / {e_name} / {int(e_amount):,}원")
-                            st.success("수정됐어!")
-                            st.rerun()
+                        if save_btn and (locked := locked_message(e_date)):
+                            st.error(locked)
+                        elif save_btn:
+                            try:
+                                saved = update_row("budget_entries", int(sel["id"]), f"""
+                                    UPDATE budget_entries
+                                    SET entry_date=:date, source_type=:type, contributor_name=:name,
+                                        amount=:amount, note=:note, extra_label=:extra, updated_at=GETDATE(),
+                                        {idempotency.fingerprint_assignment("budget_entries")}
+                                    WHERE id=:id
+                                    """,
+                                    {"date": e_date.strftime("%Y-%m-%d"), "type": e_type,
+                                     "name": e_name.strip(), "amount": int(e_amount),
+                                     "note": e_note.strip(), "extra": e_extra.strip(), "id": int(sel["id"]),
+                                     "fingerprint": _budget_fingerprint(
+                                         current_project_id, e_date.strftime("%Y-%m-%d"), int(e_amount), e_type, e_name, e_extra)},
+                                    e_name.strip(),
+                                )
+                            except PeriodClosedError:
+                                st.error(closed_write_message(sel["entry_date"], e_date))
+                            else:
+                                if saved:
+                                    log_action("예산 항목 수정", f"ID {sel['id']} / {e_name} / {int(e_amount):,}원")
+                                    st.success("수정됐어!")
+                                    st.rerun()
 
                     with col_del:
                         st.markdown("<br><br><br><br><br><br><br><br><br><br>", unsafe_allow_html=True)
-                        if st.button("🗑️ 삭제", key="budget_delete_btn", type="primary"):
+                        if st.button("🗑️ 삭제", key="budget_delete_btn", type="primary", disabled=bool(sel_locked)):
                             st.session_state["budget_delete_confirm"] = int(sel["id"])
 
                     if st.session_state.get("budget_delete_confirm") == int(sel["id"]):
                         st.warning(f"⚠️ '{sel['contributor_name']} / {sel['amount']:,}원' 정말 삭제할까?")
                         c1, c2 = st.columns(2)
                         if c1.button("✅ 확인 삭제", key="budget_delete_yes"):
-                            run_query("DELETE FROM budget_entries WHERE id=:id", {"id": int(sel["id"])})
-                            log_action("예산 항목 삭제", f"ID {sel['id']} / {sel['contributor_name']} / {sel['amount']:,}원")
-                            st.session_state.pop("budget_delete_confirm", None)
-                            st.success("삭제됐어!")
-                            st.rerun()
+                            try:
+                                deleted = delete_row("budget_entries", int(sel["id"]), ctx.operator_name)
+                            except PeriodClosedError:
+                                st.error(closed_write_message(sel["entry_date"]))
+                            else:
+                                if deleted:
+                                    log_action("예산 항목 삭제", f"ID {sel['id']} / {sel['contributor_name']} / {sel['amount']:,}원")
+                                    st.session_state.pop("budget_delete_confirm", None)
+                                    st.success("삭제됐어!")
+                                    st.rerun()
                         if c2.button("❌ 취소", key="budget_delete_no"):
                             st.session_state.pop("budget_delete_confirm", None)
                             st.rerun()
         else:
-            df_budget_raw = pd.DataFrame()
             st.info("아직 등록된 예산/예비비가 없습니다.")
 
     st.divider()
@@ -185,44 +211,39 @@ def render_budget_tab(current_project_id: int, current_user: dict = None, **kwar
                 st.warning("이름을 입력해주세요.")
             elif m_amt <= 0:
                 st.warning("납부액은 0원보다 커야 합니다.")
+            elif (locked := locked_message(paid_date)):
+                st.error(locked)
             else:
                 tx_date = paid_date.strftime("%Y-%m-%d")
                 amount_i = _to_int_amount(m_amt)
-                run_query(
-                    """
-                    INSERT INTO members (project_id, name, student_id, deposit_amount, paid_date, note)
-                    VALUES (:pid, :name, :sid, :amount, :date, :note)
-                    """,
-                    {"pid": current_project_id, "name": m_name.strip(), "sid": m_sid.strip(),
-                     "amount": amount_i, "date": tx_date, "note": m_note.strip()}
-                )
-                record_income_entry(
-                    project_id=current_project_id, tx_date=tx_date,
-                    source_type="student_dues", actor_name=m_name.strip(),
-                    amount=amount_i, note=m_note.strip(), extra_label="",
-                )
-                log_action("학생회비 등록", f"{paid_date} / {m_name}({m_sid}) / {int(m_amt):,}원")
-                st.success("학생회비를 등록했어요.")
-                st.rerun()
+                try:
+                    outcome = idempotency.submit_once(
+                        f"member_{current_project_id}", "members",
+                        {"project_id": current_project_id, "name": m_name.strip(), "student_id": m_sid.strip(),
+                         "deposit_amount": amount_i, "paid_date": tx_date, "note": m_note.strip()},
+                        _member_fingerprint(current_project_id, tx_date, amount_i, m_name, m_sid),
+                        post=lambda tx, row_id: record_income_entry(
+                            project_id=current_project_id, tx_date=tx_date,
+                            source_type="student_dues", actor_name=m_name.strip(),
+                            amount=amount_i, note=m_note.strip(), extra_label="",
+                            source_id=row_id, tx=tx,
+                        ),
+                    )
+                except PeriodClosedError:
+                    st.error(closed_write_message(paid_date))
+                else:
+                    if not outcome.inserted:
+                        idempotency.show_rejection(outcome, "학생회비 등록")
+                    else:
+                        log_action("학생회비 등록", f"{paid_date} / {m_name}({m_sid}) / {int(m_amt):,}원")
+                        st.success("학생회비를 등록했어요.")
+                        st.rerun()
 
     with col_member_table:
-        df_members_raw = run_query(
-            """
-            SELECT id, paid_date, name, student_id, deposit_amount, note
-            FROM members
-            WHERE project_id = :pid
-            ORDER BY paid_date DESC, id DESC
-            """,
-            {"pid": current_project_id}, fetch=True,
-        )
+        df_members_raw = snapshot.members
 
-        if df_members_raw is not None and not df_members_raw.empty:
-            df_members = df_members_raw.rename(columns={
-                "paid_date": "납부일", "name": "이름", "student_id": "학번",
-                "deposit_amount": "납부액", "note": "비고"
-            })
-            st.dataframe(df_members[["납부일", "이름", "학번", "납부액", "비고"]], use_container_width=True, hide_index=True)
-            total_student_dues = int(df_members["납부액"].sum())
+        if not df_members_raw.empty:
+            st.dataframe(snapshot.members_display, use_container_width=True, hide_index=True)
 
             if can_edit:
                 with st.expander("✏️ 학생회비 항목 수정/삭제"):
@@ -233,6 +254,9 @@ def render_budget_tab(current_project_id: int, current_user: dict = None, **kwar
                     m_sel_idx = st.selectbox("수정할 항목 선택", range(len(m_labels)),
                                              format_func=lambda i: m_labels[i], key="member_edit_select")
                     m_sel = df_members_raw.iloc[m_sel_idx]
+                    m_sel_locked = locked_message(m_sel["paid_date"])
+                    if m_sel_locked:
+                        st.info(m_sel_locked)
 
                     col_medit, col_mdel = st.columns([3, 1])
                     with col_medit:
@@ -242,64 +266,62 @@ def render_budget_tab(current_project_id: int, current_user: dict = None, **kwar
                             me_sid = st.text_input("학번", value=m_sel["student_id"] or "")
                             me_amt = st.number_input("납부액", min_value=0, step=1000, value=int(m_sel["deposit_amount"]))
                             me_note = st.text_input("비고", value=m_sel["note"] or "")
-                            m_save_btn = st.form_submit_button("💾 수정 저장")
+                            m_save_btn = st.form_submit_button("💾 수정 저장", disabled=bool(m_sel_locked))
 
-                        if m_save_btn:
-                            run_query(
-                                """
-                                UPDATE members
-                                SET paid_date=:date, name=:name, student_id=:sid,
-                                    deposit_amount=:amount, note=:note
-                                WHERE id=:id
-                                """,
-                                {"date": me_date.strftime("%Y-%m-%d"), "name": me_name.strip(),
-                                 "sid": me_sid.strip(), "amount": int(me_amt),
-                                 "note": me_note.strip(), "id": int(m_sel["id"])}
-                            )
-                            log_action("학생회비 수정", f"ID {m_sel['id']} / {me_name} / {int(me_amt):,}원")
-                            st.success("수정됐어!")
-                            st.rerun()
+                        if m_save_btn and (locked := locked_message(me_date)):
+                            st.error(locked)
+                        elif m_save_btn:
+                            try:
+                                saved = update_row("members", int(m_sel["id"]), f"""
+                                    UPDATE members
+                                    SET paid_date=:date, name=:name, student_id=:sid,
+                                        deposit_amount=:amount, note=:note, updated_at=GETDATE(),
+                                        {idempotency.fingerprint_assignment("members")}
+                                    WHERE id=:id
+                                    """,
+                                    {"date": me_date.strftime("%Y-%m-%d"), "name": me_name.strip(),
+                                     "sid": me_sid.strip(), "amount": int(me_amt),
+                                     "note": me_note.strip(), "id": int(m_sel["id"]),
+                                     "fingerprint": _member_fingerprint(
+                                         current_project_id, me_date.strftime("%Y-%m-%d"), int(me_amt), me_name, me_sid)},
+                                    me_name.strip(),
+                                )
+                            except PeriodClosedError:
+                                st.error(closed_write_message(m_sel["paid_date"], me_date))
+                            else:
+                                if saved:
+                                    log_action("학생회비 수정", f"ID {m_sel['id']} / {me_name} / {int(me_amt):,}원")
+                                    st.success("수정됐어!")
+                                    st.rerun()
 
                     with col_mdel:
                         st.markdown("<br><br><br><br><br><br><br><br><br><br>", unsafe_allow_html=True)
-                        if st.button("🗑️ 삭제", key="member_delete_btn", type="primary"):
+                        if st.button("🗑️ 삭제", key="member_delete_btn", type="primary", disabled=bool(m_sel_locked)):
                             st.session_state["member_delete_confirm"] = int(m_sel["id"])
 
                     if st.session_state.get("member_delete_confirm") == int(m_sel["id"]):
                         st.warning(f"⚠️ '{m_sel['name']} / {m_sel['deposit_amount']:,}원' 정말 삭제할까?")
                         c1, c2 = st.columns(2)
                         if c1.button("✅ 확인 삭제", key="member_delete_yes"):
-                            run_query("DELETE FROM members WHERE id=:id", {"id": int(m_sel["id"])})
-                            log_action("학생회비 삭제", f"ID {m_sel['id']} / {m_sel['name']} / {m_sel['deposit_amount']:,}원")
-                            st.session_state.pop("member_delete_confirm", None)
-                            st.success("삭제됐어!")
-                            st.rerun()
+                            try:
+                                deleted = delete_row("members", int(m_sel["id"]), ctx.operator_name)
+                            except PeriodClosedError:
+                                st.error(closed_write_message(m_sel["paid_date"]))
+                            else:
+                                if deleted:
+                                    log_action("학생회비 삭제", f"ID {m_sel['id']} / {m_sel['name']} / {m_sel['deposit_amount']:,}원")
+                                    st.session_state.pop("member_delete_confirm", None)
+                                    st.success("삭제됐어!")
+                                    st.rerun()
                         if c2.button("❌ 취소", key="member_delete_no"):
                             st.session_state.pop("member_delete_confirm", None)
                             st.rerun()
         else:
             st.info("아직 납부자가 없습니다.")
-            df_members = pd.DataFrame(columns=["납부일", "이름", "학번", "납부액", "비고"])
-            total_student_dues = 0
-
-    df_school_raw = run_query(
-        "SELECT COALESCE(SUM(amount), 0) AS total FROM budget_entries WHERE project_id = :pid AND source_type = 'school_budget'",
-        {"pid": current_project_id}, fetch=True
-    )
-    school_budget_total = int(df_school_raw.iloc[0]["total"]) if (df_school_raw is not None and not df_school_raw.empty) else 0
-
-    df_reserve_raw = run_query(
-        "SELECT COALESCE(SUM(amount), 0) AS total FROM budget_entries WHERE project_id = :pid AND source_type IN ('reserve_fund','reserve_recovery')",
-        {"pid": current_project_id}, fetch=True
-    )
-    reserve_total = int(df_reserve_raw.iloc[0]["total"]) if (df_reserve_raw is not None and not df_reserve_raw.empty) else 0
 
     st.markdown("### 📊 총 수입 요약")
-    total_budget = school_budget_total + reserve_total + total_student_dues
     s1, s2, s3, s4 = st.columns(4)
-    s1.metric("학교/학과 지원금", f"{school_budget_total:,.0f}원")
-    s2.metric("예비비/회수 합계", f"{reserve_total:,.0f}원")
-    s3.metric("학생회비 합계", f"{total_student_dues:,.0f}원")
-    s4.metric("총 예산", f"{total_budget:,.0f}원")
-
-    return total_budget, total_student_dues, df_members
+    s1.metric("학교/학과 지원금", f"{snapshot.school_budget_total:,.0f}원")
+    s2.metric("예비비/회수 합계", f"{snapshot.reserve_total:,.0f}원")
+    s3.metric("학생회비 합계", f"{snapshot.total_student_dues:,.0f}원")
+    s4.metric("총 예산", f"{snapshot.total_budget:,.0f}원")
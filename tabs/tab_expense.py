@@ -1,15 +1,20 @@
 import datetime
-import os
-import uuid
+import hashlib
 
 import pandas as pd
 import streamlit as st
+import idempotency
 from audit import log_action
 from db import run_query
-from accounting.service import record_expense_entry
-from ai_audit import parse_receipt_image
+from accounting.periods import PeriodClosedError, closed_write_message, locked_message
+from accounting.service import delete_row, record_expense_entry, update_row
+from principal import has_permission
+from ai_audit import parse_receipt_image, parse_receipt_images, receipt_parsing_available
+from receipts.gallery import LINK_FILTERS, fetch_gallery_page, list_uploaders
+from receipts.storage import collect_orphan_blobs, read_receipt, store_receipt
+from tabs.context import EXPENSE_COLUMNS, RenderContext
+from tabs.registry import register_tab
 
-UPLOAD_DIR = "uploads"
 CATEGORIES = [
     "식비/간식", "회식비", "장소대관",
     "물품구매", "홍보비", "교통비",
@@ -17,40 +22,226 @@ CATEGORIES = [
 ]
 
 def _can_upload(current_user: dict) -> bool:
-    perms = current_user.get("permissions", [])
-    return "can_upload_receipt" in perms or current_user.get("role") in {"treasurer", "admin"}
+    return has_permission(current_user, "can_upload_receipt")
 
 def _can_edit(current_user: dict) -> bool:
-    perms = current_user.get("permissions", [])
-    return "can_edit" in perms or current_user.get("role") in {"treasurer", "admin"}
-
-def _save_image(project_id: int, file) -> tuple[str, str]:
-    folder = os.path.join(UPLOAD_DIR, f"project_{project_id}")
-    os.makedirs(folder, exist_ok=True)
-    ext = os.path.splitext(file.name)[-1].lower() or ".jpg"
-    filename = f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}{ext}"
-    filepath = os.path.join(folder, filename)
-    with open(filepath, "wb") as f:
-        f.write(file.getbuffer())
-    return filename, filepath
-
-def _register_image(project_id, expense_id, filename, filepath, description, uploaded_by):
-    run_query(
+    return has_permission(current_user, "can_edit")
+
+def _save_image(file) -> tuple[str, str, str]:
+    """content-addressed 저장소에 저장 → (원본 파일명, 로케이터, 해시). 같은 영수증은 한 번만 저장."""
+    content_hash, locator = store_receipt(file)
+    return file.name, locator, content_hash
+
+def _register_image(project_id, expense_id, filename, filepath, content_hash, description, uploaded_by, tx=None):
+    (tx.query if tx is not None else run_query)(
         """
         INSERT INTO receipt_images
-        (project_id, expense_id, filename, filepath, description, uploaded_by)
-        VALUES (:pid, :eid, :fname, :fpath, :desc, :user)
+        (project_id, expense_id, filename, filepath, content_hash, description, uploaded_by)
+        VALUES (:pid, :eid, :fname, :fpath, :hash, :desc, :user)
         """,
         {"pid": project_id, "eid": expense_id, "fname": filename,
-         "fpath": filepath, "desc": description, "user": uploaded_by}
+         "fpath": filepath, "hash": content_hash, "desc": description, "user": uploaded_by}
+    )
+
+def _add_expense(project_id, tx_date, item, category, amount_i, file, description, operator, scope) -> idempotency.InsertOutcome:
+    """
+    지출 1건 등록 (중복 제출 차단 → 영수증 첨부 → 분개). file이 None이면 첨부 없음.
+    행/영수증 연결/전표는 한 트랜잭션 → 마감된 기간이면 PeriodClosedError로 아무것도 안 남음.
+    blob은 먼저 저장 (등록이 취소되면 참조 없는 blob은 GC가 정리).
+    """
+    image = _save_image(file) if file is not None else None
+
+    def post(tx, expense_id):
+        if image is not None:
+            filename, filepath, content_hash = image
+            _register_image(project_id, expense_id, filename, filepath, content_hash, description.strip(), operator, tx=tx)
+        record_expense_entry(
+            project_id=project_id, tx_date=tx_date,
+            category=category, item=item.strip(),
+            amount=amount_i, actor_name=operator, source_id=expense_id, tx=tx,
+        )
+
+    # 제출 토큰/내용 지문으로 더블클릭·재전송 중복 차단 (idempotency.py)
+    outcome = idempotency.submit_once(
+        scope, "expenses",
+        {
+            "project_id": project_id,
+            "date": tx_date,
+            "item": item.strip(),
+            "amount": amount_i,
+            "category": category,
+        },
+        idempotency.fingerprint(project_id, tx_date, amount_i, item),
+        post=post,
+    )
+    if outcome.inserted:
+        log_action("지출 등록", f"{tx_date} / {item} / {amount_i:,}원 / {category}")
+    return outcome
+
+def _render_batch_upload(current_project_id: int, operator: str, ai_client):
+    """영수증 여러 장 → 한꺼번에 자동 읽기(프로세스 풀) → 표에서 고친 뒤 선택한 것만 등록."""
+    files = st.file_uploader(
+        "이미지 여러 장 업로드 (jpg/png/webp)",
+        type=["jpg", "jpeg", "png", "webp"],
+        accept_multiple_files=True,
+        key=f"receipt_batch_upload_{current_project_id}",
+    )
+    if not files:
+        return
+    state_key = f"receipt_batch_parsed_{current_project_id}"
+    names = [f.name for f in files]
+    if st.button(f"🤖 {len(files)}장 한꺼번에 읽기", key=f"receipt_batch_parse_btn_{current_project_id}"):
+        with st.spinner(f"영수증 {len(files)}장을 읽는 중..."):
+            st.session_state[state_key] = {"names": names, "rows": parse_receipt_images(ai_client, [f.getvalue() for f in files])}
+    batch = st.session_state.get(state_key)
+    if not batch or batch["names"] != names:
+        return
+
+    today = datetime.date.today()
+    rows = []
+    for name, parsed in zip(names, batch["rows"]):
+        try:
+            tx_date = datetime.date.fromisoformat(parsed["date"]) if parsed.get("date") else today
+        except ValueError:
+            tx_date = today
+        rows.append({
+            "등록": True, "파일": name, "날짜": tx_date, "내역": parsed.get("item", ""),
+            "분류": parsed["category"] if parsed.get("category") in CATEGORIES else "기타",
+            "금액": int(parsed.get("amount") or 0),
+        })
+    edited = st.data_editor(
+        pd.DataFrame(rows),
+        column_config={
+            "등록": st.column_config.CheckboxColumn("등록"),
+            "날짜": st.column_config.DateColumn("날짜", format="YYYY-MM-DD"),
+            "분류": st.column_config.SelectboxColumn("분류", options=CATEGORIES),
+            "금액": st.column_config.NumberColumn("금액", min_value=0, step=100),
+        },
+        disabled=["파일"], hide_index=True, use_container_width=True,
+        key=f"receipt_batch_editor_{current_project_id}",
+    )
+    if not st.button("✅ 선택 항목 등록", key=f"receipt_batch_submit_{current_project_id}"):
+        return
+
+    done, problems = 0, []
+    for file, row in zip(files, edited.to_dict("records")):
+        if not row["등록"]:
+            continue
+        item, amount_i = str(row["내역"] or "").strip(), int(row["금액"] or 0)
+        if not item or amount_i <= 0:
+            problems.append(f"{row['파일']}: 내역/금액을 입력해주세요.")
+            continue
+        if (locked := locked_message(row["날짜"])):
+            problems.append(f"{row['파일']}: {locked}")
+            continue
+        # 파일 내용별 제출 토큰 → 등록 버튼을 다시 눌러도 같은 영수증은 한 번만
+        scope = f"expense_batch_{current_project_id}_{hashlib.sha256(file.getvalue()).hexdigest()[:16]}"
+        try:
+            outcome = _add_expense(current_project_id, str(row["날짜"])[:10], item, row["분류"], amount_i,
+                                   file, "", operator, scope)
+        except PeriodClosedError:
+            problems.append(f"{row['파일']}: {closed_write_message(row['날짜'])}")
+            continue
+        if outcome.inserted:
+            done += 1
+        elif outcome.status == idempotency.DUPLICATE:
+            problems.append(f"{row['파일']}: 같은 날짜·금액·내용이 이미 있어요 (ID {outcome.row_id}). 다시 누르면 등록돼요.")
+        elif outcome.status == idempotency.RESUBMITTED:
+            problems.append(f"{row['파일']}: 이미 등록됐어요 (ID {outcome.row_id}).")
+
+    if problems:
+        st.warning("\n".join(f"- {p}" for p in problems))
+        if done:
+            st.success(f"✅ {done}건 등록되었습니다.")
+        return
+    st.session_state.pop(state_key, None)
+    st.success(f"✅ {done}건 등록되었습니다.")
+    st.rerun()
+
+def _gallery_key(suffix, project_id): return f"gallery_{suffix}_{project_id}"
+
+def _render_gallery(current_project_id: int, current_user: dict):
+    st.subheader("🖼️ 프로젝트 이미지 갤러리")
+
+    # 탭을 열기 전에는 이미지/쿼리를 전혀 불러오지 않음
+    open_key = _gallery_key("open", current_project_id)
+    if not st.session_state.get(open_key):
+        if st.button("🖼️ 갤러리 불러오기", key=f"gallery_open_btn_{current_project_id}"):
+            st.session_state[open_key] = True
+            st.rerun()
+        return
+
+    f1, f2, f3 = st.columns([2, 1, 1])
+    date_range = f1.date_input("업로드 기간", value=(), key=_gallery_key("dates", current_project_id))
+    uploader = f2.selectbox(
+        "업로더", [""] + list_uploaders(current_project_id),
+        format_func=lambda u: u or "전체", key=_gallery_key("uploader", current_project_id),
+    )
+    link_status = f3.selectbox(
+        "지출 연결", list(LINK_FILTERS.keys()),
+        format_func=lambda k: LINK_FILTERS[k], key=_gallery_key("link", current_project_id),
     )
+    date_from = date_range[0] if len(date_range) >= 1 else None
+    date_to = date_range[1] if len(date_range) == 2 else date_from
 
-def render_expense_tab(current_project_id: int, current_user: dict = None):
-    current_user = current_user or {}
+    # 필터가 바뀌면 첫 페이지부터 다시
+    filter_sig = (date_from, date_to, uploader, link_status)
+    cursors_key = _gallery_key("cursors", current_project_id)
+    if st.session_state.get(_gallery_key("filters", current_project_id)) != filter_sig:
+        st.session_state[_gallery_key("filters", current_project_id)] = filter_sig
+        st.session_state[cursors_key] = [None]
+    cursors = st.session_state.setdefault(cursors_key, [None])
+
+    df_images, next_cursor = fetch_gallery_page(
+        current_project_id, cursor=cursors[-1],
+        date_from=date_from, date_to=date_to,
+        uploader=uploader or None, link_status=link_status,
+    )
+    if df_images.empty:
+        st.info("첨부된 이미지가 없습니다.")
+    else:
+        cols = st.columns(3)
+        for idx, row in df_images.iterrows():
+            img_id = row["id"]
+            filepath = row["filepath"]
+            desc = row["description"]
+            uploader_name = row["uploaded_by"]
+            with cols[idx % 3]:
+                image_bytes = read_receipt(filepath)
+                if image_bytes is not None:
+                    st.image(image_bytes, use_container_width=True)
+                else:
+                    st.warning(f"파일 없음: {row['filename']}")
+                if row["item"]:
+                    st.caption(f"📎 {row['date']} | {row['item']} | {row['amount']:,}원")
+                st.caption(f"📝 {desc or '설명 없음'}")
+                st.caption(f"👤 {uploader_name} | {str(row['uploaded_at'])[:16]}")
+                current_name = current_user.get("name", "")
+                if current_user.get("role") in {"treasurer", "admin"} or current_name == uploader_name:
+                    with st.expander("✏️ 설명 수정"):
+                        new_desc = st.text_area("새 설명", value=desc or "", key=f"desc_{img_id}")
+                        if st.button("저장", key=f"save_desc_{img_id}"):
+                            run_query("UPDATE receipt_images SET description=:desc, updated_at=GETDATE() WHERE id=:id",
+                                      {"desc": new_desc.strip(), "id": img_id})
+                            st.rerun()
+
+    p1, p2, p3 = st.columns([1, 2, 1])
+    if p1.button("◀ 이전", key=f"gallery_prev_{current_project_id}", disabled=len(cursors) <= 1):
+        cursors.pop()
+        st.rerun()
+    p2.caption(f"{len(cursors)} 페이지")
+    if p3.button("다음 ▶", key=f"gallery_next_{current_project_id}", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        st.rerun()
+
+@register_tab("expense", "💸 지출 내역", order=20)
+def render_expense_tab(ctx: RenderContext):
+    current_project_id = ctx.project_id
+    current_user = ctx.current_user
     can_upload = _can_upload(current_user)
     can_edit = _can_edit(current_user)
-    operator = current_user.get("name", st.session_state.get("operator_name_input", "익명"))
-    ai_client = st.session_state.get("ai_client")
+    operator = ctx.operator_name
+    ai_client = ctx.ai_client
 
     tab_input, tab_gallery = st.tabs(["💳 지출 등록", "🖼️ 이미지 갤러리"])
 
@@ -71,8 +262,8 @@ def render_expense_tab(current_project_id: int, current_user: dict = None):
                 )
                 if uploaded_file:
                     st.image(uploaded_file, caption="첨부 이미지 미리보기", use_container_width=True)
-                    if ai_client and st.button("🤖 AI로 영수증 자동 읽기", key="parse_receipt_btn"):
-                        with st.spinner("AI가 영수증을 읽는 중..."):
+                    if receipt_parsing_available() and st.button("🤖 영수증 자동 읽기", key="parse_receipt_btn"):
+                        with st.spinner("영수증을 읽는 중..."):
                             try:
                                 mime = "image/jpeg"
                                 if uploaded_file.name.endswith(".png"):
@@ -81,13 +272,13 @@ def render_expense_tab(current_project_id: int, current_user: dict = None):
                                     mime = "image/webp"
                                 parsed = parse_receipt_image(ai_client, uploaded_file.getvalue(), mime)
                                 st.session_state["parsed_receipt"] = parsed
-                                st.success("✅ AI 파싱 완료! 아래 내용을 확인 후 수정하세요.")
+                                st.success("✅ 파싱 완료! 아래 내용을 확인 후 수정하세요.")
                             except Exception as e:
                                 if "429" in str(e) or "quota" in str(e).lower():
                                     st.warning("⏳ AI 요청이 너무 많습니다. 잠시 후 다시 시도하세요.")
                                 else:
                                     st.error(f"파싱 오류: {e}")
-                    elif not ai_client:
+                    elif not receipt_parsing_available():
                         st.caption("💡 영수증 내용을 아래 양식에 직접 입력해주세요.")
             else:
                 st.caption("🔒 영수증 첨부 권한이 없습니다.")
@@ -120,60 +311,37 @@ def render_expense_tab(current_project_id: int, current_user: dict = None):
                     st.warning("지출 항목/내역을 입력해주세요.")
                 elif amount <= 0:
                     st.warning("지출 금액은 0원보다 커야 합니다.")
+                elif (locked := locked_message(date)):
+                    st.error(locked)
                 else:
-                    tx_date = date.strftime("%Y-%m-%d")
-                    amount_i = int(amount)
-                    # 💡 애저(MS SQL) 용 문법 + run_query(fetch=True)로 ID 수집
-                    df_inserted = run_query(
-                        """
-                        INSERT INTO expenses (project_id, date, item, amount, category)
-                        OUTPUT INSERTED.id
-                        VALUES (:pid, :date, :item, :amount, :cat)
-                        """,
-                        {
-                            "pid": current_project_id,
-                            "date": tx_date,
-                            "item": item.strip(),
-                            "amount": amount_i,
-                            "cat": category,
-                        },
-                        fetch=True,
-                    )
-                    expense_id = int(df_inserted.iloc[0]["id"]) if (df_inserted is not None and not df_inserted.empty) else None
-                    if uploaded_file and can_upload:
-                        filename, filepath = _save_image(current_project_id, uploaded_file)
-                        _register_image(current_project_id, expense_id, filename, filepath, description.strip(), operator)
-                    record_expense_entry(
-                        project_id=current_project_id, tx_date=tx_date,
-                        category=category, item=item.strip(),
-                        amount=amount_i, actor_name=operator,
-                    )
-                    log_action("지출 등록", f"{tx_date} / {item} / {amount_i:,}원 / {category}")
-                    st.session_state.pop("parsed_receipt", None)
-                    st.success("✅ 지출이 등록되었습니다.")
-                    st.rerun()
+                    try:
+                        outcome = _add_expense(
+                            current_project_id, date.strftime("%Y-%m-%d"), item, category, int(amount),
+                            uploaded_file if can_upload else None, description, operator,
+                            f"expense_{current_project_id}",
+                        )
+                    except PeriodClosedError:
+                        st.error(closed_write_message(date))
+                    else:
+                        if not outcome.inserted:
+                            idempotency.show_rejection(outcome, "✅ 지출 등록")
+                        else:
+                            st.session_state.pop("parsed_receipt", None)
+                            st.success("✅ 지출이 등록되었습니다.")
+                            st.rerun()
+
+            if can_upload and receipt_parsing_available():
+                with st.expander("📚 영수증 여러 장 한꺼번에 등록"):
+                    _render_batch_upload(current_project_id, operator, ai_client)
 
         with col_e2:
             st.subheader("📋 지출 내역")
-            df_expenses_raw = run_query(
-                """
-                SELECT e.id, e.date, e.category, e.item, e.amount,
-                CASE WHEN r.id IS NOT NULL THEN '🧾' ELSE '' END AS 영수증
-                FROM expenses e
-                LEFT JOIN receipt_images r ON r.expense_id = e.id
-                WHERE e.project_id = :pid
-                ORDER BY e.date DESC, e.id DESC
-                """,
-                {"pid": current_project_id}, fetch=True,
-            )
-
-            if df_expenses_raw is not None and not df_expenses_raw.empty:
-                df_expenses = df_expenses_raw.rename(columns={
-                    "date": "날짜", "category": "분류", "item": "내역", "amount": "금액"
-                })
+            df_expenses_raw = ctx.snapshot.expenses
+
+            if not df_expenses_raw.empty:
+                df_expenses = df_expenses_raw.rename(columns=EXPENSE_COLUMNS)
                 st.dataframe(df_expenses[["날짜", "분류", "내역", "금액", "영수증"]], use_container_width=True, hide_index=True)
-                total_expense = int(df_expenses["금액"].sum())
-                st.error(f"💸 총 지출: {total_expense:,.0f}원")
+                st.error(f"💸 총 지출: {ctx.snapshot.total_expense:,.0f}원")
 
                 # ── 수정/삭제 ──
                 if can_edit:
@@ -184,6 +352,9 @@ def render_expense_tab(current_project_id: int, current_user: dict = None):
                         ]
                         e_sel_idx = st.selectbox("수정할 항목 선택", range(len(e_labels)), format_func=lambda i: e_labels[i], key="expense_edit_select")
                         e_sel = df_expenses_raw.iloc[e_sel_idx]
+                        e_sel_locked = locked_message(e_sel["date"])
+                        if e_sel_locked:
+                            st.info(e_sel_locked)
 
                         col_eedit, col_edel = st.columns([3, 1])
                         with col_eedit:
@@ -193,83 +364,57 @@ def render_expense_tab(current_project_id: int, current_user: dict = None):
                                 ee_cat_idx = CATEGORIES.index(e_sel["category"]) if e_sel["category"] in CATEGORIES else 0
                                 ee_cat = st.selectbox("분류", CATEGORIES, index=ee_cat_idx)
                                 ee_amt = st.number_input("금액", min_value=0, step=100, value=int(e_sel["amount"]))
-                                e_save_btn = st.form_submit_button("💾 수정 저장")
-
-                            if e_save_btn:
-                                run_query(
-                                    """
-                                    UPDATE expenses
-                                    SET date=:date, item=:item, category=:cat, amount=:amount
-                                    WHERE id=:id
-                                    """,
-                                    {"date": ee_date.strftime("%Y-%m-%d"), "item": ee_item.strip(),
-                                     "cat": ee_cat, "amount": int(ee_amt), "id": int(e_sel["id"])}
-                                )
-                                log_action("지출 항목 수정", f"ID {e_sel['id']} / {ee_item} / {int(ee_amt):,}원")
-                                st.success("수정됐어!")
-                                st.rerun()
+                                e_save_btn = st.form_submit_button("💾 수정 저장", disabled=bool(e_sel_locked))
+
+                            if e_save_btn and (locked := locked_message(ee_date)):
+                                st.error(locked)
+                            elif e_save_btn:
+                                try:
+                                    saved = update_row("expenses", int(e_sel["id"]), f"""
+                                        UPDATE expenses
+                                        SET date=:date, item=:item, category=:cat, amount=:amount, updated_at=GETDATE(),
+                                            {idempotency.fingerprint_assignment("expenses")}
+                                        WHERE id=:id
+                                        """,
+                                        {"date": ee_date.strftime("%Y-%m-%d"), "item": ee_item.strip(),
+                                         "cat": ee_cat, "amount": int(ee_amt), "id": int(e_sel["id"]),
+                                         "fingerprint": idempotency.fingerprint(
+                                             current_project_id, ee_date.strftime("%Y-%m-%d"), int(ee_amt), ee_item)},
+                                        ctx.operator_name,
+                                    )
+                                except PeriodClosedError:
+                                    st.error(closed_write_message(e_sel["date"], ee_date))
+                                else:
+                                    if saved:
+                                        log_action("지출 항목 수정", f"ID {e_sel['id']} / {ee_item} / {int(ee_amt):,}원")
+                                        st.success("수정됐어!")
+                                        st.rerun()
 
                         with col_edel:
                             st.markdown("<br><br><br><br><br><br><br><br><br><br>", unsafe_allow_html=True)
-                            if st.button("🗑️ 삭제", key="expense_delete_btn", type="primary"):
+                            if st.button("🗑️ 삭제", key="expense_delete_btn", type="primary", disabled=bool(e_sel_locked)):
                                 st.session_state["expense_delete_confirm"] = int(e_sel["id"])
 
                         if st.session_state.get("expense_delete_confirm") == int(e_sel["id"]):
                             st.warning(f"⚠️ '{e_sel['item']} / {e_sel['amount']:,}원' 정말 삭제할까?")
                             c1, c2 = st.columns(2)
                             if c1.button("✅ 확인 삭제", key="expense_delete_yes"):
-                                run_query("DELETE FROM expenses WHERE id=:id", {"id": int(e_sel["id"])})
-                                log_action("지출 항목 삭제", f"ID {e_sel['id']} / {e_sel['item']} / {e_sel['amount']:,}원")
-                                st.session_state.pop("expense_delete_confirm", None)
-                                st.success("삭제됐어!")
-                                st.rerun()
+                                try:
+                                    deleted = delete_row("expenses", int(e_sel["id"]), ctx.operator_name)
+                                except PeriodClosedError:
+                                    st.error(closed_write_message(e_sel["date"]))
+                                else:
+                                    if deleted:
+                                        collect_orphan_blobs()
+                                        log_action("지출 항목 삭제", f"ID {e_sel['id']} / {e_sel['item']} / {e_sel['amount']:,}원")
+                                        st.session_state.pop("expense_delete_confirm", None)
+                                        st.success("삭제됐어!")
+                                        st.rerun()
                             if c2.button("❌ 취소", key="expense_delete_no"):
                                 st.session_state.pop("expense_delete_confirm", None)
                                 st.rerun()
             else:
-                df_expenses = pd.DataFrame(columns=["날짜", "분류", "내역", "금액", "영수증"])
-                total_expense = 0
                 st.info("지출 내역이 없습니다.")
 
     with tab_gallery:
-        st.subheader("🖼️ 프로젝트 이미지 갤러리")
-        df_images = run_query(
-            """
-            SELECT r.id, r.filename, r.filepath, r.description,
-            r.uploaded_by, r.uploaded_at, e.item, e.amount, e.date
-            FROM receipt_images r
-            LEFT JOIN expenses e ON e.id = r.expense_id
-            WHERE r.project_id = :pid
-            ORDER BY r.uploaded_at DESC
-            """,
-            {"pid": current_project_id}, fetch=True,
-        )
-        if df_images is None or df_images.empty:
-            st.info("첨부된 이미지가 없습니다.")
-        else:
-            cols = st.columns(3)
-            for idx, row in df_images.iterrows():
-                img_id = row["id"]
-                filepath = row["filepath"]
-                desc = row["description"]
-                uploader = row["uploaded_by"]
-                with cols[idx % 3]:
-                    if os.path.exists(filepath):
-                        st.image(filepath, use_container_width=True)
-                    else:
-                        st.warning(f"파일 없음: {row['filename']}")
-                    if row["item"]:
-                        st.caption(f"📎 {row['date']} | {row['item']} | {row['amount']:,}원")
-                    st.caption(f"📝 {desc or '설명 없음'}")
-                    st.caption(f"👤 {uploader} | {str(row['uploaded_at'])[:16]}")
-                    current_name = current_user.get("name", "")
-                    if current_user.get("role") in {"treasurer", "admin"} or current_name == uploader:
-                        with st.expander("✏️ 설명 수정"):
-                            new_desc = st.text_area("새 설명", value=desc or "", key=f"desc_{img_id}")
-                            if st.button("저장", key=f"save_desc_{img_id}"):
-                                run_query("UPDATE receipt_images SET description=:desc WHERE id=:id",
-                                          {"desc": new_desc.strip(), "id": img_id})
-                                st.rerun()
-
-    df_return = df_expenses[["날짜", "분류", "내역", "금액"]] if "영수증" in df_expenses.columns else df_expenses
-    return total_expense, df_return
+        _render_gallery(current_project_id, current_user)
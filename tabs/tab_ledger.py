@@ -1,17 +1,20 @@
 # tabs/tab_ledger.py
 import pandas as pd
 import streamlit as st
-from db import get_ledger
+from tabs.context import RenderContext
+from tabs.registry import register_tab
 
 
-def render_ledger_tab(current_project_id: int, **kwargs):
+@register_tab("ledger", "📒 통합 가계부", order=40)
+def render_ledger_tab(ctx: RenderContext):
     st.subheader("📒 통합 가계부")
     st.caption("거래일 기준 정렬 | 입력일시 = 시스템에 기록한 시각")
 
-    df = get_ledger(current_project_id)
+    # 스냅샷 공유 프레임이므로 복사 후 가공
+    df = ctx.snapshot.ledger.copy()
 
     # 데이터프레임이 비어있는지 안전하게 확인
-    if df is None or df.empty:
+    if df.empty:
         st.info("아직 등록된 수입/지출 내역이 없습니다.")
         return
 
@@ -0,0 +1,139 @@
+# tabs/tab_overview.py
+"""
+전체 행사 비교 (프로젝트 선택과 무관한 화면)
+- 수입/지출을 프로젝트 × 구분 × 분류로 묶은 그룹 쿼리 1회 → 캐시
+- 캐시 키: 세 테이블의 행 수 + 최종 변경 시각 (어느 프로젝트든 바뀌면 다시 집계)
+- 정렬/필터/분류 차트는 캐시된 프레임에서 pandas로만 처리 (추가 쿼리 없음)
+"""
+
+import pandas as pd
+import streamlit as st
+
+from db import run_query
+from tabs.context import RenderContext
+from tabs.registry import register_tab
+
+TOP_CATEGORIES = 3
+SUMMARY_COLUMNS = ["project_id", "행사", "수입", "지출", "잔액", "소진율", "지출 건수", "주요 지출 분류"]
+
+
+@st.cache_data(show_spinner=False, ttl=5)
+def _data_version() -> tuple:
+    """행 수 + 최종 변경 시각. 삭제는 행 수로, 추가/수정은 updated_at으로 잡힘."""
+    df = run_query(
+        """
+        SELECT (SELECT COUNT(*) FROM projects) AS p_n,
+               (SELECT COUNT(*) FROM budget_entries) AS b_n, (SELECT MAX(updated_at) FROM budget_entries) AS b_t,
+               (SELECT COUNT(*) FROM members) AS m_n,        (SELECT MAX(updated_at) FROM members) AS m_t,
+               (SELECT COUNT(*) FROM expenses) AS e_n,       (SELECT MAX(updated_at) FROM expenses) AS e_t
+        """,
+        fetch=True,
+    )
+    if df is None or df.empty:
+        return ()
+    return tuple(str(v) for v in df.iloc[0].tolist())
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _fetch_totals(version: tuple) -> pd.DataFrame:
+    """프로젝트 × (income|expense) × 분류 합계. 거래가 없는 프로젝트도 한 행(kind NULL)으로 포함."""
+    df = run_query(
+        """
+        SELECT p.id AS project_id, p.name, t.kind, t.category,
+               SUM(t.amount) AS amount, COUNT(t.amount) AS n
+        FROM projects p
+        LEFT JOIN (
+            SELECT project_id, 'income' AS kind, source_type AS category, amount FROM budget_entries
+            UNION ALL
+            SELECT project_id, 'income', 'student_dues', deposit_amount FROM members
+            UNION ALL
+            SELECT project_id, 'expense', ISNULL(category, N'기타'), amount FROM expenses
+        ) t ON t.project_id = p.id
+        GROUP BY p.id, p.name, t.kind, t.category
+        """,
+        fetch=True,
+    )
+    if df is None:
+        return pd.DataFrame(columns=["project_id", "name", "kind", "category", "amount", "n"])
+    df["amount"] = df["amount"].fillna(0).astype("int64")
+    return df
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _summarize(version: tuple) -> tuple:
+    """(프로젝트별 요약, 지출 분류 long 프레임)."""
+    totals = _fetch_totals(version)
+    names = totals.drop_duplicates("project_id").set_index("project_id")["name"]
+    by_kind = totals.pivot_table(index="project_id", columns="kind", values="amount", aggfunc="sum", fill_value=0)
+    by_kind = by_kind.reindex(index=names.index, columns=["income", "expense"], fill_value=0)
+
+    expenses = totals[totals["kind"] == "expense"]
+    counts = expenses.groupby("project_id")["n"].sum().reindex(names.index, fill_value=0)
+    top = (
+        expenses.sort_values(["project_id", "amount"], ascending=[True, False])
+        .groupby("project_id")
+        .head(TOP_CATEGORIES)
+        .groupby("project_id")["category"]
+        .agg(", ".join)
+        .reindex(names.index, fill_value="")
+    )
+
+    summary = pd.DataFrame({
+        "project_id": names.index,
+        "행사": names.values,
+        "수입": by_kind["income"].values,
+        "지출": by_kind["expense"].values,
+    })
+    summary["잔액"] = summary["수입"] - summary["지출"]
+    summary["소진율"] = (summary["지출"] / summary["수입"].where(summary["수입"] > 0)).fillna(0.0)
+    summary["지출 건수"] = counts.values
+    summary["주요 지출 분류"] = top.values
+    categories = expenses[["project_id", "name", "category", "amount"]].rename(
+        columns={"name": "행사", "category": "분류", "amount": "금액"}
+    )
+    return summary[SUMMARY_COLUMNS], categories
+
+
+@register_tab("overview", "🗂️ 전체 행사 비교", order=50)
+def render_overview_tab(ctx: RenderContext):
+    st.subheader("🗂️ 전체 행사 비교")
+    summary, categories = _summarize(_data_version())
+    if summary.empty:
+        st.info("아직 만든 행사가 없습니다.")
+        return
+
+    f1, f2, f3 = st.columns([2, 1, 1])
+    keyword = f1.text_input("행사명 검색", key="overview_keyword")
+    only_deficit = f2.checkbox("적자 행사만", key="overview_deficit")
+    sort_by = f3.selectbox("정렬", ["잔액", "소진율", "수입", "지출", "행사"], key="overview_sort")
+
+    view = summary
+    if keyword.strip():
+        view = view[view["행사"].str.contains(keyword.strip(), case=False, regex=False)]
+    if only_deficit:
+        view = view[view["잔액"] < 0]
+    view = view.sort_values(sort_by, ascending=sort_by == "행사")
+
+    k1, k2, k3, k4 = st.columns(4)
+    k1.metric("행사 수", f"{len(view)}개")
+    k2.metric("총 수입", f"{view['수입'].sum():,.0f}원")
+    k3.metric("총 지출", f"{view['지출'].sum():,.0f}원")
+    k4.metric("총 잔액", f"{view['잔액'].sum():,.0f}원")
+
+    st.dataframe(
+        view.drop(columns=["project_id"]),
+        hide_index=True, use_container_width=True,
+        column_config={
+            "수입": st.column_config.NumberColumn(format="%d원"),
+            "지출": st.column_config.NumberColumn(format="%d원"),
+            "잔액": st.column_config.NumberColumn(format="%d원"),
+            "소진율": st.column_config.ProgressColumn(min_value=0.0, max_value=1.0, format="%.2f"),
+        },
+    )
+
+    st.write("📂 **행사별 지출 분류**")
+    shown = categories[categories["project_id"].isin(view["project_id"])]
+    if shown.empty:
+        st.info("지출 내역이 없습니다.")
+    else:
+        st.bar_chart(shown.pivot_table(index="행사", columns="분류", values="금액", aggfunc="sum", fill_value=0))
@@ -0,0 +1,54 @@
+# tabs/tab_search.py
+"""
+전체 행사 통합 검색 (프로젝트 선택과 무관한 화면)
+- 색인/점수는 search.py (프로세스 내 역색인, 검색 시 바뀐 행만 증분 반영)
+- 결과 행을 고르면 해당 행사 + 화면(수입/지출)으로 이동
+"""
+
+import streamlit as st
+
+import search
+from tabs.context import RenderContext
+from tabs.registry import register_tab
+
+# 결과 구분 → 이동할 화면 키
+SOURCE_VIEWS = {"expense": "expense", "receipt": "expense", "budget": "budget", "member": "budget"}
+
+
+def _open_hit(project_name: str, source: str):
+    # 위젯 생성 전에 실행되는 콜백에서만 key 값을 바꿀 수 있음
+    st.session_state["current_project_name"] = project_name
+    st.session_state["active_view"] = SOURCE_VIEWS[source]
+
+
+@register_tab("search", "🔎 통합 검색", order=60)
+def render_search_tab(ctx: RenderContext):
+    st.subheader("🔎 통합 검색")
+    c1, c2 = st.columns([3, 1])
+    query = c1.text_input("검색어", key="search_query", placeholder="지출 항목, 입금자, 학생 이름, 영수증 설명…")
+    only_current = c2.checkbox("현재 행사만", key="search_current_only")
+    if not query.strip():
+        st.caption("모든 행사의 지출/수입/학생회비/영수증 설명에서 찾아요.")
+        return
+
+    hits = search.search(query, project_id=ctx.project_id if only_current else None)
+    stats = search.get_index().stats()
+    st.caption(f"{len(hits)}건 · 색인 {stats['docs']:,}건 · 갱신 {stats['refresh_ms']}ms")
+    if hits.empty:
+        st.info("검색 결과가 없습니다.")
+        return
+
+    event = st.dataframe(
+        hits.drop(columns=["project_id", "source", "row_id"]),
+        hide_index=True, use_container_width=True,
+        on_select="rerun", selection_mode="single-row", key="search_results",
+        column_config={"금액": st.column_config.NumberColumn(format="%d원")},
+    )
+    selected = event.selection.rows
+    if selected:
+        hit = hits.iloc[selected[0]]
+        st.button(
+            f"➡️ '{hit['행사']}' {search.SOURCE_LABELS[hit['source']]} 화면으로 이동",
+            key="search_open_hit",
+            on_click=_open_hit, args=(hit["행사"], hit["source"]),
+        )
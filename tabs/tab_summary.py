@@ -2,23 +2,107 @@
 import pandas as pd
 import streamlit as st
 
+import anomaly
+from accounting.periods import balances_as_of
+from accounting.reconcile import journal_trusted
+from accounting.reports import cash_position, income_statement, project_kpis, trial_balance
 from ai_audit import run_ai_audit
 from export_excel import create_settlement_excel
+from tabs.context import RenderContext
+from tabs.registry import register_tab
+
+
+@st.cache_data(show_spinner=False)
+def _settlement_excel_bytes(project_name, total_budget, total_expense, final_balance, df_expenses, df_members) -> bytes:
+    # 데이터가 그대로면 rerun마다 엑셀을 다시 만들지 않음 (쓰기 시 캐시 초기화)
+    return create_settlement_excel(
+        project_name,
+        total_budget,
+        total_expense,
+        final_balance,
+        df_expenses=df_expenses,
+        df_members=df_members,
+    )
+
+
+def _render_financial_statements(project_id: int):
+    """복식부기 장부 기준 시산표 / 손익계산서 / 현금 현황."""
+    with st.expander("📒 재무제표 (복식부기 장부 기준)"):
+        if kpis := project_kpis(project_id):
+            if not journal_trusted(project_id):
+                st.warning("장부 대사(전체 검사 + 복구)를 통과하지 않아 위 합계는 운영 테이블 기준이에요. "
+                           "아래 장부 수치와 다를 수 있어요.")
+            c1, c2, c3 = st.columns(3)
+            c1.metric("현금 잔액", f"{kpis.cash_balance:,.0f}원")
+            c2.metric("당기 순이익", f"{kpis.net_income:,.0f}원")
+            c3.metric("과잠 미회수액", f"{kpis.receivable:,.0f}원")
+        else:
+            st.info("이 프로젝트는 아직 장부 전표가 없어. (회계 모듈 도입 이전 데이터)")
+            return
+
+        tab_tb, tab_is, tab_cash, tab_asof = st.tabs(["시산표", "손익계산서", "현금 현황", "기준일 잔액"])
+        with tab_tb:
+            tb = trial_balance(project_id)
+            st.dataframe(
+                tb.rename(columns={"code": "코드", "name": "계정", "type": "유형", "debit": "차변", "credit": "대변", "balance": "잔액"}),
+                hide_index=True, use_container_width=True,
+            )
+            st.caption(f"차변 합계 {tb['debit'].sum():,.0f}원 · 대변 합계 {tb['credit'].sum():,.0f}원")
+        with tab_is:
+            statement = income_statement(project_id)
+            col_in, col_out = st.columns(2)
+            col_in.write(f"**수익** {statement['total_income']:,.0f}원")
+            col_in.dataframe(statement["income"], hide_index=True, use_container_width=True)
+            col_out.write(f"**비용** {statement['total_expense']:,.0f}원")
+            col_out.dataframe(statement["expense"], hide_index=True, use_container_width=True)
+        with tab_cash:
+            st.dataframe(cash_position(project_id), hide_index=True, use_container_width=True)
+        with tab_asof:
+            as_of = st.date_input("기준일", key=f"balance_as_of_{project_id}")
+            # 가장 가까운 마감 스냅샷 + 이후 전표만 읽음
+            df_asof = balances_as_of(str(as_of), project_id)
+            st.dataframe(
+                df_asof[["code", "name", "type", "debit", "credit", "balance"]],
+                hide_index=True, use_container_width=True,
+            )
+
+
+def _render_anomalies(result: pd.DataFrame):
+    """통계 기반 이상 징후 (AI 없이 로컬 계산, 감사 프롬프트에도 같은 결과가 들어감)."""
+    st.write("📊 **분류별 지출 위험도** (이상 징후 금액 가중, 높을수록 정밀 조사 필요)")
+    risk_df = anomaly.category_risk(result)
+    if risk_df.empty:
+        st.info("지출 내역이 입력되면 위험도 분석이 나타나.")
+        return
+    st.bar_chart(risk_df.set_index("항목"), color="#d33682")
+
+    hits = anomaly.flagged(result)
+    if hits.empty:
+        st.caption("탐지된 이상 징후가 없어요.")
+    elif st.toggle(f"🚩 이상 징후 지출 {len(hits)}건 보기", key="show_anomalies"):
+        st.dataframe(
+            hits[["날짜", "분류", "내역", "금액", "z", "징후", "위험도"]],
+            hide_index=True, use_container_width=True,
+            column_config={
+                "금액": st.column_config.NumberColumn(format="%d원"),
+                "위험도": st.column_config.ProgressColumn(min_value=0.0, max_value=1.0, format="%.2f"),
+            },
+        )
 
 
-def render_summary_tab(
-    selected_project_name: str,
-    total_budget: int,
-    total_expense: int,
-    df_expenses: pd.DataFrame,
-    df_members: pd.DataFrame,
-    model,                  
-    ai_available: bool,
-    **kwargs  # app.py에서 넘겨주는 기타 정보들을 안전하게 흡수
-):
+@register_tab("summary", "📊 최종 결산", order=30)
+def render_summary_tab(ctx: RenderContext):
     """TAB3: 최종 결산 대시보드 + 시각화 + 감사 + 엑셀 다운로드."""
     st.header("⚖️ 최종 결산 대시보드")
 
+    selected_project_name = ctx.project_name
+    total_budget  = ctx.snapshot.total_budget
+    total_expense = ctx.snapshot.total_expense
+    df_expenses   = ctx.snapshot.expenses_display
+    df_members    = ctx.snapshot.members_display
+    model         = ctx.ai_client
+    ai_available  = ctx.ai_available
+
     final_balance = total_budget - total_expense
     usage_rate    = (total_expense / total_budget * 100) if total_budget > 0 else 0
 
@@ -49,6 +133,8 @@ def render_summary_tab(
     st.write(f"📉 **전체 예산 집행률 ({usage_rate:.1f}%)**")
     st.progress(min(usage_rate / 100, 1.0))
 
+    _render_financial_statements(ctx.project_id)
+
     st.divider()
     col_ai, col_xls = st.columns([2, 1])
 
@@ -60,13 +146,13 @@ def render_summary_tab(
             if st.button("🚨 AI 장부 정밀 감사 실행"):
                 with st.spinner("재정 데이터를 AI가 정밀 분석 중..."):
                     try:
-                        report_text, risk_df = run_ai_audit(
-                            model,          
+                        report_text, _ = run_ai_audit(
+                            model,
                             df_expenses,
                             total_budget,
+                            ctx.snapshot.anomalies,
                         )
                         st.session_state["ai_audit_report"] = report_text
-                        st.session_state["ai_risk_chart"]   = risk_df
                         st.success("감사 완료! 아래 결과를 확인하세요.")
                         st.rerun()
                     except Exception as e:
@@ -79,22 +165,18 @@ def render_summary_tab(
             st.info("📑 AI 감사 보고서")
             st.markdown(st.session_state["ai_audit_report"])
 
-        if "ai_risk_chart" in st.session_state:
-            st.write("📊 **AI 선정 지출 위험도 분석** (높을수록 정밀 조사 필요)")
-            risk_df = st.session_state["ai_risk_chart"]
-            if not risk_df.empty:
-                st.bar_chart(risk_df.set_index("항목"), color="#d33682")
+        _render_anomalies(ctx.snapshot.anomalies)
 
     # ── 엑셀 다운로드 ─────────────────────────────────────────────────────
     with col_xls:
         st.subheader("💾 결산 자료 다운로드")
-        excel_bytes = create_settlement_excel(
+        excel_bytes = _settlement_excel_bytes(
             selected_project_name,
             total_budget,
             total_expense,
             final_balance,
-            df_expenses=df_expenses,
-            df_members=df_members,
+            df_expenses,
+            df_members,
         )
         st.download_button(
             label="📥 전체 결산 파일 (Excel)",